@@ -0,0 +1,109 @@
+"""
+Benchmark do serviço de micro-lotes do Whisper.
+
+Simula várias sessões simultâneas, cada uma enviando falas em sequência
+(envia, espera o resultado, envia a próxima), e compara a vazão e a
+latência por fala sem lote (lote 1) e com diferentes tamanhos de lote e
+janelas de espera.
+
+Uso:
+    python examples/benchmark_batching.py --model base --sessions 16 \\
+        --configs 1:0 4:0.02 8:0.03 16:0.05 --audio fala1.wav fala2.wav
+"""
+
+import sys
+import os
+import time
+import argparse
+import threading
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.micro_batching import MicroBatchTranscriber
+
+
+def load_utterances(paths, seconds):
+    """Carrega as falas informadas ou gera ruído com a duração pedida."""
+    import whisper
+    if paths:
+        return [whisper.load_audio(path) for path in paths]
+    rng = np.random.default_rng(0)
+    return [rng.normal(0, 0.05, int(seconds * 16000)).astype(np.float32) for _ in range(4)]
+
+
+def run(model, utterances, sessions, per_session, batch_size, max_wait, max_tokens, language):
+    """Executa as sessões contra um serviço e mede vazão e latências."""
+    service = MicroBatchTranscriber(model, language=language, max_batch_size=batch_size,
+                                    max_wait=max_wait, max_tokens=max_tokens)
+    latencies = []
+    lock = threading.Lock()
+    
+    def session(index):
+        for turn in range(per_session):
+            audio = utterances[(index + turn) % len(utterances)]
+            start = time.perf_counter()
+            service.transcribe(audio)
+            with lock:
+                latencies.append(time.perf_counter() - start)
+    
+    # Aquecimento
+    service.transcribe(utterances[0])
+    
+    start = time.perf_counter()
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    metrics = service.metrics()
+    service.close()
+    latencies.sort()
+    return {
+        "throughput": len(latencies) / elapsed,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "batch_avg": metrics.get("batch_size_avg", 0.0),
+        "wait_avg": metrics.get("wait_avg", 0.0),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vazão × latência do Whisper com micro-lotes")
+    parser.add_argument("--model", default="base")
+    parser.add_argument("--audio", nargs="*", help="Falas de teste (padrão: ruído sintético)")
+    parser.add_argument("--seconds", type=float, default=4.0, help="Duração das falas sintéticas")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--per-session", type=int, default=4)
+    parser.add_argument("--configs", nargs="+", default=["1:0", "4:0.02", "8:0.03", "16:0.05"],
+                        help="Pares lote:espera(s)")
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--language", default="pt")
+    parser.add_argument("--threads", type=int, default=None, help="Threads do PyTorch")
+    args = parser.parse_args()
+    
+    import torch
+    import whisper
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    
+    model = whisper.load_model(args.model, device="cpu")
+    utterances = load_utterances(args.audio, args.seconds)
+    
+    print("\n" + "=" * 72)
+    print(f"{'Lote':>6}{'Espera (ms)':>13}{'Falas/s':>10}{'p50 (s)':>10}{'p95 (s)':>10}"
+          f"{'Lote médio':>12}{'Fila (ms)':>11}")
+    print("=" * 72)
+    baseline = None
+    for config in args.configs:
+        batch_size, max_wait = config.split(":")
+        result = run(model, utterances, args.sessions, args.per_session, int(batch_size),
+                     float(max_wait), args.max_tokens, args.language)
+        baseline = baseline or result["throughput"]
+        print(f"{int(batch_size):>6}{float(max_wait) * 1000:>13.0f}{result['throughput']:>10.2f}"
+              f"{result['p50']:>10.2f}{result['p95']:>10.2f}{result['batch_avg']:>12.1f}"
+              f"{result['wait_avg'] * 1000:>11.1f}"
+              f"   ({result['throughput'] / baseline:.2f}×)")
+    print("=" * 72)
@@ -0,0 +1,94 @@
+"""
+Benchmark da FAQ local: tempo de construção e latência de busca.
+
+Gera perguntas sintéticas (ou usa um arquivo de FAQ), consulta o índice
+com variações de redação e mede a latência por busca e a taxa de acerto
+acima do limiar.
+
+Uso:
+    python examples/benchmark_faq.py --entries 50000 --queries 1000
+    python examples/benchmark_faq.py --faq faq.jsonl
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.faq_index import FAQIndex, load_faq
+
+SUBJECTS = [
+    "tesouro direto", "ações", "fundos imobiliários", "cdb", "lci", "poupança",
+    "previdência privada", "renda fixa", "dividendos", "imposto de renda",
+    "criptomoedas", "câmbio", "debêntures", "etf", "day trade", "reserva de emergência",
+]
+TEMPLATES = [
+    "O que é {s} {n}?", "Como investir em {s} {n}?", "Vale a pena {s} {n}?",
+    "Qual o risco de {s} {n}?", "Como declarar {s} {n}?", "Quanto rende {s} {n}?",
+]
+REPHRASE = [
+    ("O que é", "Me explica o que é"), ("Como investir em", "Como faço para investir em"),
+    ("Vale a pena", "Compensa"), ("Qual o risco de", "Quais os riscos de"),
+    ("?", ""),
+]
+
+
+def synthetic_entries(count, seed=0):
+    """Gera entradas de FAQ sintéticas e distintas."""
+    rng = random.Random(seed)
+    entries = []
+    for i in range(count):
+        question = rng.choice(TEMPLATES).format(s=rng.choice(SUBJECTS), n=f"série {i}")
+        entries.append({"question": question, "answer": f"Resposta curada {i}.", "language": "pt"})
+    return entries
+
+
+def rephrase(question, rng):
+    """Aplica uma variação de redação à pergunta."""
+    for old, new in rng.sample(REPHRASE, 2):
+        question = question.replace(old, new)
+    return question.lower()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark da FAQ local")
+    parser.add_argument("--faq", help="Arquivo de FAQ (padrão: entradas sintéticas)")
+    parser.add_argument("--entries", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+    
+    entries = load_faq(args.faq) if args.faq else synthetic_entries(args.entries)
+    
+    start = time.perf_counter()
+    index = FAQIndex(entries, threshold=args.threshold)
+    build_seconds = time.perf_counter() - start
+    
+    rng = random.Random(1)
+    targets = [rng.randrange(len(entries)) for _ in range(args.queries)]
+    queries = [rephrase(entries[t]["question"], rng) for t in targets]
+    
+    # Aquecimento
+    for query in queries[:10]:
+        index.match(query, language="pt")
+    
+    timings, hits, correct = [], 0, 0
+    for target, query in zip(targets, queries):
+        start = time.perf_counter()
+        result = index.match(query, language="pt")
+        timings.append(time.perf_counter() - start)
+        if result:
+            hits += 1
+            correct += result["entry"] == target
+    
+    timings.sort()
+    print("\n" + "=" * 60)
+    print(f"Entradas:            {len(entries)} ({len(index.vocabulary)} atributos)")
+    print(f"Construção:          {build_seconds:.2f}s")
+    print(f"Busca média:         {sum(timings) / len(timings) * 1000:.3f} ms")
+    print(f"Busca p50 / p95:     {timings[len(timings) // 2] * 1000:.3f} / "
+          f"{timings[int(len(timings) * 0.95)] * 1000:.3f} ms")
+    print(f"Acima do limiar:     {hits / len(queries):.1%} (corretas: {correct / max(1, hits):.1%})")
+    print("=" * 60)
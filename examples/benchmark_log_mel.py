@@ -0,0 +1,104 @@
+"""
+Benchmark do log-mel incremental durante a captura.
+
+Compara o trabalho que resta depois que a gravação para:
+    - caminho atual: decodificar o WAV gravado (ffmpeg, via whisper.load_audio)
+      e calcular o log-mel da gravação inteira;
+    - incremental: completar os últimos quadros e normalizar (finish()).
+Também mede o custo por bloco pago durante a captura.
+
+Sem ffmpeg instalado, a decodificação é feita pelo soundfile com reamostragem
+em NumPy (mais rápida que o ffmpeg; a economia medida fica subestimada).
+
+Uso:
+    python examples/benchmark_log_mel.py --seconds 5 15 30 --rate 44100
+"""
+
+import sys
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import whisper
+from whisper.audio import N_SAMPLES
+from src.audio_preprocessing import StreamResampler, load_audio, save_audio
+from src.log_mel import LogMelExtractor
+
+
+def decode_file(path):
+    """Decodifica a gravação como o SpeechToText faria (ffmpeg se disponível)."""
+    if shutil.which("ffmpeg"):
+        return whisper.load_audio(path)
+    audio, sample_rate = load_audio(path)
+    resampler = StreamResampler(sample_rate)
+    return np.concatenate((resampler.process(audio), resampler.flush()))
+
+
+def best_of(fn, runs):
+    """Menor tempo de `runs` execuções."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark(seconds, sample_rate, block_size, n_mels, runs):
+    """Mede o caminho atual e o incremental para uma gravação."""
+    rng = np.random.default_rng(0)
+    audio = (0.1 * rng.standard_normal(int(seconds * sample_rate))).astype(np.float32)
+    path = os.path.join(tempfile.mkdtemp(), "capture.wav")
+    save_audio(path, audio, sample_rate)  # o WAV continua sendo gravado nos dois caminhos
+    
+    def current():
+        whisper.log_mel_spectrogram(decode_file(path), n_mels, padding=N_SAMPLES)
+    
+    extractor = LogMelExtractor(sample_rate, n_mels, max_seconds=seconds)
+    capture_timings, finish_timings = [], []
+    for _ in range(runs):
+        extractor.reset(seconds)
+        start = time.perf_counter()
+        for offset in range(0, len(audio), block_size):
+            extractor.process(audio[offset:offset + block_size])
+        capture_timings.append(time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        extractor.finish()
+        finish_timings.append(time.perf_counter() - start)
+    
+    blocks = -(-len(audio) // block_size)
+    return {
+        "current": best_of(current, runs),
+        "finish": min(finish_timings),
+        "per_block_us": min(capture_timings) / blocks * 1e6,
+        "capture_rtf": min(capture_timings) / seconds,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tempo economizado pelo log-mel incremental")
+    parser.add_argument("--seconds", type=float, nargs="+", default=[5.0, 15.0, 30.0])
+    parser.add_argument("--rate", type=int, default=44100, help="Taxa de captura (Hz)")
+    parser.add_argument("--block-size", type=int, default=1024, help="Amostras por bloco do callback")
+    parser.add_argument("--n-mels", type=int, default=80)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    
+    print(f"Decodificação: {'ffmpeg' if shutil.which('ffmpeg') else 'soundfile + NumPy (ffmpeg ausente)'}")
+    print("\n" + "=" * 74)
+    print(f"{'Duração (s)':>12}{'Atual (ms)':>12}{'Incremental (ms)':>18}{'Economia (ms)':>15}"
+          f"{'µs/bloco':>10}{'CPU captura':>13}")
+    print("=" * 74)
+    for seconds in args.seconds:
+        result = benchmark(seconds, args.rate, args.block_size, args.n_mels, args.runs)
+        print(f"{seconds:>12.1f}{result['current'] * 1000:>12.1f}{result['finish'] * 1000:>18.2f}"
+              f"{(result['current'] - result['finish']) * 1000:>15.1f}"
+              f"{result['per_block_us']:>10.0f}{result['capture_rtf']:>12.2%}")
+    print("=" * 74)
+    print("CPU captura: tempo gasto nos blocos / duração da gravação")
@@ -0,0 +1,108 @@
+"""
+Benchmark do armazenamento de sessões em SQLite.
+
+Popula o banco com muitas sessões sintéticas, mede o tempo para retomar
+sessões aleatórias (janela recente) e o efeito da compactação no tamanho
+do arquivo e na retomada.
+
+Uso:
+    python examples/benchmark_sessions.py --sessions 100000 --turns 40
+"""
+
+import sys
+import os
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.session_store import SQLiteSessionStore
+
+PHRASES = [
+    "Quanto rende o Tesouro Selic hoje?",
+    "O Tesouro Selic rende aproximadamente a taxa básica de juros, descontado o imposto de renda.",
+    "E se eu resgatar antes do vencimento?",
+    "Você recebe o valor de mercado do título, que no Tesouro Selic varia muito pouco.",
+    "Vale a pena manter a reserva de emergência lá?",
+    "Sim, pela liquidez diária e baixo risco é uma das opções mais indicadas para a reserva de emergência. " * 4,
+]
+
+
+def populate(store, sessions, turns, batch=2000):
+    """Insere as sessões sintéticas em transações grandes."""
+    rng = random.Random(0)
+    now = time.time()
+    conn = store._connection()
+    for start in range(0, sessions, batch):
+        ids = range(start, min(start + batch, sessions))
+        conn.execute("BEGIN")
+        conn.executemany(
+            "INSERT INTO sessions (id, system_prompt, turns, created, updated) VALUES (?, NULL, ?, ?, ?)",
+            [(f"s{i}", turns, now, now) for i in ids]
+        )
+        conn.executemany(
+            "INSERT INTO turns (session_id, seq, role, content, compressed) VALUES (?, ?, ?, ?, ?)",
+            [
+                (f"s{i}", seq, 1 + seq % 2, *store._encode(rng.choice(PHRASES)))
+                for i in ids for seq in range(turns)
+            ]
+        )
+        conn.execute("COMMIT")
+
+
+def measure(path, sessions, window, samples):
+    """Abre o banco do zero e mede a retomada de sessões aleatórias."""
+    rng = random.Random(1)
+    timings = []
+    with SQLiteSessionStore(path) as store:
+        for _ in range(samples):
+            session_id = f"s{rng.randrange(sessions)}"
+            start = time.perf_counter()
+            store.load(session_id, limit=window)
+            store.get_system_prompt(session_id)
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.95)]
+
+
+def file_mb(path):
+    """Tamanho do banco (incluindo o WAL) em MB."""
+    return sum(os.path.getsize(p) for p in (path, path + "-wal") if os.path.exists(p)) / 2 ** 20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de retomada de sessões")
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--window", type=int, default=20)
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--db", help="Arquivo do banco (padrão: temporário)")
+    args = parser.parse_args()
+    
+    path = args.db or os.path.join(tempfile.mkdtemp(), "sessions.db")
+    
+    start = time.perf_counter()
+    with SQLiteSessionStore(path) as store:
+        populate(store, args.sessions, args.turns)
+    print(f"📥 {args.sessions} sessões × {args.turns} turnos inseridas em {time.perf_counter() - start:.1f}s")
+    
+    before = file_mb(path)
+    p50, p95 = measure(path, args.sessions, args.window, args.samples)
+    
+    start = time.perf_counter()
+    with SQLiteSessionStore(path) as store:
+        stats = store.compact(keep_recent=args.window, vacuum=True)
+    compact_seconds = time.perf_counter() - start
+    
+    after = file_mb(path)
+    c50, c95 = measure(path, args.sessions, args.window, args.samples)
+    
+    print("\n" + "=" * 60)
+    print(f"{'':<22}{'Tamanho (MB)':>14}{'p50 (ms)':>12}{'p95 (ms)':>12}")
+    print("=" * 60)
+    print(f"{'Antes da compactação':<22}{before:>14.1f}{p50 * 1000:>12.3f}{p95 * 1000:>12.3f}")
+    print(f"{'Após compactação':<22}{after:>14.1f}{c50 * 1000:>12.3f}{c95 * 1000:>12.3f}")
+    print("=" * 60)
+    print(f"Compactação: {stats['turns_archived']} turnos de {stats['sessions']} sessões "
+          f"em {compact_seconds:.1f}s")
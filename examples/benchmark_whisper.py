@@ -0,0 +1,99 @@
+"""
+Benchmark do Whisper na CPU: fp32 vs. int8 (quantização dinâmica).
+
+Mede o fator de tempo real (RTF = tempo de transcrição / duração do áudio)
+e a taxa de erro de palavras (WER) contra uma transcrição de referência,
+para cada tamanho de modelo.
+
+Uso:
+    python examples/benchmark_whisper.py audio.wav "texto de referência" \\
+        --sizes tiny base small --threads 4
+"""
+
+import sys
+import os
+import time
+import argparse
+import re
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src import SpeechToText
+
+
+def normalize_words(text):
+    """Normaliza texto para comparação (minúsculas, sem pontuação)."""
+    return re.sub(r"[^\w\s]", " ", text.lower()).split()
+
+
+def word_error_rate(reference, hypothesis):
+    """Calcula a WER por distância de edição entre palavras."""
+    ref = normalize_words(reference)
+    hyp = normalize_words(hypothesis)
+    previous = list(range(len(hyp) + 1))
+    
+    for i, ref_word in enumerate(ref, start=1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, start=1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word)
+            )
+        previous = current
+    
+    return previous[-1] / max(1, len(ref))
+
+
+def benchmark(audio_file, reference, size, quantize, threads, language, runs):
+    """Carrega um modelo e mede RTF e WER."""
+    import whisper
+    
+    audio_seconds = whisper.load_audio(audio_file).shape[0] / whisper.audio.SAMPLE_RATE
+    
+    start = time.perf_counter()
+    stt = SpeechToText(model_name=size, language=language, quantize=quantize, num_threads=threads)
+    load_seconds = time.perf_counter() - start
+    
+    # Aquecimento (primeira chamada inclui alocações)
+    stt.transcribe(audio_file)
+    
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        text = stt.transcribe(audio_file)
+        timings.append(time.perf_counter() - start)
+    
+    best = min(timings)
+    return {
+        "size": size,
+        "precision": "int8" if quantize else "fp32",
+        "load_s": load_seconds,
+        "rtf": best / audio_seconds,
+        "wer": word_error_rate(reference, text),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fp32 vs int8 do Whisper")
+    parser.add_argument("audio_file")
+    parser.add_argument("reference", help="Transcrição de referência")
+    parser.add_argument("--sizes", nargs="+", default=["tiny", "base", "small", "medium", "large"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--language", default="pt")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    
+    results = []
+    for size in args.sizes:
+        for quantize in (False, True):
+            results.append(benchmark(
+                args.audio_file, args.reference, size, quantize,
+                args.threads, args.language, args.runs
+            ))
+    
+    print("\n" + "=" * 60)
+    print(f"{'Modelo':<10}{'Precisão':<10}{'Carga (s)':>10}{'RTF':>10}{'WER':>10}")
+    print("=" * 60)
+    for r in results:
+        print(f"{r['size']:<10}{r['precision']:<10}{r['load_s']:>10.2f}{r['rtf']:>10.3f}{r['wer']:>10.1%}")
+    print("=" * 60)
@@ -4,9 +4,23 @@ Voice Assistant Multi-Language Package
 
 from .voice_assistant import VoiceAssistant, create_assistant
 from .audio_recorder import AudioRecorder, record_audio
+from .audio_preprocessing import AudioPreprocessor, preprocess_audio
+from .log_mel import LogMelExtractor, LogMelFeatures, transcribe_features
 from .speech_to_text import SpeechToText, transcribe_audio
+from .long_form import LongFormTranscriber
+from .streaming_stt import StreamingTranscriber
+from .model_router import WhisperModelRouter
+from .worker_pool import TranscriptionWorkerPool
+from .micro_batching import MicroBatchTranscriber
+from .model_lock import model_lock
 from .chatgpt_client import ChatGPTClient, ask_chatgpt
+from .llm_scheduler import LLMScheduler, get_default_scheduler
+from .model_cascade import ModelCascade
+from .faq_index import FAQIndex
+from .session_store import SessionStore, SQLiteSessionStore
 from .text_to_speech import TextToSpeech, text_to_speech, play_audio
+from .playback import PlaybackSink, create_sink
+from .batch import BatchProcessor
 
 __version__ = "1.0.0"
 __author__ = "Gleison"
@@ -16,11 +30,31 @@ __all__ = [
     "create_assistant",
     "AudioRecorder",
     "record_audio",
+    "AudioPreprocessor",
+    "preprocess_audio",
+    "LogMelExtractor",
+    "LogMelFeatures",
+    "transcribe_features",
     "SpeechToText",
     "transcribe_audio",
+    "LongFormTranscriber",
+    "StreamingTranscriber",
+    "WhisperModelRouter",
+    "TranscriptionWorkerPool",
+    "MicroBatchTranscriber",
+    "model_lock",
     "ChatGPTClient",
     "ask_chatgpt",
+    "LLMScheduler",
+    "get_default_scheduler",
+    "ModelCascade",
+    "FAQIndex",
+    "SessionStore",
+    "SQLiteSessionStore",
     "TextToSpeech",
     "text_to_speech",
     "play_audio",
+    "PlaybackSink",
+    "create_sink",
+    "BatchProcessor",
 ]
@@ -0,0 +1,497 @@
+"""
+Módulo de pré-processamento de áudio entre a gravação e a transcrição.
+
+Todas as etapas são vetorizadas com NumPy (sem laços por amostra):
+remoção de DC, filtro passa-altas, corte de silêncio, normalização e
+redução de ruído opcional por "spectral gating". StreamResampler converte
+blocos capturados em tempo real para os 16 kHz do Whisper.
+"""
+
+import math
+import time
+import wave
+import numpy as np
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+
+def frame_signal(audio: np.ndarray, frame_length: int, hop_length: int) -> np.ndarray:
+    """
+    Divide o sinal em quadros sobrepostos sem copiar memória.
+    
+    Args:
+        audio: Sinal mono
+        frame_length: Tamanho de cada quadro em amostras
+        hop_length: Salto entre quadros em amostras
+    
+    Returns:
+        Visão 2D (n_quadros, frame_length) somente leitura
+    """
+    if audio.shape[0] < frame_length:
+        audio = np.pad(audio, (0, frame_length - audio.shape[0]))
+    n_frames = 1 + (audio.shape[0] - frame_length) // hop_length
+    return np.lib.stride_tricks.as_strided(
+        audio,
+        shape=(n_frames, frame_length),
+        strides=(audio.strides[0] * hop_length, audio.strides[0]),
+        writeable=False
+    )
+
+
+class StreamResampler:
+    """
+    Reamostrador polifásico incremental para blocos de áudio em tempo real.
+    
+    Interpola com um sinc janelado (Kaiser), como o libswresample usado
+    pelo ffmpeg (e portanto pelo `whisper.load_audio`): para a razão
+    racional L/M, a saída n fica no instante n·M/L da entrada e usa a fase
+    (n·M mod L) de uma tabela pré-calculada. Entre blocos fica guardado só
+    o histórico que os próximos filtros ainda usam, de modo que a saída é a
+    mesma do sinal processado de uma vez; `flush()` entrega as últimas
+    amostras, que dependem do fim do sinal.
+    """
+    
+    # Saídas calculadas por vez (limita a matriz de janelas em sinais longos)
+    MAX_BATCH = 16384
+    
+    def __init__(
+        self,
+        source_rate: int,
+        target_rate: int = 16000,
+        zero_crossings: int = 16,
+        cutoff: float = 0.97,
+        beta: float = 9.0
+    ):
+        """
+        Inicializa o reamostrador.
+        
+        Args:
+            source_rate: Taxa de amostragem de entrada em Hz
+            target_rate: Taxa de amostragem de saída em Hz
+            zero_crossings: Cruzamentos por zero do sinc de cada lado (na menor taxa)
+            cutoff: Corte do passa-baixas ao reduzir a taxa, como fração do novo Nyquist
+            beta: Parâmetro da janela de Kaiser
+        """
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        divisor = math.gcd(source_rate, target_rate)
+        self._up = target_rate // divisor
+        self._down = source_rate // divisor
+        
+        # Corte relativo ao Nyquist da entrada; ao aumentar a taxa, limitado a 1 como no libswresample
+        band = min(1.0, cutoff * self._up / self._down)
+        self._half = int(math.ceil(zero_crossings / band))
+        offsets = np.arange(-self._half + 1, self._half + 1)
+        # Distância de cada fase até as amostras de entrada usadas
+        distance = np.arange(self._up)[:, None] / self._up - offsets[None, :]
+        window = np.i0(beta * np.sqrt(np.clip(1.0 - (distance / self._half) ** 2, 0.0, None))) / np.i0(beta)
+        table = band * np.sinc(band * distance) * window
+        self._table = (table / table.sum(axis=1, keepdims=True)).astype(np.float32)
+        self.reset()
+    
+    def reset(self):
+        """Descarta o estado acumulado (início de um novo sinal)."""
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._start = 0  # posição absoluta de _buffer[0]
+        self._received = 0
+        self._primed = False
+        self._next = 0  # índice da próxima saída
+    
+    def process(self, block: np.ndarray) -> np.ndarray:
+        """
+        Reamostra um bloco.
+        
+        As saídas cujo filtro ainda precisa de amostras futuras ficam para
+        o próximo bloco (atraso de `zero_crossings` períodos da menor taxa).
+        
+        Args:
+            block: Amostras float32 na taxa de entrada
+        
+        Returns:
+            Amostras float32 na taxa de saída (quantidade varia por bloco)
+        """
+        block = np.asarray(block, dtype=np.float32).reshape(-1)
+        if self.source_rate == self.target_rate:
+            return block.copy()
+        self._buffer = np.concatenate((self._buffer, block))
+        self._received += block.shape[0]
+        if not self._primed:
+            if self._received < self._half:
+                return np.zeros(0, dtype=np.float32)
+            self._prime()
+        # Saída n usa a entrada até floor(n·M/L) + half, que já precisa ter chegado
+        end = -(-(self._received - self._half) * self._up // self._down)
+        return self._emit(end)
+        
+    def flush(self) -> np.ndarray:
+        """
+        Encerra o sinal e entrega as saídas restantes.
+        
+        O fim é estendido pelo espelho das últimas amostras, como no
+        libswresample. Depois disso o reamostrador volta ao estado inicial.
+        
+        Returns:
+            Amostras float32 finais; o total equivale a ceil(entradas · L/M)
+        """
+        if self.source_rate == self.target_rate or not self._received:
+            self.reset()
+            return np.zeros(0, dtype=np.float32)
+        if not self._primed:
+            self._prime()
+        mirror = self._buffer[::-1][:self._half]
+        self._buffer = np.concatenate((self._buffer, mirror, np.zeros(self._half - mirror.shape[0], dtype=np.float32)))
+        output = self._emit(-(-self._received * self._up // self._down))
+        self.reset()
+        return output
+    
+    def _prime(self):
+        """Estende o início pelo reflexo das primeiras amostras (sem repetir a primeira)."""
+        mirror = self._buffer[1:self._half][::-1]
+        padding = np.zeros(self._half - 1 - mirror.shape[0], dtype=np.float32)
+        self._buffer = np.concatenate((padding, mirror, self._buffer))
+        self._start = -(self._half - 1)
+        self._primed = True
+    
+    def _emit(self, end: int) -> np.ndarray:
+        """Calcula as saídas de `_next` até `end` (exclusivo) e descarta o histórico usado."""
+        parts = []
+        taps = np.arange(2 * self._half)
+        while self._next < end:
+            n = np.arange(self._next, min(end, self._next + self.MAX_BATCH))
+            first = n * self._down // self._up - self._half + 1 - self._start
+            windows = self._buffer[first[:, None] + taps]
+            parts.append(np.einsum("ij,ij->i", windows, self._table[n * self._down % self._up]))
+            self._next = int(n[-1]) + 1
+        
+        keep = self._next * self._down // self._up - self._half + 1
+        if keep > self._start:
+            self._buffer = self._buffer[keep - self._start:]
+            self._start = keep
+        return np.concatenate(parts).astype(np.float32) if parts else np.zeros(0, dtype=np.float32)
+
+
+class AudioPreprocessor:
+    """Classe para limpar e encurtar gravações antes do Whisper."""
+    
+    def __init__(
+        self,
+        trim_silence: bool = True,
+        silence_threshold_db: float = -40.0,
+        min_silence_padding: float = 0.2,
+        remove_dc: bool = True,
+        highpass_cutoff: Optional[float] = 80.0,
+        normalize: Optional[str] = "peak",
+        target_level_db: float = -1.0,
+        denoise: bool = False,
+        noise_reduction_db: float = 12.0,
+        frame_duration: float = 0.025
+    ):
+        """
+        Inicializa o pré-processador.
+        
+        Args:
+            trim_silence: Se True, remove silêncio no início e no fim
+            silence_threshold_db: Limiar (dB relativo ao pico) abaixo do qual um quadro é silêncio
+            min_silence_padding: Margem em segundos mantida antes/depois da fala
+            remove_dc: Se True, remove o offset DC
+            highpass_cutoff: Frequência de corte do passa-altas em Hz (None desativa)
+            normalize: 'peak', 'rms' ou None
+            target_level_db: Nível alvo da normalização em dBFS
+            denoise: Se True, aplica redução de ruído por spectral gating
+            noise_reduction_db: Atenuação aplicada aos componentes de ruído
+            frame_duration: Duração dos quadros de análise em segundos
+        """
+        if normalize not in (None, "peak", "rms"):
+            raise ValueError(f"Normalização inválida: {normalize}")
+        if silence_threshold_db >= 0:
+            raise ValueError(
+                f"silence_threshold_db deve ser negativo (relativo ao pico), recebido {silence_threshold_db}"
+            )
+        
+        self.trim_silence = trim_silence
+        self.silence_threshold_db = silence_threshold_db
+        self.min_silence_padding = min_silence_padding
+        self.remove_dc = remove_dc
+        self.highpass_cutoff = highpass_cutoff
+        self.normalize = normalize
+        self.target_level_db = target_level_db
+        self.denoise = denoise
+        self.noise_reduction_db = noise_reduction_db
+        self.frame_duration = frame_duration
+    
+    def process(self, audio: np.ndarray, sample_rate: int) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Aplica o pipeline configurado a um array de áudio.
+        
+        Args:
+            audio: Sinal mono (ou multicanal, que é convertido em mono)
+            sample_rate: Taxa de amostragem em Hz
+        
+        Returns:
+            Tupla (áudio processado em float32, relatório). Se o corte de
+            silêncio não encontrar fala, o áudio é devolvido sem alterações
+            e o relatório traz speech_detected=False.
+        """
+        start = time.perf_counter()
+        audio = np.asarray(audio, dtype=np.float32)
+        if audio.ndim > 1:
+            audio = audio.mean(axis=1)
+        original = audio
+        original_samples = audio.shape[0]
+        
+        if self.remove_dc and audio.size:
+            audio = audio - audio.mean()
+        
+        if self.highpass_cutoff and audio.size:
+            audio = self._highpass(audio, sample_rate)
+        
+        leading = trailing = 0
+        speech_detected = True
+        if self.trim_silence and audio.size:
+            trimmed = self._trim(audio, sample_rate)
+            if trimmed is None:
+                # Só silêncio: normalizar amplificaria o ruído de fundo
+                speech_detected = False
+                audio = original
+            else:
+                audio, leading, trailing = trimmed
+        
+        if self.denoise and speech_detected and audio.size:
+            audio = self._spectral_gate(audio, sample_rate)
+        
+        if self.normalize and speech_detected and audio.size:
+            audio = self._normalize(audio)
+        
+        removed = original_samples - audio.shape[0]
+        report = {
+            "sample_rate": sample_rate,
+            "original_seconds": original_samples / sample_rate,
+            "output_seconds": audio.shape[0] / sample_rate,
+            "removed_seconds": removed / sample_rate,
+            "leading_silence_seconds": leading / sample_rate,
+            "trailing_silence_seconds": trailing / sample_rate,
+            "removed_ratio": removed / original_samples if original_samples else 0.0,
+            "speech_detected": speech_detected,
+            "processing_seconds": time.perf_counter() - start,
+        }
+        return audio.astype(np.float32, copy=False), report
+    
+    def process_file(self, input_file: str, output_file: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Pré-processa um arquivo de áudio.
+        
+        Args:
+            input_file: Arquivo de entrada
+            output_file: Arquivo de saída (sobrescreve a entrada se None)
+        
+        Returns:
+            Relatório do processamento
+        """
+        audio, sample_rate = load_audio(input_file)
+        processed, report = self.process(audio, sample_rate)
+        save_audio(output_file or input_file, processed, sample_rate)
+        
+        if not report["speech_detected"]:
+            print("🔇 Pré-processamento: nenhuma fala detectada")
+            return report
+        print(
+            f"🧹 Pré-processamento: {report['original_seconds']:.2f}s → "
+            f"{report['output_seconds']:.2f}s "
+            f"({report['removed_ratio']:.0%} removido)"
+        )
+        return report
+    
+    def _highpass(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """Passa-altas no domínio da frequência com transição suave (cosseno)."""
+        n = audio.shape[0]
+        spectrum = np.fft.rfft(audio)
+        freqs = np.fft.rfftfreq(n, d=1.0 / sample_rate)
+        
+        cutoff = self.highpass_cutoff
+        gain = np.clip((freqs - cutoff / 2) / (cutoff / 2), 0.0, 1.0)
+        gain = 0.5 - 0.5 * np.cos(np.pi * gain)
+        
+        return np.fft.irfft(spectrum * gain, n=n).astype(np.float32)
+    
+    def _trim(self, audio: np.ndarray, sample_rate: int) -> Optional[Tuple[np.ndarray, int, int]]:
+        """Remove silêncio inicial e final com base na energia por quadro (None se não houver fala)."""
+        frame_length = max(1, int(self.frame_duration * sample_rate))
+        frames = frame_signal(audio, frame_length, frame_length)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float64), axis=1))
+        
+        peak = rms.max()
+        if peak <= 0:
+            return None
+        
+        threshold = peak * 10 ** (self.silence_threshold_db / 20)
+        voiced = np.flatnonzero(rms > threshold)
+        if voiced.size == 0:
+            return None
+        
+        padding = int(self.min_silence_padding * sample_rate)
+        begin = max(0, int(voiced[0]) * frame_length - padding)
+        end = min(audio.shape[0], (int(voiced[-1]) + 1) * frame_length + padding)
+        return audio[begin:end], begin, audio.shape[0] - end
+    
+    def _normalize(self, audio: np.ndarray) -> np.ndarray:
+        """Normaliza por pico ou RMS, limitando o pico em 0 dBFS."""
+        target = 10 ** (self.target_level_db / 20)
+        if self.normalize == "peak":
+            level = np.abs(audio).max()
+        else:
+            level = np.sqrt(np.mean(np.square(audio, dtype=np.float64)))
+        if level <= 0:
+            return audio
+        
+        gain = target / level
+        peak = np.abs(audio).max() * gain
+        if peak > 1.0:
+            gain /= peak
+        return audio * np.float32(gain)
+    
+    def _spectral_gate(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        """
+        Atenua bins da STFT abaixo do perfil de ruído estimado.
+        
+        O perfil é o percentil 20 da magnitude de cada frequência ao longo
+        do tempo, o que dispensa um trecho de "só ruído" separado.
+        """
+        n_fft = 512 if sample_rate <= 16000 else 1024
+        hop = n_fft // 4
+        window = np.hanning(n_fft).astype(np.float32)
+        
+        padded = np.pad(audio, (n_fft, n_fft + hop))
+        frames = frame_signal(padded, n_fft, hop) * window
+        spectrum = np.fft.rfft(frames, axis=1)
+        magnitude = np.abs(spectrum)
+        
+        noise_profile = np.percentile(magnitude, 20, axis=0)
+        threshold = noise_profile * 10 ** (6.0 / 20)
+        floor = 10 ** (-self.noise_reduction_db / 20)
+        mask = np.where(magnitude > threshold, 1.0, floor)
+        
+        # Suaviza a máscara no tempo para evitar "musical noise"
+        edged = np.pad(mask, ((1, 1), (0, 0)), mode="edge")
+        mask = (edged[:-2] + edged[1:-1] + edged[2:]) / 3
+        
+        frames_out = np.fft.irfft(spectrum * mask, n=n_fft, axis=1) * window
+        
+        # Overlap-add vetorizado: acumula cada quadro em sua posição
+        n_frames = frames_out.shape[0]
+        output = np.zeros(padded.shape[0], dtype=np.float64)
+        norm = np.zeros(padded.shape[0], dtype=np.float64)
+        index = (np.arange(n_frames)[:, None] * hop + np.arange(n_fft)[None, :]).ravel()
+        np.add.at(output, index, frames_out.ravel())
+        np.add.at(norm, index, np.tile(window ** 2, n_frames))
+        
+        output /= np.maximum(norm, 1e-8)
+        return output[n_fft:n_fft + audio.shape[0]].astype(np.float32)
+
+
+def measure_decode_savings(
+    transcribe: Callable[[str], Any],
+    original_file: str,
+    decode_seconds: float
+) -> Dict[str, float]:
+    """
+    Mede o tempo de transcrição economizado pelo pré-processamento.
+    
+    Transcreve também o áudio original e compara com o tempo já medido no
+    áudio processado. Em clipes de até 30 s o encoder custa o mesmo (o
+    Whisper preenche a janela); a diferença vem da decodificação (tokens
+    gerados, segmentos e fallbacks de temperatura em trechos de silêncio).
+    Custa uma transcrição extra por chamada.
+    
+    Args:
+        transcribe: Função que transcreve um arquivo
+        original_file: Arquivo antes do pré-processamento
+        decode_seconds: Tempo gasto para transcrever o áudio processado
+    
+    Returns:
+        Dicionário com original_decode_seconds e decode_savings_seconds
+        (negativo se o áudio processado demorou mais)
+    """
+    start = time.perf_counter()
+    transcribe(original_file)
+    original_seconds = time.perf_counter() - start
+    return {
+        "original_decode_seconds": original_seconds,
+        "decode_savings_seconds": original_seconds - decode_seconds,
+    }
+
+
+def load_audio(audio_file: str) -> Tuple[np.ndarray, int]:
+    """
+    Carrega um arquivo de áudio como float32 mono.
+    
+    Args:
+        audio_file: Caminho do arquivo
+    
+    Returns:
+        Tupla (amostras, taxa de amostragem)
+    """
+    if SOUNDFILE_AVAILABLE:
+        audio, sample_rate = sf.read(audio_file, dtype="float32", always_2d=True)
+        return audio.mean(axis=1), sample_rate
+    
+    with wave.open(audio_file, "rb") as wf:
+        if wf.getsampwidth() != 2:
+            raise ValueError("Sem 'soundfile', apenas WAV PCM 16 bits é suportado.")
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        pcm = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    
+    audio = pcm.reshape(-1, channels).mean(axis=1) / 32768.0
+    return audio.astype(np.float32), sample_rate
+
+
+def save_audio(audio_file: str, audio: np.ndarray, sample_rate: int):
+    """
+    Salva amostras float32 mono em WAV.
+    
+    Args:
+        audio_file: Caminho do arquivo
+        audio: Amostras no intervalo [-1, 1]
+        sample_rate: Taxa de amostragem em Hz
+    """
+    if SOUNDFILE_AVAILABLE:
+        sf.write(audio_file, audio, sample_rate)
+        return
+    
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(audio_file, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm.tobytes())
+
+
+def preprocess_audio(input_file: str, output_file: Optional[str] = None, **options) -> Dict[str, Any]:
+    """
+    Função auxiliar para pré-processar um arquivo rapidamente.
+    
+    Args:
+        input_file: Arquivo de entrada
+        output_file: Arquivo de saída (sobrescreve a entrada se None)
+        **options: Parâmetros repassados ao AudioPreprocessor
+    
+    Returns:
+        Relatório do processamento
+    """
+    return AudioPreprocessor(**options).process_file(input_file, output_file)
+
+
+if __name__ == "__main__":
+    # Teste do módulo
+    import sys
+    
+    if len(sys.argv) > 1:
+        report = preprocess_audio(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None, denoise=True)
+        print(f"\n✅ Relatório: {report}")
+    else:
+        print("Uso: python audio_preprocessing.py <entrada> [saída]")
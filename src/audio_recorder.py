@@ -1,12 +1,22 @@
 """
 Módulo para gravação de áudio via microfone.
 Suporta tanto PyAudio quanto SoundDevice.
+
+A captura é feita por callback: cada bloco recebido do dispositivo é
+copiado para um buffer circular NumPy pré-alocado, sem listas de bytes
+intermediárias. A sessão do dispositivo é aberta sob demanda e reutilizada
+entre gravações. Opcionalmente, o log-mel do Whisper é calculado bloco a
+bloco durante a captura.
 """
 
 import os
 import wave
+import threading
 import numpy as np
-from typing import Optional
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .log_mel import LogMelFeatures
 
 try:
     import sounddevice as sd
@@ -21,93 +31,338 @@ try:
 except ImportError:
     PYAUDIO_AVAILABLE = False
 
+# Tempo sem receber blocos após o qual o dispositivo é considerado travado
+STALL_TIMEOUT = 5.0
+
+
+class RingBuffer:
+    """Buffer circular float32 pré-alocado para amostras de áudio mono."""
+    
+    def __init__(self, capacity: int):
+        """
+        Inicializa o buffer.
+        
+        Args:
+            capacity: Número máximo de amostras armazenadas
+        """
+        self._data = np.zeros(capacity, dtype=np.float32)
+        self._lock = threading.Lock()
+        self._write_pos = 0
+        self.total_written = 0
+    
+    @property
+    def capacity(self) -> int:
+        """Capacidade do buffer em amostras."""
+        return self._data.shape[0]
+    
+    def __len__(self) -> int:
+        return min(self.total_written, self.capacity)
+    
+    def reset(self):
+        """Descarta o conteúdo sem realocar memória."""
+        with self._lock:
+            self._write_pos = 0
+            self.total_written = 0
+    
+    def write(self, samples: np.ndarray, scale: float = 1.0):
+        """
+        Copia amostras para o buffer, sobrescrevendo as mais antigas se cheio.
+        
+        Args:
+            samples: Bloco de amostras (qualquer dtype numérico)
+            scale: Fator aplicado durante a cópia (ex.: 1/32768 para int16)
+        """
+        samples = samples.reshape(-1)
+        received = samples.shape[0]
+        # Só a cauda cabe no buffer, mas a contagem inclui o bloco inteiro
+        if received > self.capacity:
+            samples = samples[-self.capacity:]
+        n = samples.shape[0]
+        
+        with self._lock:
+            start = (self._write_pos + received - n) % self.capacity
+            first = min(n, self.capacity - start)
+            np.multiply(samples[:first], scale, out=self._data[start:start + first], casting="unsafe")
+            if first < n:
+                np.multiply(samples[first:], scale, out=self._data[:n - first], casting="unsafe")
+            self._write_pos = (start + n) % self.capacity
+            self.total_written += received
+    
+    def latest(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Retorna uma cópia das últimas `n` amostras em ordem cronológica.
+        
+        Args:
+            n: Quantidade de amostras (padrão: todo o conteúdo válido)
+        
+        Returns:
+            Array float32 com as amostras
+        """
+        with self._lock:
+            return self._tail(n)
+    
+    def since(self, position: int) -> Tuple[np.ndarray, int]:
+        """
+        Retorna as amostras escritas a partir de uma posição absoluta.
+        
+        A posição conta todas as amostras já escritas (`total_written`);
+        amostras sobrescritas pelo buffer circular são omitidas.
+        
+        Args:
+            position: Posição absoluta da primeira amostra desejada
+        
+        Returns:
+            Tupla (cópia das amostras, posição absoluta do fim)
+        """
+        with self._lock:
+            return self._tail(max(0, self.total_written - position)), self.total_written
+    
+    def _tail(self, n: Optional[int]) -> np.ndarray:
+        """Copia as últimas `n` amostras (chamar com o lock adquirido)."""
+        available = min(self.total_written, self.capacity)
+        n = available if n is None else min(n, available)
+        end = self._write_pos
+        start = end - n
+        if start >= 0:
+            return self._data[start:end].copy()
+        return np.concatenate((self._data[start:], self._data[:end]))
+
 
 class AudioRecorder:
     """Classe para gravar áudio do microfone."""
     
-    def __init__(self, sample_rate: int = 44100):
+    def __init__(
+        self,
+        sample_rate: int = 44100,
+        chunk_size: int = 1024,
+        device_index: Optional[int] = None,
+        compute_features: bool = False,
+        n_mels: int = 80
+    ):
         """
         Inicializa o gravador de áudio.
         
         Args:
             sample_rate: Taxa de amostragem em Hz (padrão: 44100)
+            chunk_size: Amostras por bloco entregue pelo callback
+            device_index: Índice do dispositivo de entrada (None = padrão)
+            compute_features: Se True, calcula o log-mel do Whisper durante a captura
+            n_mels: Bandas mel das features (80; 128 para o large-v3)
         """
         self.sample_rate = sample_rate
+        self.chunk_size = chunk_size
+        self.device_index = device_index
         
+        self._pyaudio = None
+        self._buffer: Optional[RingBuffer] = None
+        self._stop_event = threading.Event()
+        self._block_listeners: List[Callable[[np.ndarray], None]] = []
+        self._features = None
+        if compute_features:
+            # Importado sob demanda: traz o Whisper e o PyTorch
+            from .log_mel import LogMelExtractor
+            self._features = LogMelExtractor(sample_rate, n_mels)
+    
     def record(self, duration: int = 5, output_file: str = "audio.wav") -> str:
         """
         Grava áudio do microfone.
         
+        A gravação termina após `duration` segundos ou quando `stop()` for
+        chamado a partir de outra thread.
+        
         Args:
-            duration: Duração da gravação em segundos
+            duration: Duração máxima da gravação em segundos
             output_file: Caminho do arquivo de saída
-            
+        
         Returns:
             Caminho do arquivo de áudio gravado
         """
+        if duration <= 0:
+            raise ValueError(f"Duração da gravação deve ser positiva (recebido {duration}).")
+        
         print(f"🎤 Gravando por {duration} segundos...")
         
         if SOUNDDEVICE_AVAILABLE:
-            return self._record_sounddevice(duration, output_file)
+            self._record_sounddevice(duration)
         elif PYAUDIO_AVAILABLE:
-            return self._record_pyaudio(duration, output_file)
+            self._record_pyaudio(duration)
         else:
             raise RuntimeError(
                 "Nenhuma biblioteca de áudio disponível. "
                 "Instale 'sounddevice' ou 'pyaudio'."
             )
+        
+        self._save(output_file)
+        print(f"✅ Áudio salvo em: {output_file}")
+        return output_file
+    
+    def stop(self):
+        """Interrompe a gravação em andamento antes do tempo previsto."""
+        self._stop_event.set()
     
-    def _record_sounddevice(self, duration: int, output_file: str) -> str:
+    def get_audio(self) -> np.ndarray:
+        """
+        Retorna as amostras da última gravação.
+        
+        Returns:
+            Array float32 mono no intervalo [-1, 1]
+        """
+        if self._buffer is None:
+            return np.zeros(0, dtype=np.float32)
+        return self._buffer.latest()
+    
+    def get_features(self) -> "LogMelFeatures":
+        """
+        Retorna o log-mel da última gravação, calculado durante a captura.
+        
+        Returns:
+            LogMelFeatures aceito por `SpeechToText.transcribe`
+        """
+        if self._features is None:
+            raise RuntimeError("Gravador criado sem compute_features=True.")
+        return self._features.finish()
+    
+    def add_block_listener(self, listener: Callable[[np.ndarray], None]):
+        """
+        Registra uma função chamada a cada bloco capturado.
+        
+        O listener roda na thread de áudio e recebe o bloco float32; deve
+        ser rápido e não pode guardar referência ao array recebido.
+        
+        Args:
+            listener: Função que recebe o bloco de amostras
+        """
+        self._block_listeners.append(listener)
+    
+    def remove_block_listener(self, listener: Callable[[np.ndarray], None]):
+        """Remove um listener registrado com `add_block_listener`."""
+        self._block_listeners.remove(listener)
+    
+    def close(self):
+        """Libera a sessão do dispositivo de áudio."""
+        if self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _prepare(self, duration: float) -> int:
+        """Reaproveita (ou cresce) o buffer e rearma o evento de parada."""
+        needed = int(duration * self.sample_rate)
+        if self._buffer is None or self._buffer.capacity < needed:
+            self._buffer = RingBuffer(needed)
+        else:
+            self._buffer.reset()
+        if self._features is not None:
+            self._features.reset(duration)
+        self._stop_event.clear()
+        return needed
+    
+    def _on_block(self, block: np.ndarray, scale: float = 1.0):
+        """Copia um bloco capturado para o buffer, atualiza o log-mel e notifica os listeners."""
+        self._buffer.write(block, scale)
+        if self._block_listeners or self._features is not None:
+            samples = block.reshape(-1)
+            if scale != 1.0:
+                samples = samples * np.float32(scale)
+            if self._features is not None:
+                self._features.process(samples)
+            for listener in self._block_listeners:
+                listener(samples)
+    
+    def _wait_finished(self):
+        """
+        Aguarda o fim da gravação (duração atingida ou `stop()`).
+        
+        Não há limite fixo de tempo: um dispositivo que demora a iniciar não
+        encurta a gravação. Só desiste se nenhum bloco chegar por
+        STALL_TIMEOUT segundos seguidos após o primeiro intervalo.
+        """
+        last = -1
+        while not self._stop_event.wait(STALL_TIMEOUT):
+            written = self._buffer.total_written
+            if written == last:
+                print("⚠️  O dispositivo de áudio parou de enviar amostras; encerrando a gravação.")
+                return
+            last = written
+    
+    def _get_pyaudio(self):
+        """Abre a sessão PyAudio na primeira utilização."""
+        if self._pyaudio is None:
+            self._pyaudio = pyaudio.PyAudio()
+        return self._pyaudio
+    
+    def _record_sounddevice(self, duration: float):
         """Grava usando sounddevice (recomendado)."""
-        recording = sd.rec(
-            int(duration * self.sample_rate),
+        needed = self._prepare(duration)
+        
+        def callback(indata, frames, time_info, status):
+            remaining = needed - self._buffer.total_written
+            if remaining <= 0:
+                raise sd.CallbackStop()
+            self._on_block(indata[:remaining, 0])
+        
+        stream = sd.InputStream(
             samplerate=self.sample_rate,
             channels=1,
-            dtype='float32'
+            dtype='float32',
+            blocksize=self.chunk_size,
+            device=self.device_index,
+            callback=callback,
+            finished_callback=self._stop_event.set
         )
-        sd.wait()
-        
-        # Salva o arquivo
-        sf.write(output_file, recording, self.sample_rate)
-        print(f"✅ Áudio salvo em: {output_file}")
-        return output_file
+        with stream:
+            self._wait_finished()
     
-    def _record_pyaudio(self, duration: int, output_file: str) -> str:
+    def _record_pyaudio(self, duration: float):
         """Grava usando PyAudio."""
-        CHUNK = 1024
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
+        needed = self._prepare(duration)
         
-        p = pyaudio.PyAudio()
+        def callback(in_data, frame_count, time_info, status):
+            samples = np.frombuffer(in_data, dtype=np.int16)
+            remaining = needed - self._buffer.total_written
+            if remaining > 0:
+                self._on_block(samples[:remaining], 1.0 / 32768)
+            if remaining <= frame_count:
+                self._stop_event.set()
+                return (None, pyaudio.paComplete)
+            return (None, pyaudio.paContinue)
         
-        stream = p.open(
-            format=FORMAT,
-            channels=CHANNELS,
+        stream = self._get_pyaudio().open(
+            format=pyaudio.paInt16,
+            channels=1,
             rate=self.sample_rate,
             input=True,
-            frames_per_buffer=CHUNK
+            input_device_index=self.device_index,
+            frames_per_buffer=self.chunk_size,
+            stream_callback=callback
         )
         
-        frames = []
-        
-        for i in range(0, int(self.sample_rate / CHUNK * duration)):
-            data = stream.read(CHUNK)
-            frames.append(data)
+        try:
+            self._wait_finished()
+        finally:
+            stream.stop_stream()
+            stream.close()
+    
+    def _save(self, output_file: str):
+        """Salva a última gravação em WAV."""
+        audio = self.get_audio()
         
-        stream.stop_stream()
-        stream.close()
-        p.terminate()
+        if SOUNDDEVICE_AVAILABLE:
+            sf.write(output_file, audio, self.sample_rate)
+            return
         
-        # Salva o arquivo WAV
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
         wf = wave.open(output_file, 'wb')
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(p.get_sample_size(FORMAT))
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
         wf.setframerate(self.sample_rate)
-        wf.writeframes(b''.join(frames))
+        wf.writeframes(pcm.tobytes())
         wf.close()
-        
-        print(f"✅ Áudio salvo em: {output_file}")
-        return output_file
 
 
 def record_audio(duration: int = 5, output_file: str = "audio.wav") -> str:
@@ -117,12 +372,12 @@ def record_audio(duration: int = 5, output_file: str = "audio.wav") -> str:
     Args:
         duration: Duração em segundos
         output_file: Arquivo de saída
-        
+    
     Returns:
         Caminho do arquivo gravado
     """
-    recorder = AudioRecorder()
-    return recorder.record(duration, output_file)
+    with AudioRecorder() as recorder:
+        return recorder.record(duration, output_file)
 
 
 if __name__ == "__main__":
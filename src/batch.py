@@ -0,0 +1,481 @@
+"""
+Processamento em lote: transcrição (e opcionalmente resposta e síntese)
+de diretórios ou manifestos com milhares de arquivos de áudio.
+
+Cada arquivo concluído vira uma linha no JSONL de saída, gravada assim que
+fica pronta. O próprio JSONL serve de checkpoint: ao reiniciar, arquivos
+já concluídos com sucesso são pulados e os que falharam são refeitos; o
+JSONL é compactado para manter um único registro (o mais recente) por
+arquivo.
+
+Uso:
+    python -m src.batch <diretório|manifesto> -o resultados.jsonl [--answer] [--tts]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from .worker_pool import TranscriptionWorkerPool
+from .llm_scheduler import LLMScheduler
+
+AUDIO_EXTENSIONS = {".wav", ".mp3", ".m4a", ".flac", ".ogg", ".opus", ".webm", ".aac"}
+
+
+def discover_inputs(source: str) -> Iterator[str]:
+    """
+    Lista os arquivos de áudio de um diretório ou manifesto.
+    
+    O manifesto pode ser um arquivo texto (um caminho por linha) ou JSONL
+    com o campo "path". Caminhos relativos são resolvidos a partir do
+    diretório do manifesto.
+    
+    Args:
+        source: Diretório ou arquivo de manifesto
+    
+    Yields:
+        Caminhos dos arquivos de áudio, em ordem estável
+    """
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() in AUDIO_EXTENSIONS:
+                    yield os.path.join(root, name)
+        return
+    
+    base_dir = os.path.dirname(os.path.abspath(source))
+    with open(source, "r", encoding="utf-8") as manifest:
+        for line in manifest:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            path = json.loads(line)["path"] if line.startswith("{") else line
+            yield path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+
+def normalize_path(path: str) -> str:
+    """Chave estável de um caminho (absoluto, normalizado)."""
+    return os.path.normcase(os.path.abspath(path))
+
+
+def load_completed(output_file: str) -> Set[str]:
+    """
+    Lê o JSONL de saída e retorna os arquivos já concluídos com sucesso.
+    
+    Vale o registro mais recente de cada arquivo. Uma última linha truncada
+    (interrupção durante a escrita) é ignorada.
+    
+    Args:
+        output_file: Arquivo JSONL de resultados
+    
+    Returns:
+        Conjunto de caminhos concluídos (normalizados com `normalize_path`)
+    """
+    completed: Set[str] = set()
+    for _, key, record in _iter_results(output_file):
+        if record.get("error"):
+            completed.discard(key)
+        else:
+            completed.add(key)
+    return completed
+
+
+def compact_results(output_file: str) -> int:
+    """
+    Reescreve o JSONL com um único registro por arquivo (o mais recente).
+    
+    Falhas refeitas em uma retomada geram um novo registro para o mesmo
+    caminho; a compactação descarta os anteriores. O arquivo é lido em
+    duas passadas (só a linha final de cada caminho fica em memória) e a
+    troca é atômica (os.replace).
+    
+    Args:
+        output_file: Arquivo JSONL de resultados
+    
+    Returns:
+        Número de registros duplicados (ou linhas truncadas) removidos
+    """
+    if not os.path.exists(output_file):
+        return 0
+    last_line: Dict[str, int] = {}
+    for index, key, _ in _iter_results(output_file):
+        last_line[key] = index
+    with open(output_file, "r", encoding="utf-8") as results:
+        lines = sum(1 for _ in results)
+    if len(last_line) == lines:
+        return 0
+    
+    keep = set(last_line.values())
+    del last_line
+    temp_file = output_file + ".tmp"
+    with open(output_file, "r", encoding="utf-8") as results, \
+            open(temp_file, "w", encoding="utf-8") as compacted:
+        for index, line in enumerate(results):
+            if index in keep:
+                compacted.write(line if line.endswith("\n") else line + "\n")
+        compacted.flush()
+        os.fsync(compacted.fileno())
+    os.replace(temp_file, output_file)
+    return lines - len(keep)
+
+
+def _iter_results(output_file: str) -> Iterator[Tuple[int, str, Dict[str, Any]]]:
+    """Percorre o JSONL: (número da linha, caminho normalizado, registro); ignora linhas inválidas."""
+    if not os.path.exists(output_file):
+        return
+    with open(output_file, "r", encoding="utf-8") as results:
+        for index, line in enumerate(results):
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            yield index, normalize_path(record["path"]), record
+
+
+class BatchStats:
+    """Contadores de vazão do lote."""
+    
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.files = 0
+        self.failed = 0
+        self.skipped = 0
+        self.audio_seconds = 0.0
+        self._lock = threading.Lock()
+    
+    def add(self, record: Dict[str, Any]):
+        """Contabiliza um resultado."""
+        with self._lock:
+            self.files += 1
+            if record.get("error"):
+                self.failed += 1
+            self.audio_seconds += record.get("audio_seconds") or 0.0
+    
+    def summary(self) -> Dict[str, float]:
+        """
+        Retorna a vazão atual.
+        
+        Returns:
+            Dicionário com arquivos/hora e horas de áudio/hora
+        """
+        elapsed = time.perf_counter() - self.start
+        hours = elapsed / 3600 if elapsed else float("inf")
+        return {
+            "files": self.files,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": elapsed,
+            "audio_hours": self.audio_seconds / 3600,
+            "files_per_hour": self.files / hours,
+            "audio_hours_per_hour": self.audio_seconds / 3600 / hours,
+        }
+
+
+class BatchProcessor:
+    """Pipeline em lote: transcrição → resposta (opcional) → síntese (opcional)."""
+    
+    def __init__(
+        self,
+        output_file: str,
+        whisper_model: str = "small",
+        language: Optional[str] = "pt",
+        answer: bool = False,
+        chatgpt_model: str = "gpt-4",
+        system_prompt: Optional[str] = None,
+        api_key: Optional[str] = None,
+        tts: bool = False,
+        tts_dir: str = "output/batch",
+        transcribe_workers: int = 1,
+        answer_workers: int = 4,
+        tts_workers: int = 4,
+        max_in_flight: Optional[int] = None,
+        torch_threads: int = 1,
+        report_every: int = 100,
+        llm_scheduler: Optional[LLMScheduler] = None
+    ):
+        """
+        Inicializa o processador em lote.
+        
+        Args:
+            output_file: Arquivo JSONL de resultados (também usado como checkpoint)
+            whisper_model: Modelo Whisper
+            language: Idioma (None = detecção automática)
+            answer: Se True, envia cada transcrição ao ChatGPT
+            chatgpt_model: Modelo ChatGPT
+            system_prompt: Prompt do sistema para as respostas
+            api_key: API Key OpenAI
+            tts: Se True, sintetiza as respostas (requer answer=True)
+            tts_dir: Diretório dos áudios sintetizados
+            transcribe_workers: Workers do pool prefork de transcrição
+            answer_workers: Threads de chamadas ao ChatGPT
+            tts_workers: Threads de síntese de voz
+            max_in_flight: Arquivos em processamento simultâneo (limita a memória)
+            torch_threads: Threads do PyTorch por processo de transcrição
+            report_every: Intervalo (em arquivos) entre relatórios de vazão
+            llm_scheduler: Agendador compartilhado (as chamadas entram com prioridade 'batch')
+        """
+        if tts and not answer:
+            raise ValueError("A síntese em lote requer answer=True.")
+        
+        self.output_file = output_file
+        self.whisper_model = whisper_model
+        self.language = language
+        self.answer = answer
+        self.chatgpt_model = chatgpt_model
+        self.system_prompt = system_prompt
+        self.api_key = api_key
+        self.tts = tts
+        self.tts_dir = tts_dir
+        self.transcribe_workers = transcribe_workers
+        self.answer_workers = answer_workers
+        self.tts_workers = tts_workers
+        self.max_in_flight = max_in_flight or 4 * (transcribe_workers + answer_workers + tts_workers)
+        self.torch_threads = torch_threads
+        self.report_every = report_every
+        self.llm_scheduler = llm_scheduler
+        
+        self.stats = BatchStats()
+        self._write_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._local = threading.local()
+        self._tts_instances: List[Any] = []
+        self._transcribers: Optional[TranscriptionWorkerPool] = None
+    
+    def start(self) -> TranscriptionWorkerPool:
+        """
+        Carrega o modelo e cria o pool de transcrição (se ainda não criado).
+        
+        O pool bifurca seu zigoto ao ser criado; chame antes de iniciar
+        outras threads no processo (ex.: o LLMScheduler).
+        
+        Returns:
+            Pool de transcrição
+        """
+        if self._transcribers is None:
+            import whisper
+            print(f"📥 Carregando modelo Whisper '{self.whisper_model}'...")
+            model = whisper.load_model(self.whisper_model)
+            
+            # Os workers herdam o modelo do processo pai (prefork, copy-on-write)
+            self._transcribers = TranscriptionWorkerPool(
+                model,
+                workers=self.transcribe_workers,
+                language=self.language,
+                torch_threads=self.torch_threads
+            )
+        return self._transcribers
+    
+    def run(self, paths: Iterable[str]) -> Dict[str, float]:
+        """
+        Processa os arquivos, pulando os já concluídos no JSONL de saída.
+        
+        Args:
+            paths: Caminhos dos arquivos de áudio
+        
+        Returns:
+            Resumo de vazão
+        """
+        removed = compact_results(self.output_file)
+        if removed:
+            print(f"🧹 {removed} registros repetidos removidos de {self.output_file}")
+        completed = load_completed(self.output_file)
+        if completed:
+            print(f"⏩ Retomando: {len(completed)} arquivos já concluídos")
+        if self.tts:
+            os.makedirs(self.tts_dir, exist_ok=True)
+        
+        transcribers = self.start()
+        self._answerers = ThreadPoolExecutor(max_workers=self.answer_workers)
+        self._synthesizers = ThreadPoolExecutor(max_workers=self.tts_workers)
+        
+        with open(self.output_file, "a", encoding="utf-8") as self._output:
+            try:
+                for path in paths:
+                    if normalize_path(path) in completed:
+                        self.stats.skipped += 1
+                        continue
+                    self._slots.acquire()
+                    started = time.perf_counter()
+                    future = transcribers.submit(path)
+                    future.add_done_callback(
+                        lambda f, path=path, started=started: self._after_transcription(path, started, f)
+                    )
+                
+                # Aguarda os arquivos em andamento
+                for _ in range(self.max_in_flight):
+                    self._slots.acquire()
+            finally:
+                transcribers.close()
+                self._transcribers = None
+                self._answerers.shutdown(wait=True)
+                self._synthesizers.shutdown(wait=True)
+                for tts in self._tts_instances:
+                    tts.close()
+        compact_results(self.output_file)
+        
+        summary = self.stats.summary()
+        self._print_summary(summary)
+        return summary
+    
+    def _after_transcription(self, path: str, started: float, future: Future):
+        """Encaminha o resultado da transcrição para a próxima etapa."""
+        record: Dict[str, Any] = {"path": path}
+        try:
+            result = future.result()
+            record["transcription"] = result["text"]
+            record["language"] = result["language"]
+            record["audio_seconds"] = result["audio_seconds"]
+        except Exception as e:
+            record["error"] = f"transcrição: {e}"
+            return self._finish(record, started)
+        
+        if not self.answer:
+            return self._finish(record, started)
+        
+        self._hand_off(self._answerers, self._answer, record, started, "resposta")
+    
+    def _answer(self, record: Dict[str, Any], started: float):
+        """Obtém a resposta do ChatGPT (um cliente por thread, sem histórico entre arquivos)."""
+        try:
+            client = getattr(self._local, "client", None)
+            if client is None:
+                from .chatgpt_client import ChatGPTClient
+                client = self._local.client = ChatGPTClient(
+                    api_key=self.api_key,
+                    model=self.chatgpt_model,
+                    scheduler=self.llm_scheduler,
+                    priority="batch"
+                )
+            client.conversation_history = []  # cada arquivo é independente (sem log por arquivo)
+            record["answer"] = client.send_message(record["transcription"], system_prompt=self.system_prompt)
+        except Exception as e:
+            record["error"] = f"resposta: {e}"
+            return self._finish(record, started)
+        
+        if not self.tts:
+            return self._finish(record, started)
+        
+        self._hand_off(self._synthesizers, self._synthesize, record, started, "síntese")
+    
+    def _synthesize(self, record: Dict[str, Any], started: float):
+        """Sintetiza a resposta em um arquivo com nome estável por entrada."""
+        try:
+            digest = hashlib.sha1(record["path"].encode("utf-8")).hexdigest()[:10]
+            stem = os.path.splitext(os.path.basename(record["path"]))[0]
+            output_audio = os.path.join(self.tts_dir, f"{stem}-{digest}.mp3")
+            self._get_tts().synthesize(
+                record["answer"],
+                output_file=output_audio,
+                language=record.get("language") or self.language or "pt"
+            )
+            record["output_audio"] = output_audio
+        except Exception as e:
+            record["error"] = f"síntese: {e}"
+        self._finish(record, started)
+    
+    def _get_tts(self):
+        """Sintetizador da thread atual (reaproveita as sessões HTTP entre arquivos)."""
+        tts = getattr(self._local, "tts", None)
+        if tts is None:
+            from .text_to_speech import TextToSpeech
+            tts = self._local.tts = TextToSpeech(language=self.language or "pt")
+            with self._write_lock:
+                self._tts_instances.append(tts)
+        return tts
+    
+    def _hand_off(self, executor: ThreadPoolExecutor, fn, record: Dict[str, Any], started: float, stage: str):
+        """Passa o arquivo para a próxima etapa; se ela recusar, registra a falha e libera a vaga."""
+        try:
+            executor.submit(fn, record, started)
+        except Exception as e:  # ex.: executor já encerrado
+            record["error"] = f"{stage}: {e}"
+            self._finish(record, started)
+    
+    def _finish(self, record: Dict[str, Any], started: float):
+        """Grava o resultado no JSONL e libera a vaga do arquivo (mesmo se a escrita falhar)."""
+        try:
+            record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+            line = json.dumps(record, ensure_ascii=False)
+        
+            with self._write_lock:
+                self._output.write(line + "\n")
+                self._output.flush()
+                self.stats.add(record)
+                if self.stats.files % self.report_every == 0:
+                    os.fsync(self._output.fileno())
+                    self._print_summary(self.stats.summary())
+        finally:
+            self._slots.release()
+    
+    @staticmethod
+    def _print_summary(summary: Dict[str, float]):
+        """Exibe a vazão acumulada."""
+        print(
+            f"📊 {summary['files']} arquivos ({summary['failed']} falhas, "
+            f"{summary['skipped']} pulados) | "
+            f"{summary['files_per_hour']:.0f} arquivos/h | "
+            f"{summary['audio_hours_per_hour']:.2f} h de áudio/h"
+        )
+
+
+def main(argv: Optional[List[str]] = None):
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description="Transcrição (e respostas) em lote.")
+    parser.add_argument("source", help="Diretório de áudios ou manifesto (txt/JSONL)")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="JSONL de resultados")
+    parser.add_argument("--whisper-model", default=os.getenv("WHISPER_MODEL", "small"))
+    parser.add_argument("--language", default=os.getenv("DEFAULT_LANGUAGE", "pt"),
+                        help="Idioma ('auto' para detecção automática)")
+    parser.add_argument("--answer", action="store_true", help="Envia cada transcrição ao ChatGPT")
+    parser.add_argument("--chat-model", default=os.getenv("DEFAULT_MODEL", "gpt-4"))
+    parser.add_argument("--system-prompt", default=None)
+    parser.add_argument("--tts", action="store_true", help="Sintetiza as respostas")
+    parser.add_argument("--tts-dir", default="output/batch")
+    parser.add_argument("--transcribe-workers", type=int, default=1)
+    parser.add_argument("--answer-workers", type=int, default=4)
+    parser.add_argument("--tts-workers", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=None)
+    parser.add_argument("--torch-threads", type=int, default=1)
+    parser.add_argument("--rpm", type=float, default=None, help="Limite de requisições/min ao ChatGPT")
+    parser.add_argument("--tpm", type=float, default=None, help="Limite de tokens/min ao ChatGPT")
+    args = parser.parse_args(argv)
+    
+    processor = BatchProcessor(
+        output_file=args.output,
+        whisper_model=args.whisper_model,
+        language=None if args.language == "auto" else args.language,
+        answer=args.answer or args.tts,
+        chatgpt_model=args.chat_model,
+        system_prompt=args.system_prompt,
+        tts=args.tts,
+        tts_dir=args.tts_dir,
+        transcribe_workers=args.transcribe_workers,
+        answer_workers=args.answer_workers,
+        tts_workers=args.tts_workers,
+        max_in_flight=args.max_in_flight,
+        torch_threads=args.torch_threads
+    )
+    # O pool (e seu zigoto) nasce antes da thread de despacho do agendador
+    processor.start()
+    if args.rpm or args.tpm:
+        processor.llm_scheduler = LLMScheduler(
+            requests_per_minute=args.rpm or 500,
+            tokens_per_minute=args.tpm or 90000,
+            max_concurrency=args.answer_workers
+        )
+    processor.run(discover_inputs(args.source))
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏸️ Interrompido. Execute novamente para retomar do checkpoint.")
+        sys.exit(130)
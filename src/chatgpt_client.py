@@ -3,20 +3,43 @@ Módulo para integração com a API do ChatGPT (OpenAI).
 """
 
 import os
+import time
 import openai
 from typing import List, Dict, Optional
+from .llm_scheduler import LLMScheduler, estimate_tokens
+from .model_cascade import ModelCascade
+from .session_store import SessionStore
 
 
 class ChatGPTClient:
     """Cliente para interação com a API do ChatGPT."""
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "gpt-4"):
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: str = "gpt-4",
+        scheduler: Optional[LLMScheduler] = None,
+        priority: str = "interactive",
+        timeout: Optional[float] = None,
+        cascade: Optional[ModelCascade] = None,
+        session_store: Optional[SessionStore] = None,
+        session_id: Optional[str] = None,
+        history_window: int = 20
+    ):
         """
         Inicializa o cliente ChatGPT.
         
         Args:
             api_key: Chave da API OpenAI (usa variável de ambiente se None)
-            model: Modelo a ser usado (gpt-3.5-turbo, gpt-4, etc.)
+            model: Modelo a ser usado (gpt-3.5-turbo, gpt-4, etc.; 'auto' = cascata rápido/forte)
+            scheduler: Agendador compartilhado (limites RPM/TPM); None = chamadas diretas
+            priority: Classe de prioridade no agendador ('interactive', 'default', 'batch')
+            timeout: Prazo em segundos para a chamada sair da fila do agendador
+            cascade: Roteador entre modelo rápido e forte (ignora `model`)
+            session_store: Armazenamento durável das sessões de conversa
+            session_id: Sessão a retomar/criar no armazenamento
+            history_window: Turnos recentes carregados ao retomar uma sessão, mantidos
+                em memória e enviados a cada chamada (0 = histórico completo)
         """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         
@@ -28,10 +51,67 @@ class ChatGPTClient:
         
         openai.api_key = self.api_key
         self.model = model
+        self.scheduler = scheduler
+        self.priority = priority
+        self.timeout = timeout
+        self.language: Optional[str] = None
+        
+        if cascade is None and model == "auto":
+            cascade = ModelCascade(
+                fast_model=os.getenv("FAST_MODEL", "gpt-3.5-turbo"),
+                strong_model=os.getenv("STRONG_MODEL", "gpt-4")
+            )
+        self.cascade = cascade
         self.conversation_history: List[Dict[str, str]] = []
         
+        self.session_store = session_store
+        self.session_id: Optional[str] = None
+        self.history_window = history_window
+        if session_id:
+            self.bind_session(session_id)
+        
         print(f"✅ Cliente ChatGPT inicializado (modelo: {model})")
     
+    def bind_session(self, session_id: str, store: Optional[SessionStore] = None):
+        """
+        Associa o cliente a uma sessão, carregando só a janela recente.
+        
+        Os turnos seguintes são acrescentados à sessão no armazenamento.
+        
+        Args:
+            session_id: ID da sessão (criada na primeira mensagem se não existir)
+            store: Armazenamento (usa o do cliente se não especificado)
+        """
+        if store is not None:
+            self.session_store = store
+        if self.session_store is None:
+            raise ValueError("Nenhum armazenamento de sessões configurado.")
+        
+        start = time.perf_counter()
+        self.session_id = session_id
+        self.conversation_history = self.session_store.load(session_id, limit=self.history_window)
+        prompt = self.session_store.get_system_prompt(session_id)
+        if prompt:
+            self.conversation_history.insert(0, {"role": "system", "content": prompt})
+        
+        print(f"📂 Sessão '{session_id}' retomada ({len(self.conversation_history)} mensagens, "
+              f"{(time.perf_counter() - start) * 1000:.1f} ms)")
+    
+    def record_exchange(self, message: str, answer: str):
+        """
+        Registra um par pergunta/resposta no histórico (e na sessão, se houver).
+        
+        Args:
+            message: Mensagem do usuário
+            answer: Resposta do assistente
+        """
+        exchange = [{"role": "user", "content": message}, {"role": "assistant", "content": answer}]
+        self.conversation_history.extend(exchange)
+        # Turnos fora da janela não seriam mais enviados; a sessão guarda o histórico completo
+        self.conversation_history = self._window(self.conversation_history, self.history_window)
+        if self.session_store and self.session_id:
+            self.session_store.append_many(self.session_id, exchange)
+    
     def send_message(self, message: str, system_prompt: Optional[str] = None) -> str:
         """
         Envia uma mensagem para o ChatGPT.
@@ -58,16 +138,33 @@ class ChatGPTClient:
         print(f"💬 Enviando para ChatGPT: {message}")
         
         try:
-            response = openai.ChatCompletion.create(
-                model=self.model,
-                messages=messages
-            )
+            route = None
+            model = self.model
+            if self.cascade:
+                route = self.cascade.classify(message, len(self.conversation_history), self.language)
+                model = self.cascade.model_for(route)
+            
+            response, latency = self._complete(messages, model)
             
             assistant_message = response.choices[0].message.content
             
+            # Cascata: escala para o modelo forte se a resposta rápida parecer insuficiente
+            if self.cascade:
+                finish_reason = getattr(response.choices[0], "finish_reason", None)
+                escalate = route == "fast" and self.cascade.should_escalate(
+                    message, assistant_message, finish_reason
+                )
+                self.cascade.record(route, model, latency, getattr(response, "usage", None), escalated=escalate)
+                
+                if escalate:
+                    model = self.cascade.strong_model
+                    print(f"⤴️ Resposta rápida insuficiente, escalando para {model}...")
+                    response, latency = self._complete(messages, model)
+                    assistant_message = response.choices[0].message.content
+                    self.cascade.record("escalated", model, latency, getattr(response, "usage", None))
+            
             # Atualiza histórico
-            self.conversation_history.append({"role": "user", "content": message})
-            self.conversation_history.append({"role": "assistant", "content": assistant_message})
+            self.record_exchange(message, assistant_message)
             
             print(f"🤖 Resposta: {assistant_message}")
             return assistant_message
@@ -76,9 +173,65 @@ class ChatGPTClient:
             print(f"❌ Erro ao comunicar com ChatGPT: {e}")
             raise
     
+    def _complete(self, messages: List[Dict[str, str]], model: str):
+        """
+        Faz a chamada à API (pelo agendador, se configurado).
+        
+        Só a janela recente do histórico é enviada: as mensagens de sistema
+        iniciais, os `history_window` turnos anteriores e a nova mensagem.
+        
+        Returns:
+            Tupla (resposta, latência em segundos)
+        """
+        if self.history_window:
+            messages = self._window(messages, self.history_window + 1)
+        
+        def call():
+            return openai.ChatCompletion.create(
+                model=model,
+                messages=messages
+            )
+        
+        start = time.perf_counter()
+        if self.scheduler:
+            response = self.scheduler.submit(
+                call,
+                estimated_tokens=estimate_tokens(messages),
+                priority=self.priority,
+                timeout=self.timeout
+            ).result()
+        else:
+            response = call()
+        return response, time.perf_counter() - start
+    
+    @staticmethod
+    def _window(messages: List[Dict[str, str]], turns: int) -> List[Dict[str, str]]:
+        """
+        Mantém as mensagens de sistema iniciais e só os `turns` turnos mais recentes.
+        
+        Args:
+            messages: Mensagens em ordem cronológica
+            turns: Número de turnos mantidos (0 = todos)
+        
+        Returns:
+            Mensagens dentro da janela
+        """
+        leading = 0
+        while leading < len(messages) and messages[leading]["role"] == "system":
+            leading += 1
+        if not turns or len(messages) - leading <= turns:
+            return messages
+        return messages[:leading] + messages[-turns:]
+    
     def clear_history(self):
-        """Limpa o histórico de conversação."""
+        """Limpa o histórico de conversação (e os turnos da sessão vinculada, mantendo o prompt)."""
         self.conversation_history = []
+        if self.session_store and self.session_id:
+            prompt = self.session_store.get_system_prompt(self.session_id)
+            self.session_store.delete(self.session_id)
+            if prompt:
+                self.session_store.set_system_prompt(self.session_id, prompt)
+                self.conversation_history.append({"role": "system", "content": prompt})
         print("🗑️ Histórico limpo")
     
     def set_system_prompt(self, prompt: str):
@@ -88,7 +241,12 @@ class ChatGPTClient:
         Args:
             prompt: Prompt do sistema
         """
-        self.conversation_history.insert(0, {"role": "system", "content": prompt})
+        if self.conversation_history and self.conversation_history[0]["role"] == "system":
+            self.conversation_history[0] = {"role": "system", "content": prompt}
+        else:
+            self.conversation_history.insert(0, {"role": "system", "content": prompt})
+        if self.session_store and self.session_id:
+            self.session_store.set_system_prompt(self.session_id, prompt)
 
 
 def ask_chatgpt(question: str, model: str = "gpt-4", api_key: Optional[str] = None) -> str:
@@ -0,0 +1,312 @@
+"""
+Índice local de perguntas frequentes (FAQ) consultado antes do ChatGPT.
+
+Assistentes de domínio recebem as mesmas perguntas com pequenas variações
+de redação, e um cache por texto exato raramente acerta. Este índice
+representa cada pergunta curada por n-gramas de caracteres e palavras com
+pesos TF-IDF normalizados e busca por similaridade de cosseno com NumPy,
+usando um índice invertido: só as entradas que compartilham n-gramas com a
+pergunta são pontuadas. Acima do limiar, a resposta curada é usada direto,
+sem chamada à API, e pode ter áudio pré-sintetizado.
+
+Formato do arquivo (JSON com uma lista ou JSONL, um objeto por linha):
+    {"question": "O que é Tesouro Direto?",
+     "variants": ["Como funciona o Tesouro Direto?"],
+     "answer": "O Tesouro Direto é...",
+     "language": "pt"}
+"""
+
+import os
+import re
+import json
+import math
+import hashlib
+import unicodedata
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normaliza texto para comparação (minúsculas, sem acentos nem pontuação).
+    
+    Args:
+        text: Texto original
+    
+    Returns:
+        Texto normalizado com espaços simples
+    """
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+def extract_features(text: str, ngram_sizes=(3, 4)) -> Counter:
+    """
+    Extrai n-gramas de caracteres (por palavra, com bordas) e palavras.
+    
+    Args:
+        text: Texto normalizado
+        ngram_sizes: Tamanhos dos n-gramas de caracteres
+    
+    Returns:
+        Contagem de cada atributo
+    """
+    features: Counter = Counter()
+    for word in text.split():
+        features["w:" + word] += 1
+        padded = f" {word} "
+        for n in ngram_sizes:
+            for i in range(max(1, len(padded) - n + 1)):
+                features[padded[i:i + n]] += 1
+    return features
+
+
+def load_faq(path: str) -> List[Dict[str, Any]]:
+    """
+    Lê um arquivo de FAQ em JSON (lista) ou JSONL.
+    
+    Args:
+        path: Caminho do arquivo
+    
+    Returns:
+        Lista de entradas com question, answer e campos opcionais
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read().strip()
+    
+    if content.startswith("["):
+        entries = json.loads(content)
+    else:
+        entries = [json.loads(line) for line in content.splitlines() if line.strip()]
+    
+    for entry in entries:
+        if not entry.get("question") or not entry.get("answer"):
+            raise ValueError(f"Entrada de FAQ sem 'question' ou 'answer': {entry}")
+    return entries
+
+
+def _positions(starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Concatena os intervalos [start, start + length) em um único array de posições."""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(int(lengths.sum()))
+
+
+def _gather(values: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Reúne vários trechos de `values` sem laço em Python."""
+    return values[_positions(starts, lengths)]
+
+
+class FAQIndex:
+    """Índice TF-IDF de n-gramas para respostas curadas."""
+    
+    def __init__(
+        self,
+        entries: List[Dict[str, Any]],
+        threshold: float = 0.8,
+        ngram_sizes=(3, 4),
+        max_postings: Optional[int] = None
+    ):
+        """
+        Constrói o índice.
+        
+        Args:
+            entries: Entradas com question, answer e opcionais variants, language, audio
+            threshold: Similaridade de cosseno mínima para responder direto (0 a 1)
+            ngram_sizes: Tamanhos dos n-gramas de caracteres
+            max_postings: Atributos presentes em mais linhas que isso não geram
+                candidatos, só entram na pontuação final (padrão: 1% das linhas, mín. 200)
+        """
+        self.entries = entries
+        self.threshold = threshold
+        self.ngram_sizes = tuple(ngram_sizes)
+        
+        # Cada pergunta (principal ou variante) vira uma linha do índice
+        texts: List[str] = []
+        rows: List[int] = []
+        for index, entry in enumerate(entries):
+            for question in [entry["question"]] + list(entry.get("variants", [])):
+                texts.append(normalize_text(question))
+                rows.append(index)
+        self._row_entry = np.asarray(rows, dtype=np.int32)
+        self._row_language = np.asarray([entries[r].get("language") or "" for r in rows])
+        
+        counts = [extract_features(text, self.ngram_sizes) for text in texts]
+        
+        # Vocabulário e IDF suavizado
+        df: Counter = Counter()
+        for features in counts:
+            df.update(features.keys())
+        self.vocabulary: Dict[str, int] = {feature: i for i, feature in enumerate(df)}
+        n_rows = len(texts)
+        self.idf = np.array(
+            [math.log((1 + n_rows) / (1 + df[feature])) + 1 for feature in self.vocabulary],
+            dtype=np.float32
+        )
+        
+        # Vetores normalizados das linhas (CSR) e índice invertido (CSC)
+        row_features: List[np.ndarray] = []
+        row_weights: List[np.ndarray] = []
+        for features in counts:
+            ids = np.array([self.vocabulary[f] for f in features], dtype=np.int32)
+            values = np.array([1 + math.log(c) for c in features.values()], dtype=np.float32) * self.idf[ids]
+            values /= np.linalg.norm(values) or 1.0
+            row_features.append(ids)
+            row_weights.append(values)
+        
+        lengths = np.array([len(ids) for ids in row_features], dtype=np.int64)
+        self._row_indptr = np.concatenate([[0], np.cumsum(lengths)])
+        self._row_features = np.concatenate(row_features) if row_features else np.zeros(0, np.int32)
+        self._row_weights = np.concatenate(row_weights) if row_weights else np.zeros(0, np.float32)
+        
+        row_of = np.repeat(np.arange(len(texts), dtype=np.int32), lengths)
+        order = np.argsort(self._row_features, kind="stable")
+        self._rows = row_of[order]
+        self._indptr = np.concatenate([[0], np.cumsum(np.bincount(self._row_features, minlength=len(self.vocabulary)))])
+        self._n_rows = n_rows
+        self.max_postings = max_postings or max(200, n_rows // 100)
+    
+    @classmethod
+    def from_file(cls, path: str, **kwargs) -> "FAQIndex":
+        """
+        Constrói o índice a partir de um arquivo de FAQ.
+        
+        Args:
+            path: Arquivo JSON ou JSONL
+            **kwargs: Parâmetros repassados ao construtor
+        
+        Returns:
+            Índice pronto para consulta
+        """
+        index = cls(load_faq(path), **kwargs)
+        print(f"📚 FAQ carregada: {len(index.entries)} respostas, {index._n_rows} perguntas")
+        return index
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def search(self, question: str, k: int = 5, language: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Busca as entradas mais parecidas com a pergunta.
+        
+        Args:
+            question: Pergunta do usuário
+            k: Número máximo de resultados
+            language: Se informado, ignora entradas marcadas com outro idioma
+        
+        Returns:
+            Lista de dicionários (entry, answer, question, score, audio), do mais parecido ao menos
+        """
+        features = extract_features(normalize_text(question), self.ngram_sizes)
+        known = [(self.vocabulary[f], c) for f, c in features.items() if f in self.vocabulary]
+        if not known:
+            return []
+        
+        ids = np.array([i for i, _ in known], dtype=np.int64)
+        query = np.array([1 + math.log(c) for _, c in known], dtype=np.float32) * self.idf[ids]
+        # Atributos fora do vocabulário também contam na norma da pergunta
+        unknown = [1 + math.log(c) for f, c in features.items() if f not in self.vocabulary]
+        max_idf = math.log(1 + self._n_rows) + 1
+        query /= math.sqrt(float(query @ query) + sum((u * max_idf) ** 2 for u in unknown))
+        
+        # 1. Candidatos: linhas que compartilham atributos raros com a pergunta
+        df = self._indptr[ids + 1] - self._indptr[ids]
+        rare = df <= self.max_postings
+        if not rare.any():
+            rare = np.argsort(df)[:3]
+        # Com filtro de idioma, as listas não são truncadas: o corte poderia deixar de fora
+        # justamente as linhas no idioma pedido; elas são filtradas antes da contagem
+        lengths = df[rare] if language else np.minimum(df[rare], self.max_postings)
+        rows = _gather(self._rows, self._indptr[ids[rare]], lengths)
+        weights = np.repeat(query[rare], lengths)
+        if language:
+            languages = self._row_language[rows]
+            allowed = (languages == "") | (languages == language)
+            rows, weights = rows[allowed], weights[allowed]
+        candidates, inverse = np.unique(rows, return_inverse=True)
+        partial = np.bincount(inverse, weights=weights, minlength=len(candidates))
+        if len(candidates) > max(64, k * 8):
+            keep = np.argpartition(-partial, max(64, k * 8) - 1)[:max(64, k * 8)]
+            candidates = candidates[keep]
+        if len(candidates) == 0:
+            return []
+        
+        # 2. Similaridade de cosseno exata dos candidatos com todos os atributos
+        dense = np.zeros(len(self.vocabulary), dtype=np.float32)
+        dense[ids] = query
+        starts = self._row_indptr[candidates]
+        lengths = self._row_indptr[candidates + 1] - starts
+        positions = _positions(starts, lengths)
+        scores = np.bincount(
+            np.repeat(np.arange(len(candidates)), lengths),
+            weights=self._row_weights[positions] * dense[self._row_features[positions]],
+            minlength=len(candidates)
+        )
+        ranked = np.argsort(-scores)
+        
+        results, seen = [], set()
+        for position in ranked:
+            row = candidates[position]
+            entry_id = int(self._row_entry[row])
+            if scores[position] <= 0 or entry_id in seen:
+                continue
+            seen.add(entry_id)
+            entry = self.entries[entry_id]
+            results.append({
+                "entry": entry_id,
+                "question": entry["question"],
+                "answer": entry["answer"],
+                "score": float(scores[position]),
+                "audio": entry.get("audio"),
+            })
+            if len(results) == k:
+                break
+        return results
+    
+    def match(self, question: str, language: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a resposta curada se a similaridade atingir o limiar.
+        
+        Args:
+            question: Pergunta do usuário
+            language: Idioma da conversa
+        
+        Returns:
+            Melhor resultado (ver `search`) ou None
+        """
+        results = self.search(question, k=1, language=language)
+        if results and results[0]["score"] >= self.threshold:
+            return results[0]
+        return None
+    
+    def presynthesize(self, tts, output_dir: str = "faq_audio", overwrite: bool = False) -> int:
+        """
+        Gera o áudio de todas as respostas para tocá-las sem chamar o gTTS.
+        
+        Os arquivos são nomeados pelo hash da resposta e do idioma, então
+        respostas alteradas geram áudio novo e as demais são reaproveitadas.
+        
+        Args:
+            tts: Instância de TextToSpeech
+            output_dir: Diretório dos arquivos .mp3
+            overwrite: Se True, sintetiza mesmo se o arquivo já existir
+        
+        Returns:
+            Número de arquivos sintetizados
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        synthesized = 0
+        
+        for entry in self.entries:
+            language = entry.get("language") or tts.language
+            digest = hashlib.sha1(f"{language}:{entry['answer']}".encode("utf-8")).hexdigest()[:16]
+            path = os.path.join(output_dir, f"{digest}.mp3")
+            if overwrite or not os.path.exists(path):
+                tts.synthesize(entry["answer"], output_file=path, language=language)
+                synthesized += 1
+            entry["audio"] = path
+        
+        print(f"✅ Áudio da FAQ pronto em {output_dir} ({synthesized} novos)")
+        return synthesized
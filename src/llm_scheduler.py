@@ -0,0 +1,362 @@
+"""
+Agendador de requisições ao ChatGPT compartilhado entre clientes.
+
+Todas as instâncias de ChatGPTClient de um processo podem enviar suas
+chamadas para um único agendador, que respeita os limites da organização
+(requisições e tokens por minuto) com baldes de tokens, atende turnos de
+voz interativos antes de trabalhos em lote e descarta pedidos cujo prazo
+já não pode ser cumprido, em vez de acumulá-los até gerar erros 429.
+"""
+
+import os
+import time
+import heapq
+import itertools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Classes de prioridade (menor valor = atendido primeiro)
+PRIORITIES = {"interactive": 0, "default": 1, "batch": 2}
+
+
+class QueueFullError(RuntimeError):
+    """A fila da classe de prioridade está cheia."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """O pedido não pôde ser atendido dentro do prazo."""
+
+
+def estimate_tokens(messages: List[Dict[str, str]], completion_tokens: int = 256) -> int:
+    """
+    Estima os tokens de uma chamada (aprox. 4 caracteres por token).
+    
+    Args:
+        messages: Mensagens enviadas à API
+        completion_tokens: Tokens reservados para a resposta
+    
+    Returns:
+        Estimativa de tokens de entrada + saída
+    """
+    prompt = sum(len(m.get("content") or "") for m in messages) // 4 + 4 * len(messages)
+    return prompt + completion_tokens
+
+
+class TokenBucket:
+    """Balde de tokens com reposição contínua."""
+    
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        """
+        Inicializa o balde.
+        
+        Args:
+            per_minute: Taxa de reposição por minuto
+            burst: Capacidade máxima (padrão: um minuto de taxa)
+        """
+        self.rate = per_minute / 60.0
+        self.capacity = burst or per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+    
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos até haver `amount` tokens disponíveis."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+    
+    def consume(self, amount: float, now: float):
+        """Retira tokens (o saldo pode ficar negativo após um ajuste)."""
+        self._refill(now)
+        self.tokens -= amount
+    
+    def refund(self, amount: float):
+        """Devolve tokens reservados e não usados."""
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class _Request:
+    """Pedido na fila do agendador."""
+    
+    def __init__(self, fn: Callable[[], Any], tokens: int, priority: int, deadline: Optional[float]):
+        self.fn = fn
+        self.tokens = tokens
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued = time.monotonic()
+        self.future: Future = Future()
+
+
+class LLMScheduler:
+    """Agendador com limites RPM/TPM, prioridades e prazos."""
+    
+    def __init__(
+        self,
+        requests_per_minute: float = 500,
+        tokens_per_minute: float = 90000,
+        max_concurrency: int = 8,
+        max_queue_size: int = 100,
+        rate_limit_cooldown: float = 5.0
+    ):
+        """
+        Inicializa o agendador.
+        
+        Args:
+            requests_per_minute: Limite de requisições por minuto
+            tokens_per_minute: Limite de tokens por minuto
+            max_concurrency: Chamadas simultâneas à API
+            max_queue_size: Pedidos em espera por classe de prioridade
+            rate_limit_cooldown: Pausa (s) após um erro 429 sem Retry-After
+        """
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.rate_limit_cooldown = rate_limit_cooldown
+        
+        self._queue: List = []
+        self._depth = {name: 0 for name in PRIORITIES}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._closed = False
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "dropped": 0, "rejected": 0, "rate_limited": 0}
+        self._waits: deque = deque(maxlen=1000)
+        
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+    
+    def submit(
+        self,
+        fn: Callable[[], Any],
+        estimated_tokens: int = 1000,
+        priority: str = "default",
+        timeout: Optional[float] = None
+    ) -> Future:
+        """
+        Enfileira uma chamada à API.
+        
+        Args:
+            fn: Função sem argumentos que faz a chamada
+            estimated_tokens: Tokens estimados (entrada + saída)
+            priority: 'interactive', 'default' ou 'batch'
+            timeout: Prazo em segundos para a chamada começar (None = sem prazo)
+        
+        Returns:
+            Future com o retorno de `fn`
+        
+        Raises:
+            QueueFullError: Se a fila da prioridade estiver cheia
+        """
+        level = PRIORITIES[priority]
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        request = _Request(fn, estimated_tokens, level, deadline)
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Agendador encerrado.")
+            if self._depth[priority] >= self.max_queue_size:
+                self._stats["rejected"] += 1
+                raise QueueFullError(f"Fila '{priority}' cheia ({self.max_queue_size} pedidos)")
+            self._depth[priority] += 1
+            self._stats["submitted"] += 1
+            heapq.heappush(self._queue, (level, next(self._seq), request))
+            self._cond.notify()
+        
+        return request.future
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Retorna profundidade das filas e tempos de espera.
+        
+        Returns:
+            Dicionário com contadores, filas por prioridade e espera média/p50/p95 (s)
+        """
+        with self._cond:
+            waits = sorted(self._waits)
+            result: Dict[str, Any] = dict(self._stats)
+            result["queue_depth"] = dict(self._depth)
+            result["in_flight"] = self._in_flight
+        
+        if waits:
+            result["wait_avg"] = sum(waits) / len(waits)
+            result["wait_p50"] = waits[len(waits) // 2]
+            result["wait_p95"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        return result
+    
+    def close(self):
+        """Para o agendador; pedidos ainda na fila são cancelados."""
+        with self._cond:
+            self._closed = True
+            pending, self._queue = self._queue, []
+            self._depth = {name: 0 for name in PRIORITIES}
+            self._cond.notify()
+        for _, _, request in pending:
+            request.future.cancel()
+        self._thread.join(timeout=5)
+        self._executor.shutdown(wait=True)
+    
+    def _run(self):
+        """
+        Thread de despacho: libera pedidos conforme os baldes e as vagas permitem.
+        
+        Os pedidos ficam no heap até haver uma vaga de execução
+        (`max_concurrency`), para que prioridade, prazo e tempo de espera
+        valham até o momento em que a chamada realmente começa.
+        """
+        with self._cond:
+            while not self._closed:
+                if not self._queue:
+                    self._cond.wait()
+                    continue
+                
+                now = time.monotonic()
+                self._drop_expired(now)
+                if not self._queue:
+                    continue
+                _, _, request = self._queue[0]
+                
+                if self._in_flight >= self.max_concurrency:
+                    # Sem vaga: espera uma chamada terminar (ou o próximo prazo vencer)
+                    self._cond.wait(self._until_next_deadline(now))
+                    continue
+                
+                wait = max(
+                    self._paused_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(request.tokens, now)
+                )
+                
+                if request.deadline is not None and now + wait > request.deadline:
+                    heapq.heappop(self._queue)
+                    self._drop(request, now)
+                    continue
+                
+                if wait > 0:
+                    # Acorda antes se chegar um pedido mais prioritário ou vencer um prazo
+                    until_deadline = self._until_next_deadline(now)
+                    self._cond.wait(wait if until_deadline is None else min(wait, until_deadline))
+                    continue
+                
+                heapq.heappop(self._queue)
+                self._dequeued(request)
+                self.requests.consume(1, now)
+                self.tokens.consume(request.tokens, now)
+                self._waits.append(now - request.enqueued)
+                self._in_flight += 1
+                self._executor.submit(self._execute, request)
+    
+    def _until_next_deadline(self, now: float) -> Optional[float]:
+        """Segundos até o prazo mais próximo na fila (None se nenhum pedido tem prazo)."""
+        deadlines = [e[2].deadline for e in self._queue if e[2].deadline is not None]
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - now) + 0.001
+    
+    def _drop_expired(self, now: float):
+        """Remove da fila todos os pedidos com prazo vencido."""
+        expired = [e for e in self._queue if e[2].deadline is not None and e[2].deadline < now]
+        if not expired:
+            return
+        self._queue = [e for e in self._queue if e[2].deadline is None or e[2].deadline >= now]
+        heapq.heapify(self._queue)
+        for _, _, request in expired:
+            self._drop(request, now)
+    
+    def _drop(self, request: _Request, now: float):
+        """Descarta um pedido que não pode mais cumprir o prazo."""
+        self._dequeued(request)
+        self._stats["dropped"] += 1
+        request.future.set_exception(DeadlineExceededError(
+            f"Prazo esgotado após {now - request.enqueued:.2f}s na fila"
+        ))
+    
+    def _dequeued(self, request: _Request):
+        """Atualiza a profundidade da fila da prioridade do pedido."""
+        name = next(n for n, level in PRIORITIES.items() if level == request.priority)
+        self._depth[name] -= 1
+    
+    def _execute(self, request: _Request):
+        """Executa a chamada, ajusta o balde de tokens pelo uso real e libera a vaga."""
+        try:
+            self._call(request)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify()
+    
+    def _call(self, request: _Request):
+        """Executa a chamada de um pedido e resolve seu Future."""
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = request.fn()
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += 1
+                if _is_rate_limit(e):
+                    self._stats["rate_limited"] += 1
+                    self._paused_until = time.monotonic() + _retry_after(e, self.rate_limit_cooldown)
+            request.future.set_exception(e)
+            return
+        
+        usage = getattr(result, "usage", None)
+        used = getattr(usage, "total_tokens", None)
+        with self._cond:
+            self._stats["completed"] += 1
+            if used is not None:
+                difference = request.tokens - used
+                if difference > 0:
+                    self.tokens.refund(difference)
+                else:
+                    self.tokens.consume(-difference, time.monotonic())
+        request.future.set_result(result)
+
+
+def _is_rate_limit(error: Exception) -> bool:
+    """Identifica erros 429 da API."""
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def _retry_after(error: Exception, default: float) -> float:
+    """Lê o cabeçalho Retry-After do erro, se existir."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
+
+_default_scheduler: Optional[LLMScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_default_scheduler() -> LLMScheduler:
+    """
+    Retorna o agendador compartilhado do processo.
+    
+    Os limites vêm das variáveis OPENAI_RPM e OPENAI_TPM (padrões: 500 e 90000).
+    
+    Returns:
+        Instância única de LLMScheduler
+    """
+    global _default_scheduler
+    
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler(
+                requests_per_minute=float(os.getenv("OPENAI_RPM", "500")),
+                tokens_per_minute=float(os.getenv("OPENAI_TPM", "90000"))
+            )
+        return _default_scheduler
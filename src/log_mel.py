@@ -0,0 +1,253 @@
+"""
+Extração incremental do log-mel do Whisper durante a captura.
+
+Cada bloco capturado é reamostrado para 16 kHz (sinc polifásico, como o
+ffmpeg) e os quadros de STFT que já têm todas as amostras são calculados
+de uma vez (NumPy vetorizado) e gravados em um buffer de features
+pré-alocado. Ao parar a gravação, falta só completar os últimos quadros e
+aplicar a normalização global (limiar de 8 unidades abaixo do máximo), e o
+resultado é o mesmo de `whisper.log_mel_spectrogram(whisper.load_audio(wav),
+padding=N_SAMPLES)`, como o `transcribe` calcula — sem gravar o WAV nem
+decodificá-lo com o ffmpeg.
+
+O `whisper.transcribe` só aceita áudio; `transcribe_features` troca a
+função de log-mel usada por ele apenas durante a chamada, para que receba
+as features prontas.
+"""
+
+import importlib
+import threading
+from typing import Any, Dict, Optional
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import HOP_LENGTH, N_FFT, N_FRAMES, N_SAMPLES, SAMPLE_RATE
+
+from .audio_preprocessing import StreamResampler, frame_signal
+from .model_lock import model_lock
+
+# log10 do piso de potência do Whisper (quadros só com silêncio digital)
+LOG_FLOOR = -10.0
+
+
+class LogMelFeatures:
+    """Log-mel normalizado de uma gravação, pronto para `model.transcribe`."""
+    
+    def __init__(self, mel: torch.Tensor, n_samples: int):
+        """
+        Args:
+            mel: Tensor (n_mels, quadros de conteúdo + N_FRAMES), como o
+                `log_mel_spectrogram(audio, padding=N_SAMPLES)` do Whisper
+            n_samples: Amostras de áudio a 16 kHz que originaram as features
+        """
+        self.mel = mel
+        self.n_samples = n_samples
+    
+    @property
+    def n_mels(self) -> int:
+        return self.mel.shape[0]
+    
+    @property
+    def seconds(self) -> float:
+        """Duração do áudio em segundos."""
+        return self.n_samples / SAMPLE_RATE
+    
+    def window(self) -> torch.Tensor:
+        """Primeira janela de 30 s (usada na detecção de idioma)."""
+        return whisper.pad_or_trim(self.mel, N_FRAMES)
+    
+    def for_model(self, n_mels: int, padding: int) -> torch.Tensor:
+        """Valida as features para o modelo e a chamada do Whisper."""
+        if n_mels != self.n_mels:
+            raise ValueError(
+                f"Features com {self.n_mels} bandas mel, mas o modelo usa {n_mels}; "
+                f"capture com n_mels={n_mels}."
+            )
+        if padding != N_SAMPLES:
+            raise ValueError("LogMelFeatures só equivale a log_mel_spectrogram(..., padding=N_SAMPLES).")
+        return self.mel
+
+
+class LogMelExtractor:
+    """Calcula o log-mel do Whisper bloco a bloco, em um buffer pré-alocado."""
+    
+    def __init__(self, sample_rate: int = SAMPLE_RATE, n_mels: int = 80, max_seconds: float = 60.0):
+        """
+        Inicializa o extrator.
+        
+        Args:
+            sample_rate: Taxa de amostragem dos blocos recebidos
+            n_mels: Bandas mel (80; 128 para o large-v3)
+            max_seconds: Duração prevista (o buffer cresce se for excedida)
+        """
+        self.sample_rate = sample_rate
+        self.n_mels = n_mels
+        self._resampler = StreamResampler(sample_rate, SAMPLE_RATE) if sample_rate != SAMPLE_RATE else None
+        self._window = np.hanning(N_FFT + 1)[:-1]  # Hann periódica, como torch.hann_window
+        self._filters = whisper.audio.mel_filters("cpu", n_mels).numpy().astype(np.float64).T
+        self._log_mel = np.empty((0, n_mels), dtype=np.float32)
+        self.reset(max_seconds)
+    
+    def reset(self, max_seconds: Optional[float] = None):
+        """
+        Prepara uma nova gravação, reaproveitando o buffer se couber.
+        
+        Args:
+            max_seconds: Duração prevista da gravação
+        """
+        if max_seconds is not None:
+            frames = int(max_seconds * SAMPLE_RATE) // HOP_LENGTH + N_FRAMES + 2
+            if self._log_mel.shape[0] < frames:
+                self._log_mel = np.empty((frames, self.n_mels), dtype=np.float32)
+        if self._resampler:
+            self._resampler.reset()
+        self._carry = np.zeros(0, dtype=np.float64)
+        self._started = False
+        self._frames = 0
+        self._samples = 0
+        self._max = LOG_FLOOR
+        self._result: Optional[LogMelFeatures] = None
+    
+    @property
+    def frames(self) -> int:
+        """Quadros já calculados."""
+        return self._frames
+    
+    def process(self, block: np.ndarray):
+        """
+        Recebe um bloco capturado e calcula os quadros que ficaram completos.
+        
+        Args:
+            block: Amostras float32 na taxa `sample_rate`
+        """
+        samples = self._resampler.process(block) if self._resampler else np.asarray(block).reshape(-1)
+        self._feed(samples)
+    
+    def _feed(self, samples: np.ndarray):
+        """Acumula amostras a 16 kHz e calcula os quadros completos."""
+        self._samples += samples.shape[0]
+        signal = np.concatenate((self._carry, samples))
+        if not self._started:
+            if signal.shape[0] <= N_FFT // 2:
+                self._carry = signal
+                return
+            signal = self._reflect_start(signal)
+        self._carry = self._compute(signal)
+    
+    def finish(self) -> LogMelFeatures:
+        """
+        Completa os quadros finais (seguidos de silêncio, como no Whisper) e normaliza.
+        
+        Returns:
+            LogMelFeatures da gravação (a mesma instância em chamadas repetidas)
+        """
+        if self._result is not None:
+            return self._result
+        if self._resampler:
+            self._feed(self._resampler.flush())  # amostras finais, retidas pelo filtro
+        
+        total = (self._samples + N_SAMPLES) // HOP_LENGTH
+        # Quadros que ainda tocam o fim do áudio; depois deles, só silêncio
+        last_real = min(total, -(-(self._samples + N_FFT // 2) // HOP_LENGTH))
+        signal = self._carry
+        if not self._started:
+            signal = self._reflect_start(np.pad(signal, (0, N_FFT // 2 + 1)))
+        missing = last_real - self._frames
+        if missing > 0:
+            needed = (missing - 1) * HOP_LENGTH + N_FFT
+            signal = np.pad(signal, (0, max(0, needed - signal.shape[0])))[:needed]
+            self._compute(signal)
+        self._reserve(total)
+        self._log_mel[self._frames:total] = LOG_FLOOR
+        
+        log_spec = self._log_mel[:total]
+        np.maximum(log_spec, self._max - 8.0, out=log_spec)
+        mel = torch.from_numpy(((log_spec + 4.0) / 4.0).T.copy())
+        self._result = LogMelFeatures(mel, self._samples)
+        return self._result
+    
+    def _reflect_start(self, signal: np.ndarray) -> np.ndarray:
+        """Preenchimento refletido do início (stft com center=True)."""
+        self._started = True
+        return np.concatenate((signal[1:N_FFT // 2 + 1][::-1], signal))
+    
+    def _reserve(self, frames: int):
+        """Cresce o buffer de features se a gravação passou do previsto."""
+        if frames > self._log_mel.shape[0]:
+            grown = np.empty((max(frames, 2 * self._log_mel.shape[0]), self.n_mels), dtype=np.float32)
+            grown[:self._frames] = self._log_mel[:self._frames]
+            self._log_mel = grown
+    
+    def _compute(self, signal: np.ndarray) -> np.ndarray:
+        """Calcula todos os quadros completos do sinal e retorna a sobra."""
+        if signal.shape[0] < N_FFT:
+            return signal
+        frames = frame_signal(signal, N_FFT, HOP_LENGTH)
+        n = frames.shape[0]
+        spectrum = np.fft.rfft(frames * self._window, axis=1)
+        power = spectrum.real ** 2 + spectrum.imag ** 2
+        log_mel = np.log10(np.maximum(power @ self._filters, 1e-10))
+        
+        self._reserve(self._frames + n)
+        self._log_mel[self._frames:self._frames + n] = log_mel
+        self._frames += n
+        self._max = max(self._max, float(log_mel.max()))
+        return signal[n * HOP_LENGTH:]
+
+
+class _TranscribeHook:
+    """
+    Troca o log-mel do módulo `whisper.transcribe` enquanto houver chamadas
+    de `transcribe_features` em andamento.
+    
+    LogMelFeatures são devolvidos como estão; qualquer outra entrada (de
+    transcrições simultâneas em outras threads) segue para a função original.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        # Capturada na construção e nunca apagada: uma chamada de outra thread
+        # que leu a função trocada logo antes da restauração ainda a encontra
+        self._original = importlib.import_module("whisper.transcribe").log_mel_spectrogram
+    
+    def __enter__(self):
+        module = importlib.import_module("whisper.transcribe")
+        with self._lock:
+            if self._users == 0:
+                module.log_mel_spectrogram = self._log_mel_spectrogram
+            self._users += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        module = importlib.import_module("whisper.transcribe")
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                module.log_mel_spectrogram = self._original
+    
+    def _log_mel_spectrogram(self, audio, n_mels: int = 80, padding: int = 0, device=None):
+        if isinstance(audio, LogMelFeatures):
+            mel = audio.for_model(n_mels, padding)
+            return mel.to(device) if device else mel
+        return self._original(audio, n_mels, padding, device)
+
+
+_TRANSCRIBE_HOOK = _TranscribeHook()
+
+
+def transcribe_features(model, features: LogMelFeatures, **options) -> Dict[str, Any]:
+    """
+    Transcreve features calculadas na captura com `model.transcribe`.
+    
+    Args:
+        model: Modelo Whisper com o mesmo número de bandas mel das features
+        features: LogMelFeatures (`LogMelExtractor.finish()`)
+        **options: Repassadas ao `model.transcribe`
+    
+    Returns:
+        Resultado do `model.transcribe`
+    """
+    with model_lock(model), _TRANSCRIBE_HOOK:
+        return model.transcribe(features, **options)
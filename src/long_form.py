@@ -0,0 +1,306 @@
+"""
+Módulo para transcrição de gravações longas (reuniões, aulas) com Whisper.
+
+O arquivo é lido de forma incremental pelo ffmpeg, dividido em trechos
+sobrepostos com cortes alinhados a pausas (menor energia) e distribuído
+para um pool de processos. Com o método "fork", os workers herdam o
+modelo já carregado pelo processo pai (copy-on-write), sem recarregá-lo.
+A memória de pico depende apenas do tamanho do trecho e do número de
+trechos em andamento, nunca da duração do arquivo.
+"""
+
+import os
+import time
+import subprocess
+import multiprocessing as mp
+from collections import deque
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+WHISPER_SAMPLE_RATE = 16000
+
+# Modelo usado pelos workers (herdado no fork ou carregado no initializer)
+_WORKER_MODEL = None
+
+
+def stream_audio(
+    audio_file: str,
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+    block_seconds: float = 10.0
+) -> Iterator[np.ndarray]:
+    """
+    Decodifica um arquivo com ffmpeg e entrega blocos float32 mono.
+    
+    Args:
+        audio_file: Caminho do arquivo (qualquer formato suportado pelo ffmpeg)
+        sample_rate: Taxa de amostragem de saída
+        block_seconds: Duração de cada bloco lido do pipe
+    
+    Yields:
+        Blocos de amostras no intervalo [-1, 1]
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0", "-i", audio_file,
+        "-f", "s16le", "-ac", "1", "-acodec", "pcm_s16le",
+        "-ar", str(sample_rate), "-loglevel", "error", "-",
+    ]
+    block_bytes = int(block_seconds * sample_rate) * 2
+    
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    try:
+        while True:
+            data = process.stdout.read(block_bytes)
+            if not data:
+                break
+            yield np.frombuffer(data, dtype=np.int16).astype(np.float32) / 32768.0
+    finally:
+        process.stdout.close()
+        process.wait()
+    
+    if process.returncode != 0:
+        error = process.stderr.read().decode(errors="ignore")
+        raise RuntimeError(f"Falha ao decodificar áudio: {error.strip()}")
+
+
+def find_pause(audio: np.ndarray, sample_rate: int, frame_duration: float = 0.03) -> int:
+    """
+    Encontra o ponto de menor energia de um trecho.
+    
+    Args:
+        audio: Trecho onde o corte pode ocorrer
+        sample_rate: Taxa de amostragem
+        frame_duration: Duração dos quadros de análise
+    
+    Returns:
+        Índice (em amostras) do centro do quadro mais silencioso
+    """
+    frame_length = max(1, int(frame_duration * sample_rate))
+    n_frames = audio.shape[0] // frame_length
+    if n_frames == 0:
+        return audio.shape[0]
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    energy = np.einsum("ij,ij->i", frames, frames)
+    return int(np.argmin(energy)) * frame_length + frame_length // 2
+
+
+def iter_chunks(
+    blocks: Iterator[np.ndarray],
+    sample_rate: int = WHISPER_SAMPLE_RATE,
+    chunk_seconds: float = 30.0,
+    overlap_seconds: float = 1.0,
+    search_seconds: float = 5.0
+) -> Iterator[Tuple[np.ndarray, float, float, float]]:
+    """
+    Agrupa blocos em trechos sobrepostos cortados em pausas.
+    
+    Cada trecho tem uma "região de confirmação" [início, fim) em tempo
+    absoluto; trechos vizinhos se sobrepõem apenas fora dela, de modo que
+    cada segmento transcrito pertence a exatamente um trecho.
+    
+    Args:
+        blocks: Iterador de blocos de áudio
+        sample_rate: Taxa de amostragem
+        chunk_seconds: Duração máxima de cada trecho (30 s = janela do Whisper)
+        overlap_seconds: Contexto extra antes/depois do ponto de corte
+        search_seconds: Janela no final do trecho onde a pausa é procurada
+    
+    Yields:
+        Tuplas (áudio, início do áudio, início da confirmação, fim da confirmação)
+    """
+    chunk = int(chunk_seconds * sample_rate)
+    overlap = int(overlap_seconds * sample_rate)
+    search = max(1, min(int(search_seconds * sample_rate), chunk - 2 * overlap))
+    
+    pending = np.zeros(0, dtype=np.float32)
+    offset = 0          # posição absoluta de pending[0]
+    commit_from = 0     # posição absoluta onde a confirmação do próximo trecho começa
+    
+    for block in blocks:
+        pending = np.concatenate((pending, block))
+        
+        while pending.shape[0] >= chunk:
+            window_start = chunk - overlap - search
+            cut = window_start + find_pause(pending[window_start:chunk - overlap], sample_rate)
+            end = min(pending.shape[0], cut + overlap)
+            
+            yield (
+                pending[:end].copy(),
+                offset / sample_rate,
+                commit_from / sample_rate,
+                (offset + cut) / sample_rate,
+            )
+            
+            commit_from = offset + cut
+            keep_from = max(0, cut - overlap)
+            pending = pending[keep_from:]
+            offset += keep_from
+    
+    if pending.shape[0]:
+        yield pending, offset / sample_rate, commit_from / sample_rate, float("inf")
+
+
+def _init_worker(model_name: Optional[str], torch_threads: int):
+    """Prepara um worker: limita threads e carrega o modelo se não foi herdado."""
+    global _WORKER_MODEL
+    
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    
+    if _WORKER_MODEL is None and model_name:
+        import whisper
+        _WORKER_MODEL = whisper.load_model(model_name)
+
+
+def _transcribe_chunk(args: Tuple[int, np.ndarray, float, float, float, Optional[str]]) -> Tuple[int, Dict[str, Any]]:
+    """Transcreve um trecho e converte os tempos para a linha do tempo global."""
+    index, audio, audio_start, commit_start, commit_end, language = args
+    
+    result = _WORKER_MODEL.transcribe(
+        audio,
+        language=language,
+        fp16=False,
+        condition_on_previous_text=False,
+        verbose=None
+    )
+    
+    segments = []
+    for segment in result.get("segments", []):
+        start = segment["start"] + audio_start
+        end = segment["end"] + audio_start
+        middle = (start + end) / 2
+        if commit_start <= middle < commit_end:
+            segments.append({"start": start, "end": end, "text": segment["text"].strip()})
+    
+    return index, {
+        "segments": segments,
+        "language": result.get("language", language),
+        "audio_end": audio_start + audio.shape[0] / WHISPER_SAMPLE_RATE,
+    }
+
+
+class LongFormTranscriber:
+    """Classe para transcrever arquivos longos com memória limitada."""
+    
+    def __init__(
+        self,
+        model,
+        model_name: Optional[str] = None,
+        language: Optional[str] = "pt",
+        workers: Optional[int] = None,
+        chunk_seconds: float = 30.0,
+        overlap_seconds: float = 1.0,
+        max_pending: Optional[int] = None,
+        torch_threads: int = 1
+    ):
+        """
+        Inicializa o transcritor de longa duração.
+        
+        Args:
+            model: Modelo Whisper já carregado (compartilhado com os workers via fork)
+            model_name: Nome do modelo, usado para recarregar em plataformas sem fork
+            language: Idioma (None = detecção automática por trecho)
+            workers: Número de processos (padrão: núcleos disponíveis; 1 = sem pool)
+            chunk_seconds: Duração máxima de cada trecho
+            overlap_seconds: Sobreposição entre trechos
+            max_pending: Trechos em andamento ao mesmo tempo (padrão: 2 × workers)
+            torch_threads: Threads do PyTorch por worker
+        """
+        self.model = model
+        self.model_name = model_name
+        self.language = language
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_pending = max_pending or 2 * self.workers
+        self.torch_threads = torch_threads
+    
+    def transcribe(self, audio_file: str, language: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Transcreve um arquivo longo.
+        
+        Args:
+            audio_file: Caminho do arquivo de áudio
+            language: Idioma opcional (usa o padrão se não especificado)
+        
+        Returns:
+            Dicionário com texto, idioma, segmentos e estatísticas
+        """
+        global _WORKER_MODEL
+        
+        lang = language or self.language
+        start = time.perf_counter()
+        print(f"🧠 Transcrevendo arquivo longo com {self.workers} worker(s)...")
+        
+        chunks = iter_chunks(
+            stream_audio(audio_file),
+            chunk_seconds=self.chunk_seconds,
+            overlap_seconds=self.overlap_seconds
+        )
+        tasks = (
+            (index, audio, audio_start, commit_start, commit_end, lang)
+            for index, (audio, audio_start, commit_start, commit_end) in enumerate(chunks)
+        )
+        
+        _WORKER_MODEL = self.model
+        try:
+            if self.workers <= 1:
+                results = map(_transcribe_chunk, tasks)
+                segments, languages, audio_seconds = self._collect(results)
+            else:
+                segments, languages, audio_seconds = self._run_pool(tasks)
+        finally:
+            _WORKER_MODEL = None
+        
+        elapsed = time.perf_counter() - start
+        detected = max(set(languages), key=languages.count) if languages else lang
+        print(f"✅ {len(segments)} segmentos em {elapsed:.1f}s "
+              f"({audio_seconds / elapsed if elapsed else 0:.1f}x tempo real)")
+        
+        return {
+            "text": " ".join(segment["text"] for segment in segments).strip(),
+            "language": detected,
+            "segments": segments,
+            "chunks": len(languages),
+            "audio_seconds": audio_seconds,
+            "elapsed_seconds": elapsed,
+        }
+    
+    def _run_pool(self, tasks) -> Tuple[List[Dict[str, Any]], List[str], float]:
+        """Distribui os trechos mantendo no máximo `max_pending` em memória."""
+        methods = mp.get_all_start_methods()
+        context = mp.get_context("fork" if "fork" in methods else "spawn")
+        inherits_model = context.get_start_method() == "fork"
+        
+        with context.Pool(
+            self.workers,
+            initializer=_init_worker,
+            initargs=(None if inherits_model else self.model_name, self.torch_threads)
+        ) as pool:
+            def results():
+                pending = deque()
+                for task in tasks:
+                    pending.append(pool.apply_async(_transcribe_chunk, (task,)))
+                    if len(pending) >= self.max_pending:
+                        yield pending.popleft().get()
+                while pending:
+                    yield pending.popleft().get()
+            
+            return self._collect(results())
+    
+    def _collect(self, results) -> Tuple[List[Dict[str, Any]], List[str], float]:
+        """Junta os resultados em ordem e calcula a duração processada."""
+        segments: List[Dict[str, Any]] = []
+        languages: List[str] = []
+        audio_seconds = 0.0
+        
+        for index, result in results:
+            segments.extend(result["segments"])
+            languages.append(result["language"])
+            audio_seconds = max(audio_seconds, result["audio_end"])
+            print(f"   🧩 Trecho {index + 1} concluído")
+        
+        return segments, languages, audio_seconds
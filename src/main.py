@@ -7,6 +7,12 @@ import os
 import sys
 from dotenv import load_dotenv
 from voice_assistant import VoiceAssistant
+from audio_preprocessing import AudioPreprocessor
+from model_router import WhisperModelRouter
+from llm_scheduler import get_default_scheduler
+from faq_index import FAQIndex
+from session_store import SQLiteSessionStore
+from playback import create_sink
 
 # Carrega variáveis de ambiente
 load_dotenv()
@@ -62,6 +68,18 @@ def get_language_choice():
 
 def main():
     """Função principal."""
+    # Subcomando de processamento em lote: python main.py batch <origem> [opções]
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        from batch import main as batch_main
+        batch_main(sys.argv[2:])
+        return
+    
+    # Teste de resistência com substitutos locais: python main.py soak [opções]
+    if len(sys.argv) > 1 and sys.argv[1] == "soak":
+        from soak import main as soak_main
+        soak_main(sys.argv[2:])
+        return
+    
     print_banner()
     
     # Verifica API Key
@@ -75,6 +93,45 @@ def main():
     language = os.getenv("DEFAULT_LANGUAGE", "pt")
     model = os.getenv("DEFAULT_MODEL", "gpt-4")
     whisper_model = os.getenv("WHISPER_MODEL", "small")
+    quantize_whisper = os.getenv("WHISPER_QUANTIZE", "0") == "1"
+    whisper_threads = int(os.getenv("WHISPER_THREADS", "0")) or None
+    streaming_transcription = os.getenv("STREAMING_TRANSCRIPTION", "0") == "1"
+    incremental_features = os.getenv("INCREMENTAL_FEATURES", "0") == "1"
+    
+    # Pré-processamento da gravação antes do Whisper (opcional)
+    audio_preprocessor = None
+    if os.getenv("AUDIO_PREPROCESSING", "0") == "1":
+        audio_preprocessor = AudioPreprocessor(
+            normalize=os.getenv("PREPROCESS_NORMALIZE", "peak") or None,
+            denoise=os.getenv("PREPROCESS_DENOISE", "0") == "1"
+        )
+    measure_preprocessing = os.getenv("PREPROCESS_MEASURE", "0") == "1"
+    
+    # Roteamento de modelos por idioma (opcional)
+    model_router = None
+    if os.getenv("WHISPER_ROUTING", "0") == "1":
+        model_router = WhisperModelRouter(
+            memory_budget_mb=float(os.getenv("WHISPER_MEMORY_BUDGET_MB", "2048")),
+            quantize=quantize_whisper
+        )
+    
+    # Agendador compartilhado com limites da organização (opcional)
+    llm_scheduler = get_default_scheduler() if os.getenv("OPENAI_RPM") or os.getenv("OPENAI_TPM") else None
+    
+    # FAQ local consultada antes do ChatGPT (opcional)
+    faq_index = None
+    if os.getenv("FAQ_FILE"):
+        faq_index = FAQIndex.from_file(
+            os.getenv("FAQ_FILE"),
+            threshold=float(os.getenv("FAQ_THRESHOLD", "0.8"))
+        )
+    
+    # Conversas salvas em disco e retomadas pelo ID (opcional)
+    session_store = SQLiteSessionStore(os.getenv("SESSION_DB")) if os.getenv("SESSION_DB") else None
+    session_id = os.getenv("SESSION_ID", "default") if session_store else None
+    
+    # Saída de áudio: sounddevice, player externo (aplay/paplay/ffplay), wav:<arquivo> ou none
+    playback_sink = create_sink(os.getenv("PLAYBACK_SINK", "auto"))
     
     # Cria o assistente
     try:
@@ -82,12 +139,31 @@ def main():
             language=language,
             whisper_model=whisper_model,
             chatgpt_model=model,
-            api_key=api_key
+            api_key=api_key,
+            quantize_whisper=quantize_whisper,
+            whisper_threads=whisper_threads,
+            model_router=model_router,
+            llm_scheduler=llm_scheduler,
+            faq_index=faq_index,
+            session_store=session_store,
+            session_id=session_id,
+            playback_sink=playback_sink,
+            streaming_transcription=streaming_transcription,
+            incremental_features=incremental_features,
+            audio_preprocessor=audio_preprocessor,
+            measure_preprocessing=measure_preprocessing
         )
     except Exception as e:
         print(f"❌ Erro ao inicializar assistente: {e}")
         sys.exit(1)
     
+    # Pré-sintetiza o áudio das respostas da FAQ
+    if faq_index and os.getenv("FAQ_AUDIO_DIR"):
+        try:
+            faq_index.presynthesize(assistant.text_to_speech, os.getenv("FAQ_AUDIO_DIR"))
+        except Exception as e:
+            print(f"⚠️ Áudio da FAQ indisponível, usando síntese sob demanda: {e}")
+    
     # Loop principal
     while True:
         print_menu()
@@ -100,6 +176,9 @@ def main():
             
             try:
                 result = assistant.listen_and_respond(duration=duration)
+                if result["assistant_response"] is None:
+                    print("\n🔇 Nenhuma fala detectada; tente novamente.")
+                    continue
                 print(f"\n✅ Processamento concluído!")
                 print(f"📝 Você disse: {result['user_input']}")
                 print(f"🤖 Assistente: {result['assistant_response']}")
@@ -0,0 +1,409 @@
+"""
+Serviço de transcrição com micro-lotes entre sessões.
+
+Com muitas sessões simultâneas, cada transcrição isolada roda o encoder e o
+decoder do Whisper com lote 1, desperdiçando a vazão vetorial da CPU. Aqui
+as falas que chegam de várias sessões dentro de uma janela curta (20–50 ms)
+são reunidas: o encoder roda uma única vez para o lote e a decodificação
+gulosa avança todas as falas juntas (uma passada do decoder por token).
+Cada chamador recebe o seu resultado por um Future.
+
+Como o Whisper sempre codifica janelas de 30 s, o preenchimento do lote
+não muda o resultado: falas de até 30 s têm a mesma transcrição da
+decodificação gulosa isolada (sem timestamps por segmento).
+
+`submit` só enfileira: threads de carregamento decodificam o arquivo e
+calculam o log-mel, fora da thread do chamador e da thread de despacho.
+
+Falas acima de 30 s não passam pelo `transcribe` do modelo (que prenderia
+a thread de despacho e não pode rodar em paralelo com o lote no mesmo
+modelo): uma thread auxiliar as corta em pausas em trechos de até 30 s,
+que entram na fila como falas comuns e são decodificados junto com as
+demais sessões; os textos dos trechos são unidos ao final.
+
+O modelo pode continuar em uso por outros componentes (ex.: o
+SpeechToText que o carregou): cada lote segura o `model_lock` do modelo,
+e os demais componentes esperam a vez em vez de decodificar ao mesmo tempo.
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import torch
+import whisper
+from whisper.audio import N_FRAMES, N_SAMPLES, SAMPLE_RATE
+
+from .long_form import iter_chunks
+from .model_lock import model_lock
+
+# Limiares de silêncio usados pelo whisper.transcribe
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+
+
+class _Utterance:
+    """Fala na fila do serviço."""
+    
+    def __init__(
+        self,
+        audio: np.ndarray,
+        mel: torch.Tensor,
+        language: Optional[str],
+        part: bool = False,
+        future: Optional[Future] = None,
+        submitted: Optional[float] = None
+    ):
+        self.audio = audio
+        self.mel = mel
+        self.language = language
+        self.part = part  # trecho de uma fala longa (não entra nos contadores)
+        self.enqueued = time.monotonic()
+        self.submitted = self.enqueued if submitted is None else submitted
+        self.future: Future = future or Future()
+
+
+class MicroBatchTranscriber:
+    """Transcreve falas de várias sessões em lotes com o mesmo modelo Whisper."""
+    
+    def __init__(
+        self,
+        model,
+        language: Optional[str] = None,
+        max_batch_size: int = 8,
+        max_wait: float = 0.03,
+        max_tokens: int = 224,
+        loader_threads: int = 2
+    ):
+        """
+        Inicializa o serviço e as threads de carregamento e de despacho.
+        
+        Args:
+            model: Modelo Whisper carregado; pode ser compartilhado, desde que os
+                outros usos no processo segurem o `model_lock` (os componentes
+                do pacote já o fazem)
+            language: Idioma padrão das falas (None = detecção automática por fala)
+            max_batch_size: Máximo de falas por lote
+            max_wait: Espera máxima (s) da primeira fala da fila antes de fechar o lote
+            max_tokens: Máximo de tokens gerados por fala
+            loader_threads: Threads que decodificam os arquivos e calculam o log-mel
+        """
+        self.model = model
+        self.language = language
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_tokens = max_tokens
+        
+        self._queue: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "batches": 0, "long_form": 0}
+        self._batch_sizes: deque = deque(maxlen=1000)
+        self._waits: deque = deque(maxlen=1000)
+        self._batch_seconds: deque = deque(maxlen=1000)
+        
+        self._long_queue: deque = deque()
+        self._load_queue: deque = deque()
+        
+        self._loaders = [
+            threading.Thread(target=self._run_loader, name=f"micro-batching-loader-{i}", daemon=True)
+            for i in range(max(1, loader_threads))
+        ]
+        for loader in self._loaders:
+            loader.start()
+        self._thread = threading.Thread(target=self._run, name="micro-batching", daemon=True)
+        self._thread.start()
+        self._long_thread = threading.Thread(target=self._run_long, name="micro-batching-long", daemon=True)
+        self._long_thread.start()
+    
+    def submit(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> Future:
+        """
+        Enfileira uma fala e retorna sem esperar.
+        
+        O áudio é carregado e o log-mel é calculado pelas threads de
+        carregamento, fora da thread do chamador e do caminho crítico do
+        lote. Falas acima de 30 s vão para a thread auxiliar, que as divide
+        em trechos enfileirados como falas comuns.
+        
+        Args:
+            audio: Caminho do arquivo ou array float32 a 16 kHz
+            language: Idioma (usa o padrão do serviço se não especificado)
+        
+        Returns:
+            Future com o dicionário de resultado (text, language, segments,
+            audio_seconds, batch_size, queue_seconds)
+        """
+        if not isinstance(audio, str):
+            # Cópia: o chamador pode reaproveitar o buffer antes do carregamento
+            audio = np.array(audio, dtype=np.float32).reshape(-1)
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Serviço de transcrição encerrado.")
+            self._stats["submitted"] += 1
+            self._load_queue.append((audio, language or self.language, time.monotonic(), future))
+            self._cond.notify_all()
+        return future
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Transcreve uma fala e aguarda o resultado.
+        
+        Args:
+            audio: Caminho do arquivo ou array float32 a 16 kHz
+            language: Idioma opcional
+            timeout: Tempo máximo de espera em segundos
+        
+        Returns:
+            Dicionário com text, language, segments e audio_seconds
+        """
+        return self.submit(audio, language).result(timeout)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Retorna contadores, tamanho médio dos lotes e tempos de espera.
+        
+        Returns:
+            Dicionário com contadores, batch_size_avg, wait_avg/wait_p95 e
+            batch_seconds_avg (s)
+        """
+        with self._cond:
+            result: Dict[str, Any] = dict(self._stats)
+            result["queue_depth"] = len(self._queue)
+            result["load_queue_depth"] = len(self._load_queue)
+            sizes, waits, seconds = list(self._batch_sizes), sorted(self._waits), list(self._batch_seconds)
+        
+        if sizes:
+            result["batch_size_avg"] = sum(sizes) / len(sizes)
+            result["batch_seconds_avg"] = sum(seconds) / len(seconds)
+        if waits:
+            result["wait_avg"] = sum(waits) / len(waits)
+            result["wait_p95"] = waits[min(len(waits) - 1, int(len(waits) * 0.95))]
+        return result
+    
+    def close(self):
+        """Para o serviço; falas ainda na fila são canceladas."""
+        with self._cond:
+            self._closed = True
+            pending, self._queue = list(self._queue), deque()
+            self._cond.notify_all()
+            long_pending, self._long_queue = list(self._long_queue), deque()
+            load_pending, self._load_queue = list(self._load_queue), deque()
+        for utterance in pending:
+            utterance.future.cancel()
+        for _, _, _, future in long_pending + load_pending:
+            future.cancel()
+        for loader in self._loaders:
+            loader.join(timeout=5)
+        self._thread.join(timeout=5)
+        self._long_thread.join(timeout=5)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _run_loader(self):
+        """Thread de carregamento: decodifica o áudio e encaminha a fala à fila certa."""
+        while True:
+            with self._cond:
+                while not self._closed and not self._load_queue:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                source, language, submitted, future = self._load_queue.popleft()
+            
+            if future.cancelled():
+                continue
+            try:
+                audio = whisper.load_audio(source) if isinstance(source, str) else source
+                if audio.shape[0] > N_SAMPLES:
+                    with self._cond:
+                        if self._closed:
+                            future.cancel()
+                            return
+                        self._stats["long_form"] += 1
+                        self._long_queue.append((audio, language, submitted, future))
+                        self._cond.notify_all()
+                else:
+                    self._enqueue(audio, language, future=future, submitted=submitted)
+            except Exception as e:
+                if future.set_running_or_notify_cancel():
+                    with self._cond:
+                        self._stats["failed"] += 1
+                    future.set_exception(e)
+    
+    def _enqueue(
+        self,
+        audio: np.ndarray,
+        language: Optional[str],
+        part: bool = False,
+        future: Optional[Future] = None,
+        submitted: Optional[float] = None
+    ) -> Future:
+        """Calcula o log-mel de uma fala de até 30 s e a coloca na fila do lote."""
+        # Mesmo preenchimento do whisper.transcribe: o limiar do log-mel depende dele
+        mel = whisper.log_mel_spectrogram(audio, self.model.dims.n_mels, padding=N_SAMPLES)
+        utterance = _Utterance(audio, whisper.pad_or_trim(mel, N_FRAMES), language, part, future, submitted)
+        
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Serviço de transcrição encerrado.")
+            self._queue.append(utterance)
+            self._cond.notify_all()
+        return utterance.future
+    
+    def _run(self):
+        """Thread de despacho: fecha um lote quando enche ou quando a primeira fala espera `max_wait`."""
+        while True:
+            with self._cond:
+                while not self._closed and not self._queue:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                
+                deadline = self._queue[0].enqueued + self.max_wait
+                while not self._closed and len(self._queue) < self.max_batch_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if self._closed:
+                    return
+                
+                batch = [self._queue.popleft() for _ in range(min(self.max_batch_size, len(self._queue)))]
+                now = time.monotonic()
+                self._waits.extend(now - u.enqueued for u in batch)
+            
+            batch = [u for u in batch if u.future.set_running_or_notify_cancel()]
+            if batch:
+                self._process(batch)
+    
+    def _process(self, batch: List[_Utterance]):
+        """Transcreve um lote e entrega os resultados."""
+        start = time.perf_counter()
+        self._deliver(batch, self._decode_batch)
+        
+        with self._cond:
+            self._stats["batches"] += 1
+            self._batch_sizes.append(len(batch))
+            self._batch_seconds.append(time.perf_counter() - start)
+    
+    def _run_long(self):
+        """Thread auxiliar: transcreve as falas acima de 30 s, uma por vez, pelos lotes."""
+        while True:
+            with self._cond:
+                while not self._closed and not self._long_queue:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                audio, language, enqueued, future = self._long_queue.popleft()
+            
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = self._transcribe_long(audio, language)
+            except BaseException as e:
+                with self._cond:
+                    self._stats["failed"] += 1
+                future.set_exception(e)
+                continue
+            
+            with self._cond:
+                self._stats["completed"] += 1
+            result["queue_seconds"] = time.monotonic() - enqueued
+            future.set_result(result)
+    
+    def _transcribe_long(self, audio: np.ndarray, language: Optional[str]) -> Dict[str, Any]:
+        """
+        Divide uma fala longa em trechos de até 30 s cortados em pausas e os
+        transcreve pela fila de lotes.
+        
+        Todos os trechos são enfileirados de uma vez, para que sejam
+        decodificados juntos e com as falas das outras sessões.
+        """
+        chunks = iter_chunks(iter([audio]), SAMPLE_RATE, N_SAMPLES / SAMPLE_RATE, overlap_seconds=0.0)
+        parts = [(start, self._enqueue(piece, language, part=True)) for piece, start, _, _ in chunks]
+        
+        texts, segments, batch_sizes = [], [], []
+        detected = language
+        for start, part in parts:
+            result = part.result()
+            batch_sizes.append(result["batch_size"])
+            detected = detected or result["language"]
+            if result["text"]:
+                texts.append(result["text"])
+            segments.extend(
+                {"start": start + s["start"], "end": start + s["end"], "text": s["text"]}
+                for s in result["segments"]
+            )
+        return {
+            "text": " ".join(texts),
+            "language": detected,
+            "segments": segments,
+            "audio_seconds": audio.shape[0] / SAMPLE_RATE,
+            "batch_size": max(batch_sizes),
+        }
+    
+    def _deliver(self, utterances: List[_Utterance], fn):
+        """Executa `fn` sobre as falas e resolve os Futures."""
+        try:
+            results = fn(utterances)
+        except Exception as e:
+            with self._cond:
+                self._stats["failed"] += sum(not u.part for u in utterances)
+            for utterance in utterances:
+                utterance.future.set_exception(e)
+            return
+        
+        now = time.monotonic()
+        with self._cond:
+            self._stats["completed"] += sum(not u.part for u in utterances)
+        for utterance, result in zip(utterances, results):
+            result["audio_seconds"] = utterance.audio.shape[0] / SAMPLE_RATE
+            result["batch_size"] = len(utterances)
+            result["queue_seconds"] = now - utterance.submitted
+            utterance.future.set_result(result)
+    
+    @torch.no_grad()
+    def _decode_batch(self, utterances: List[_Utterance]) -> List[Dict[str, Any]]:
+        """Um passo de encoder para o lote e decodificação gulosa por idioma."""
+        with model_lock(self.model):
+            return self._decode_locked(utterances)
+    
+    def _decode_locked(self, utterances: List[_Utterance]) -> List[Dict[str, Any]]:
+        """Corpo de `_decode_batch`, com o modelo já reservado."""
+        mel = torch.stack([u.mel for u in utterances]).to(self.model.device)
+        audio_features = self.model.embed_audio(mel)
+        
+        # Falas sem idioma vão juntas: o decode detecta o idioma de cada uma
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, utterance in enumerate(utterances):
+            groups.setdefault(utterance.language, []).append(i)
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(utterances)
+        for language, indices in groups.items():
+            options = whisper.DecodingOptions(
+                language=language,
+                temperature=0.0,
+                sample_len=self.max_tokens,
+                without_timestamps=True,
+                fp16=False
+            )
+            decoded = whisper.decode(self.model, audio_features[indices], options)
+            for i, result in zip(indices, decoded):
+                silent = result.no_speech_prob > NO_SPEECH_THRESHOLD and result.avg_logprob < LOGPROB_THRESHOLD
+                text = "" if silent else result.text.strip()
+                duration = utterances[i].audio.shape[0] / SAMPLE_RATE
+                results[i] = {
+                    "text": text,
+                    "language": result.language,
+                    "segments": [{"start": 0.0, "end": duration, "text": text}] if text else [],
+                }
+        return results
+    
\ No newline at end of file
@@ -0,0 +1,189 @@
+"""
+Roteamento de mensagens entre um modelo rápido e um modelo forte.
+
+Perguntas simples ("que horas são?") vão para um modelo barato e de baixa
+latência; perguntas longas, técnicas ou com muito contexto vão direto
+para o modelo forte. A classificação usa apenas heurísticas locais
+(tamanho, idioma, palavras-chave, profundidade do histórico), sem chamada
+extra à API. Respostas do modelo rápido que parecem insuficientes podem
+ser reenviadas ao modelo forte.
+"""
+
+import re
+import threading
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Preço em USD por 1K tokens (entrada, saída)
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4o": (0.005, 0.015),
+    "gpt-4o-mini": (0.00015, 0.0006),
+}
+
+# Idiomas em que o modelo rápido costuma responder bem
+FAST_LANGUAGES = {"pt", "en", "es", "fr", "de", "it"}
+
+COMPLEX_PATTERNS = [
+    r"\bexpli(que|car|ca)\b", r"\bexplain\b", r"\bpor ?qu[eé]\b", r"\bwhy\b",
+    r"\bcompar", r"\banalis", r"\banaly[sz]", r"\bcalcul", r"\bc[oó]digo\b", r"\bcode\b",
+    r"\bpasso a passo\b", r"\bstep by step\b", r"\bestrat[eé]gi", r"\bstrateg",
+    r"\bresum", r"\bsummari[sz]", r"\bvantagens\b", r"\bpros and cons\b", r"\bprove\b",
+    r"\bdemonstr", r"\bplanej", r"\bplan\b", r"\bdiferen[çc]a", r"\bdifference\b",
+]
+
+SIMPLE_PATTERNS = [
+    r"\bque horas\b", r"\bwhat time\b", r"\bqu[eé] hora\b", r"\bol[aá]\b", r"\boi\b",
+    r"\bhello\b", r"\bhi\b", r"\bobrigad[oa]\b", r"\bthanks?\b", r"\bgracias\b",
+    r"\bbom dia\b", r"\bboa (tarde|noite)\b", r"\bgood (morning|night)\b", r"\bcapital\b",
+    r"\bque dia\b", r"\bwhat day\b", r"\btempo\b", r"\bweather\b",
+]
+
+INADEQUATE_PATTERNS = [
+    r"\bn[aã]o sei\b", r"\bn[aã]o tenho certeza\b", r"\bn[aã]o (posso|consigo)\b",
+    r"\bi (don't|do not) know\b", r"\bi'?m not sure\b", r"\bi (can't|cannot)\b",
+    r"\bas an ai\b", r"\bcomo (uma )?ia\b", r"\bno (lo )?s[eé]\b", r"\bno estoy seguro\b",
+]
+
+
+class ModelCascade:
+    """Classifica mensagens e escolhe entre o modelo rápido e o forte."""
+    
+    def __init__(
+        self,
+        fast_model: str = "gpt-3.5-turbo",
+        strong_model: str = "gpt-4",
+        max_fast_words: int = 25,
+        max_fast_history: int = 6,
+        escalate: bool = True
+    ):
+        """
+        Inicializa o roteador.
+        
+        Args:
+            fast_model: Modelo para turnos simples
+            strong_model: Modelo para turnos difíceis
+            max_fast_words: Mensagens mais longas vão para o modelo forte
+            max_fast_history: Históricos mais profundos (em mensagens) vão para o modelo forte
+            escalate: Se True, reenvia ao modelo forte respostas rápidas insuficientes
+        """
+        self.fast_model = fast_model
+        self.strong_model = strong_model
+        self.max_fast_words = max_fast_words
+        self.max_fast_history = max_fast_history
+        self.escalate = escalate
+        
+        self._complex = re.compile("|".join(COMPLEX_PATTERNS), re.IGNORECASE)
+        self._simple = re.compile("|".join(SIMPLE_PATTERNS), re.IGNORECASE)
+        self._inadequate = re.compile("|".join(INADEQUATE_PATTERNS), re.IGNORECASE)
+        
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+    
+    def classify(self, message: str, history_depth: int = 0, language: Optional[str] = None) -> str:
+        """
+        Classifica uma mensagem como 'fast' ou 'strong'.
+        
+        Args:
+            message: Mensagem do usuário
+            history_depth: Mensagens já presentes no histórico
+            language: Idioma da conversa
+        
+        Returns:
+            'fast' ou 'strong'
+        """
+        words = len(message.split())
+        score = 0
+        
+        if words > self.max_fast_words:
+            score += 2
+        elif words <= 8:
+            score -= 1
+        if history_depth > self.max_fast_history:
+            score += 1
+        if language and language not in FAST_LANGUAGES:
+            score += 1
+        if self._complex.search(message):
+            score += 2
+        if self._simple.search(message):
+            score -= 2
+        if re.search(r"\d+\s*[-+*/^=]\s*\d+|```|\bdef\b|\bSELECT\b", message):
+            score += 2
+        
+        return "strong" if score >= 2 else "fast"
+    
+    def model_for(self, route: str) -> str:
+        """Retorna o nome do modelo de uma rota."""
+        return self.strong_model if route == "strong" else self.fast_model
+    
+    def should_escalate(self, message: str, answer: Optional[str], finish_reason: Optional[str] = None) -> bool:
+        """
+        Verifica se a resposta do modelo rápido parece insuficiente.
+        
+        Args:
+            message: Mensagem do usuário
+            answer: Resposta do modelo rápido (None quando a API não devolve
+                texto, ex.: chamada de ferramenta ou filtro de conteúdo)
+            finish_reason: Motivo de término informado pela API
+        
+        Returns:
+            True se a mensagem deve ser reenviada ao modelo forte
+        """
+        if not self.escalate:
+            return False
+        if finish_reason == "length" or answer is None or not answer.strip():
+            return True
+        if self._inadequate.search(answer):
+            return True
+        # Resposta curtíssima para uma pergunta elaborada
+        return len(message.split()) > 12 and len(answer.split()) < 4
+    
+    def record(self, route: str, model: str, latency: float, usage: Any = None, escalated: bool = False):
+        """
+        Registra uma chamada para o relatório por rota.
+        
+        Args:
+            route: 'fast', 'strong' ou 'escalated'
+            model: Modelo usado
+            latency: Duração da chamada em segundos
+            usage: Objeto `usage` da resposta (prompt_tokens, completion_tokens)
+            escalated: Se True, a chamada rápida foi descartada e escalada
+        """
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        input_price, output_price = MODEL_PRICES.get(model, (0.0, 0.0))
+        cost = (prompt_tokens * input_price + completion_tokens * output_price) / 1000
+        
+        with self._lock:
+            stats = self._stats.setdefault(route, {
+                "calls": 0, "escalations": 0, "tokens": 0, "cost_usd": 0.0,
+                "latencies": deque(maxlen=1000),
+            })
+            stats["calls"] += 1
+            stats["escalations"] += int(escalated)
+            stats["tokens"] += prompt_tokens + completion_tokens
+            stats["cost_usd"] += cost
+            stats["latencies"].append(latency)
+    
+    def report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Retorna latência e custo por rota.
+        
+        Returns:
+            Dicionário rota → calls, escalations, tokens, cost_usd, latency_avg, latency_p95
+        """
+        result = {}
+        with self._lock:
+            for route, stats in self._stats.items():
+                latencies: List[float] = sorted(stats["latencies"])
+                result[route] = {
+                    "calls": stats["calls"],
+                    "escalations": stats["escalations"],
+                    "tokens": stats["tokens"],
+                    "cost_usd": round(stats["cost_usd"], 6),
+                    "latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+                    "latency_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+                }
+        return result
@@ -0,0 +1,42 @@
+"""
+Acesso exclusivo a um modelo Whisper compartilhado entre threads.
+
+O Whisper instala os ganchos do cache de chaves/valores no próprio modelo
+durante cada decodificação, então duas decodificações simultâneas no mesmo
+objeto corrompem uma à outra. Quem roda o modelo no processo
+(SpeechToText, StreamingTranscriber, transcribe_features, o roteador de
+modelos e o MicroBatchTranscriber) segura o lock do modelo enquanto
+decodifica; chamadas de outras threads esperam a vez.
+
+Código que chama `model.transcribe` ou `whisper.decode` diretamente em um
+modelo também usado por esses componentes deve fazer o mesmo:
+    with model_lock(model):
+        model.transcribe(audio)
+"""
+
+import threading
+import weakref
+
+# Um lock por modelo, sem atributo no objeto (o modelo continua copiável e serializável)
+_LOCKS: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+_LOCKS_GUARD = threading.Lock()
+
+
+def model_lock(model) -> threading.RLock:
+    """
+    Retorna o lock de inferência de um modelo (criado no primeiro uso).
+    
+    É reentrante: um componente que já o segura pode chamar outro que
+    também o pede (ex.: SpeechToText chamando transcribe_features).
+    
+    Args:
+        model: Modelo Whisper carregado
+    
+    Returns:
+        RLock compartilhado por todos que usam o mesmo modelo
+    """
+    with _LOCKS_GUARD:
+        lock = _LOCKS.get(model)
+        if lock is None:
+            lock = _LOCKS[model] = threading.RLock()
+        return lock
@@ -0,0 +1,203 @@
+"""
+Módulo para escolher o modelo Whisper por idioma e duração do áudio.
+
+Modelos `.en` são mais rápidos e precisos para inglês, e modelos menores
+bastam para comandos curtos. Os modelos carregados ficam em um cache LRU
+limitado por um orçamento de memória: ao carregar um modelo novo, os
+menos usados recentemente são descartados até caber no orçamento.
+"""
+
+import gc
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import whisper
+
+from .log_mel import LogMelFeatures
+from .model_lock import model_lock
+
+# Tabela padrão: idioma → [(duração máxima em segundos ou None, modelo)]
+# "*" vale para idiomas sem regra própria.
+DEFAULT_ROUTES: Dict[str, List[Tuple[Optional[float], str]]] = {
+    "en": [(15.0, "base.en"), (None, "small.en")],
+    "*": [(15.0, "base"), (None, "small")],
+}
+
+# Número aproximado de parâmetros (milhões), usado antes de carregar um modelo
+MODEL_PARAMS_M = {
+    "tiny": 39, "base": 74, "small": 244, "medium": 769, "large": 1550, "turbo": 809,
+}
+
+
+def estimate_model_mb(model_name: str, quantize: bool = False) -> float:
+    """
+    Estima a memória de um modelo ainda não carregado.
+    
+    Args:
+        model_name: Nome do modelo (ex.: 'small', 'base.en', 'large-v3')
+        quantize: Se True, considera pesos lineares em int8
+    
+    Returns:
+        Estimativa em MB
+    """
+    family = model_name.split(".")[0].split("-")[0]
+    params = MODEL_PARAMS_M.get(family, MODEL_PARAMS_M["large"]) * 1e6
+    bytes_per_param = 1.5 if quantize else 4.0
+    return params * bytes_per_param / 2 ** 20
+
+
+def model_memory_mb(model) -> float:
+    """
+    Mede a memória ocupada pelos pesos de um modelo carregado.
+    
+    Inclui parâmetros, buffers e pesos empacotados das camadas quantizadas.
+    
+    Args:
+        model: Modelo PyTorch
+    
+    Returns:
+        Memória em MB
+    """
+    total = sum(t.numel() * t.element_size() for t in model.parameters())
+    total += sum(t.numel() * t.element_size() for t in model.buffers())
+    for module in model.modules():
+        weight = getattr(module, "weight", None)
+        if callable(weight):
+            total += weight().numel() * weight().element_size()
+    return total / 2 ** 20
+
+
+class WhisperModelRouter:
+    """Seleciona e mantém em cache modelos Whisper dentro de um orçamento de memória."""
+    
+    def __init__(
+        self,
+        routes: Optional[Dict[str, List[Tuple[Optional[float], str]]]] = None,
+        memory_budget_mb: float = 2048,
+        detection_model: str = "base",
+        quantize: bool = False
+    ):
+        """
+        Inicializa o roteador.
+        
+        Args:
+            routes: Tabela idioma → [(duração máxima, modelo)], em ordem crescente de duração;
+                deve incluir a regra "*"
+            memory_budget_mb: Memória máxima para os modelos carregados
+            detection_model: Modelo multilíngue usado para detectar o idioma
+            quantize: Se True, carrega os modelos quantizados em int8
+        """
+        routes = routes or DEFAULT_ROUTES
+        if "*" not in routes:
+            raise ValueError('A tabela de rotas precisa da regra "*" para idiomas sem regra própria.')
+        empty = [language for language, rules in routes.items() if not rules]
+        if empty:
+            raise ValueError(f"Rotas sem modelos para: {', '.join(empty)}")
+        
+        self.routes = routes
+        self.memory_budget_mb = memory_budget_mb
+        self.detection_model = detection_model
+        self.quantize = quantize
+        
+        self._models: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+    
+    @property
+    def loaded_mb(self) -> float:
+        """Memória ocupada pelos modelos em cache."""
+        return sum(size for _, size in self._models.values())
+    
+    def select(self, language: Optional[str], audio_seconds: Optional[float] = None) -> str:
+        """
+        Escolhe o modelo para um idioma e duração.
+        
+        Args:
+            language: Código do idioma
+            audio_seconds: Duração do áudio (None = usa a regra mais abrangente)
+        
+        Returns:
+            Nome do modelo
+        """
+        rules = self.routes.get(language) or self.routes["*"]
+        for max_seconds, model_name in rules:
+            if max_seconds is None:
+                return model_name
+            if audio_seconds is not None and audio_seconds <= max_seconds:
+                return model_name
+        return rules[-1][1]
+    
+    def get(self, model_name: str):
+        """
+        Retorna um modelo carregado, carregando-o (e liberando outros) se necessário.
+        
+        Args:
+            model_name: Nome do modelo
+        
+        Returns:
+            Modelo Whisper
+        """
+        with self._lock:
+            if model_name in self._models:
+                self._models.move_to_end(model_name)
+                return self._models[model_name][0]
+            
+            self._evict(estimate_model_mb(model_name, self.quantize))
+            
+            print(f"📥 Carregando modelo Whisper '{model_name}' (roteador)...")
+            if self.quantize:
+                from .speech_to_text import quantize_model
+                model = quantize_model(whisper.load_model(model_name, device="cpu"))
+            else:
+                model = whisper.load_model(model_name)
+            
+            self._models[model_name] = (model, model_memory_mb(model))
+            print(f"✅ Modelo carregado ({self.loaded_mb:.0f}/{self.memory_budget_mb:.0f} MB em uso)")
+            return model
+    
+    def detect_language(self, audio: Union[np.ndarray, LogMelFeatures]) -> str:
+        """
+        Detecta o idioma dos primeiros 30 s de áudio.
+        
+        Args:
+            audio: Áudio float32 a 16 kHz ou LogMelFeatures da captura
+        
+        Returns:
+            Código do idioma mais provável
+        """
+        model = self.get(self.detection_model)
+        if isinstance(audio, LogMelFeatures):
+            mel = audio.window()
+        else:
+            mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=model.dims.n_mels)
+        with model_lock(model):
+            _, probs = model.detect_language(mel.to(model.device))
+        return max(probs, key=probs.get)
+    
+    def route(self, audio: np.ndarray, language: Optional[str] = None) -> Tuple[Any, str]:
+        """
+        Escolhe e carrega o modelo adequado para um áudio.
+        
+        Args:
+            audio: Áudio float32 a 16 kHz
+            language: Idioma conhecido (None ou 'auto' = detecta)
+        
+        Returns:
+            Tupla (modelo, idioma)
+        """
+        if not language or language == "auto":
+            language = self.detect_language(audio)
+        audio_seconds = audio.shape[0] / whisper.audio.SAMPLE_RATE
+        return self.get(self.select(language, audio_seconds)), language
+    
+    def _evict(self, needed_mb: float):
+        """Descarta modelos menos usados até caber `needed_mb` no orçamento."""
+        while self._models and self.loaded_mb + needed_mb > self.memory_budget_mb:
+            name, _ = self._models.popitem(last=False)
+            print(f"♻️ Liberando modelo '{name}' (orçamento de memória)")
+        gc.collect()
+        
+        if needed_mb > self.memory_budget_mb:
+            print(f"⚠️ Modelo estimado em {needed_mb:.0f} MB excede o orçamento "
+                  f"de {self.memory_budget_mb:.0f} MB")
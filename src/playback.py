@@ -0,0 +1,392 @@
+"""
+Saídas de reprodução (sinks) para a fala sintetizada.
+
+Fora de notebooks, o áudio é entregue a um sink à medida que cada trecho
+MP3 é sintetizado e decodificado para PCM, de modo que a reprodução
+começa no primeiro trecho em vez de esperar o arquivo completo.
+
+Sinks disponíveis:
+    - SoundDeviceSink: fluxo de saída do sounddevice
+    - SubprocessSink: PCM s16le via pipe para um player externo (aplay, paplay, ffplay)
+    - WavFileSink: grava um arquivo WAV (testes e depuração)
+    - NullSink: descarta o áudio, só conta amostras (testes)
+"""
+
+import io
+import time
+import wave
+import shutil
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import sounddevice as sd
+    SOUNDDEVICE_AVAILABLE = True
+except ImportError:
+    SOUNDDEVICE_AVAILABLE = False
+
+try:
+    import soundfile as sf
+    SOUNDFILE_AVAILABLE = True
+except ImportError:
+    SOUNDFILE_AVAILABLE = False
+
+# Frequência de amostragem do MP3 gerado pelo gTTS
+GTTS_SAMPLE_RATE = 24000
+
+# Players externos conhecidos: leem PCM s16le da entrada padrão
+PLAYER_COMMANDS = {
+    "aplay": "aplay -q -t raw -f S16_LE -r {rate} -c {channels} -",
+    "paplay": "paplay --raw --format=s16le --rate={rate} --channels={channels}",
+    "pw-play": "pw-play --format=s16 --rate={rate} --channels={channels} -",
+    "ffplay": "ffplay -nodisp -autoexit -loglevel quiet -f s16le -ar {rate} -ac {channels} -i -",
+}
+
+
+# Bitrates (kbps) da camada III por versão e frequências por versão (bits do cabeçalho)
+_MP3_BITRATES = {
+    3: (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),  # MPEG-1
+    2: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2
+    0: (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),      # MPEG-2.5
+}
+_MP3_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+
+def _mp3_frame(data: bytes, position: int) -> Optional[Tuple[int, Tuple[int, ...]]]:
+    """
+    Interpreta o cabeçalho de quadro MPEG camada III em `position`.
+    
+    Returns:
+        Tupla (tamanho do quadro, deslocamentos possíveis da marca Xing/Info)
+        ou None se não houver um cabeçalho válido ali
+    """
+    if position + 4 > len(data) or data[position] != 0xFF or data[position + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[position + 1] >> 3) & 3
+    layer = (data[position + 1] >> 1) & 3
+    bitrate_index = data[position + 2] >> 4
+    rate_index = (data[position + 2] >> 2) & 3
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    
+    bitrate = _MP3_BITRATES[version][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    padding = (data[position + 2] >> 1) & 1
+    length = (144 if version == 3 else 72) * bitrate // sample_rate + padding
+    
+    # A marca fica logo após o cabeçalho e a side info (e o CRC, se houver)
+    mono = data[position + 3] >> 6 == 3
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    offset = 4 + side_info
+    crc = not data[position + 1] & 1
+    return length, (offset, offset + 2) if crc else (offset,)
+
+
+def split_mp3_streams(data: bytes) -> List[bytes]:
+    """
+    Separa MP3s concatenados que têm cabeçalho Xing/Info próprio.
+    
+    O cabeçalho informa o número de quadros do fluxo, e alguns decodificadores
+    param ao atingi-lo; arquivos com vários trechos concatenados tocariam só
+    o primeiro.
+    
+    Os quadros são percorridos pelo tamanho declarado em cada cabeçalho, e
+    só conta a marca Xing/Info na posição da side info de um quadro: os
+    mesmos bytes dentro dos dados de áudio não dividem o fluxo. Tags ID3v2
+    antes de um fluxo ficam com ele.
+    
+    Args:
+        data: Bytes MP3 (um ou mais fluxos)
+    
+    Returns:
+        Lista de fluxos, na ordem
+    """
+    starts = [0]
+    position, first_frame, tag_start = 0, True, None
+    while position + 4 <= len(data):
+        if data[position:position + 3] == b"ID3" and position + 10 <= len(data):
+            size = 0
+            for byte in data[position + 6:position + 10]:
+                size = (size << 7) | (byte & 0x7F)
+            tag_start = position if tag_start is None else tag_start
+            position += 10 + size + (10 if data[position + 5] & 0x10 else 0)
+            continue
+        
+        frame = _mp3_frame(data, position)
+        if frame is None:
+            # Fora de sincronia (lixo entre fluxos): procura o próximo cabeçalho
+            position = data.find(b"\xff", position + 1)
+            if position == -1:
+                break
+            continue
+        
+        length, offsets = frame
+        if any(data[position + o:position + o + 4] in (b"Xing", b"Info") for o in offsets):
+            start = position if tag_start is None else tag_start
+            if not first_frame and start > starts[-1]:
+                starts.append(start)
+        first_frame, tag_start = False, None
+        position += length
+    return [data[a:b] for a, b in zip(starts, starts[1:] + [len(data)])]
+
+
+def decode_mp3(data: bytes) -> Tuple[np.ndarray, int]:
+    """
+    Decodifica MP3 para PCM float32 mono.
+    
+    Usa o soundfile (libsndfile >= 1.1) e, se indisponível, o ffmpeg.
+    
+    Args:
+        data: Bytes MP3
+    
+    Returns:
+        Tupla (amostras float32, frequência de amostragem)
+    """
+    if SOUNDFILE_AVAILABLE:
+        try:
+            parts = []
+            for stream in split_mp3_streams(data):
+                audio, sample_rate = sf.read(io.BytesIO(stream), dtype="float32", always_2d=True)
+                parts.append(audio.mean(axis=1))
+            return np.concatenate(parts), sample_rate
+        except RuntimeError:
+            pass  # libsndfile sem suporte a MP3
+    
+    if shutil.which("ffmpeg") is None:
+        raise RuntimeError("Não foi possível decodificar MP3: instale soundfile >= 0.12 ou ffmpeg.")
+    pcm = subprocess.run(
+        ["ffmpeg", "-nostdin", "-loglevel", "error", "-i", "pipe:0",
+         "-f", "s16le", "-ac", "1", "-ar", str(GTTS_SAMPLE_RATE), "pipe:1"],
+        input=data, capture_output=True, check=True
+    ).stdout
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0, GTTS_SAMPLE_RATE
+
+
+def _to_int16(samples: np.ndarray) -> bytes:
+    """Converte PCM float32 para bytes s16le."""
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class PlaybackSink:
+    """Interface dos sinks: aberto no primeiro trecho, recebe PCM float32 mono."""
+    
+    def __init__(self):
+        self.sample_rate: Optional[int] = None
+        self.samples_written = 0
+    
+    @property
+    def is_open(self) -> bool:
+        return self.sample_rate is not None
+    
+    def open(self, sample_rate: int, channels: int = 1):
+        """Prepara a saída para a frequência do áudio."""
+        self.sample_rate = sample_rate
+        self.samples_written = 0
+    
+    def write(self, samples: np.ndarray):
+        """Entrega um bloco de amostras (pode bloquear até haver espaço)."""
+        self.samples_written += samples.shape[0]
+    
+    def close(self):
+        """Aguarda o fim da reprodução e libera a saída."""
+        self.sample_rate = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class NullSink(PlaybackSink):
+    """Descarta o áudio (apenas conta as amostras)."""
+
+
+class WavFileSink(PlaybackSink):
+    """Grava o áudio recebido em um arquivo WAV 16 bits."""
+    
+    def __init__(self, path: str = "playback.wav"):
+        """
+        Args:
+            path: Arquivo WAV de saída (sobrescrito a cada reprodução)
+        """
+        super().__init__()
+        self.path = path
+        self._file: Optional[wave.Wave_write] = None
+    
+    def open(self, sample_rate: int, channels: int = 1):
+        super().open(sample_rate, channels)
+        self._file = wave.open(self.path, "wb")
+        self._file.setnchannels(channels)
+        self._file.setsampwidth(2)
+        self._file.setframerate(sample_rate)
+    
+    def write(self, samples: np.ndarray):
+        super().write(samples)
+        self._file.writeframes(_to_int16(samples))
+    
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+        super().close()
+
+
+class SoundDeviceSink(PlaybackSink):
+    """Reproduz pelo fluxo de saída do sounddevice (PortAudio)."""
+    
+    def __init__(self, device: Optional[int] = None, latency: str = "low"):
+        """
+        Args:
+            device: Índice do dispositivo de saída (None = padrão)
+            latency: Latência do fluxo ('low', 'high' ou segundos)
+        """
+        if not SOUNDDEVICE_AVAILABLE:
+            raise ImportError("sounddevice não está instalado.")
+        super().__init__()
+        self.device = device
+        self.latency = latency
+        self._stream = None
+    
+    def open(self, sample_rate: int, channels: int = 1):
+        super().open(sample_rate, channels)
+        self._stream = sd.OutputStream(
+            samplerate=sample_rate, channels=channels, dtype="float32",
+            device=self.device, latency=self.latency
+        )
+        self._stream.start()
+    
+    def write(self, samples: np.ndarray):
+        super().write(samples)
+        self._stream.write(np.ascontiguousarray(samples, dtype=np.float32).reshape(-1, 1))
+    
+    def close(self):
+        if self._stream is not None:
+            self._stream.stop()  # espera o buffer esvaziar
+            self._stream.close()
+            self._stream = None
+        super().close()
+
+
+class SubprocessSink(PlaybackSink):
+    """Envia PCM s16le pela entrada padrão de um player externo."""
+    
+    def __init__(self, command: Optional[str] = None):
+        """
+        Args:
+            command: Comando com {rate} e {channels} (padrão: primeiro player encontrado
+                entre aplay, paplay, pw-play e ffplay)
+        """
+        super().__init__()
+        if command is None:
+            player = next((name for name in PLAYER_COMMANDS if shutil.which(name)), None)
+            if player is None:
+                raise RuntimeError(f"Nenhum player encontrado ({', '.join(PLAYER_COMMANDS)}).")
+            command = PLAYER_COMMANDS[player]
+        self.command = command
+        self._process: Optional[subprocess.Popen] = None
+    
+    def open(self, sample_rate: int, channels: int = 1):
+        super().open(sample_rate, channels)
+        self._process = subprocess.Popen(
+            self.command.format(rate=sample_rate, channels=channels).split(),
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+    
+    def write(self, samples: np.ndarray):
+        super().write(samples)
+        try:
+            self._process.stdin.write(_to_int16(samples))
+            self._process.stdin.flush()
+        except BrokenPipeError:
+            raise RuntimeError(f"O player '{self.command.split()[0]}' encerrou inesperadamente.")
+    
+    def close(self):
+        if self._process is not None:
+            try:
+                self._process.stdin.close()
+            except BrokenPipeError:
+                pass
+            if self._process.wait() != 0:
+                print(f"⚠️ O player '{self.command.split()[0]}' terminou com código {self._process.returncode}")
+            self._process = None
+        super().close()
+
+
+def create_sink(name: Optional[str] = "auto") -> Optional[PlaybackSink]:
+    """
+    Cria um sink pelo nome.
+    
+    Args:
+        name: 'sounddevice', 'subprocess', 'subprocess:<comando>', 'wav:<arquivo>',
+            'null', 'auto' (sounddevice, depois player externo) ou None/'none'
+    
+    Returns:
+        Sink criado, ou None se nenhum estiver disponível
+    """
+    if not name or name == "none":
+        return None
+    if name == "null":
+        return NullSink()
+    if name.startswith("wav"):
+        return WavFileSink(name.split(":", 1)[1] if ":" in name else "playback.wav")
+    if name == "sounddevice":
+        return SoundDeviceSink()
+    if name.startswith("subprocess"):
+        return SubprocessSink(name.split(":", 1)[1] if ":" in name else None)
+    if name == "auto":
+        if SOUNDDEVICE_AVAILABLE:
+            try:
+                sd.query_devices(kind="output")
+                return SoundDeviceSink()
+            except Exception:
+                pass
+        try:
+            return SubprocessSink()
+        except RuntimeError:
+            print("⚠️ Nenhuma saída de áudio disponível; o áudio será apenas salvo.")
+            return None
+    raise ValueError(f"Sink de reprodução desconhecido: {name}")
+
+
+class StreamingPlayer:
+    """Decodifica trechos MP3 e os entrega a um sink, medindo o tempo até o primeiro áudio."""
+    
+    def __init__(self, sink: PlaybackSink, start: Optional[float] = None):
+        """
+        Args:
+            sink: Saída de reprodução
+            start: Instante de referência (time.perf_counter) para o tempo até o primeiro áudio
+        """
+        self.sink = sink
+        self.start = time.perf_counter() if start is None else start
+        self.time_to_first_audio: Optional[float] = None
+        self.chunks = 0
+    
+    def feed(self, mp3_chunk: bytes):
+        """Decodifica um trecho e o envia ao sink (abre o sink no primeiro)."""
+        samples, sample_rate = decode_mp3(mp3_chunk)
+        if not self.sink.is_open:
+            self.sink.open(sample_rate)
+        if self.time_to_first_audio is None:
+            self.time_to_first_audio = time.perf_counter() - self.start
+        self.sink.write(samples)
+        self.chunks += 1
+    
+    def finish(self) -> Dict[str, float]:
+        """
+        Aguarda o fim da reprodução e fecha o sink.
+        
+        Returns:
+            Dicionário com time_to_first_audio, audio_seconds, total_seconds e chunks
+        """
+        audio_seconds = self.sink.samples_written / (self.sink.sample_rate or 1)
+        self.sink.close()
+        return {
+            "time_to_first_audio": self.time_to_first_audio,
+            "audio_seconds": audio_seconds,
+            "total_seconds": time.perf_counter() - self.start,
+            "chunks": self.chunks,
+        }
@@ -0,0 +1,252 @@
+"""
+Ganchos de medição para assistentes que rodam por semanas.
+
+ResourceSampler registra memória residente (RSS), maiores alocadores do
+tracemalloc, descritores de arquivo abertos e arquivos temporários ao
+longo do tempo. TurnProfiler captura um perfil cProfile por turno (opt-in
+por variável de ambiente) e grava os arquivos .prof para análise offline
+(`python -m pstats` ou snakeviz).
+
+Variáveis de ambiente:
+    PROFILE_TURNS_DIR=profiles   # ativa a captura e define o diretório
+    PROFILE_TURNS_EVERY=10       # perfila 1 a cada N turnos (padrão: 1)
+    PROFILE_TURNS_MAX=500        # máximo de arquivos gravados (padrão: 1000)
+"""
+
+import os
+import gc
+import glob
+import time
+import cProfile
+import tempfile
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+    RESOURCE_AVAILABLE = True
+except ImportError:
+    RESOURCE_AVAILABLE = False
+
+# Padrões dos arquivos temporários de áudio criados pelo assistente
+TEMP_PATTERNS = ["temp_*.wav", "temp_*.mp3", "response*.wav", "*.tmp"]
+
+
+def rss_mb() -> Optional[float]:
+    """
+    Memória residente atual do processo.
+    
+    Returns:
+        RSS em MB (pico, se /proc não estiver disponível), ou None
+    """
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if RESOURCE_AVAILABLE:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 / (1024 if os.uname().sysname == "Darwin" else 1)
+    return None
+
+
+def open_fds() -> Optional[int]:
+    """Número de descritores de arquivo abertos (Linux/macOS)."""
+    for path in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(path))
+        except OSError:
+            continue
+    return None
+
+
+def count_temp_files(directories: List[str], patterns: List[str] = TEMP_PATTERNS) -> int:
+    """
+    Conta arquivos temporários nos diretórios informados.
+    
+    Args:
+        directories: Diretórios a inspecionar
+        patterns: Padrões glob dos arquivos
+    
+    Returns:
+        Número de arquivos encontrados
+    """
+    found = set()
+    for directory in directories:
+        for pattern in patterns:
+            found.update(glob.glob(os.path.join(directory, pattern)))
+    return len(found)
+
+
+class ResourceSampler:
+    """Amostra o uso de recursos do processo ao longo de uma execução longa."""
+    
+    def __init__(
+        self,
+        temp_dirs: Optional[List[str]] = None,
+        trace_allocations: bool = True,
+        trace_frames: int = 1,
+        top_allocators: int = 10
+    ):
+        """
+        Inicializa o amostrador.
+        
+        Args:
+            temp_dirs: Diretórios onde contar arquivos temporários (padrão: cwd e o tmp do sistema)
+            trace_allocations: Se True, liga o tracemalloc (deixa o processo mais lento)
+            trace_frames: Quadros de pilha guardados por alocação
+            top_allocators: Número de alocadores no relatório
+        """
+        self.temp_dirs = temp_dirs or [os.getcwd(), tempfile.gettempdir()]
+        self.trace_allocations = trace_allocations
+        self.top_allocators = top_allocators
+        self.samples: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._baseline = None
+        self._started_tracing = False
+        
+        if trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(trace_frames)
+                self._started_tracing = True
+            self._baseline = tracemalloc.take_snapshot()
+    
+    def sample(self, **extra) -> Dict[str, Any]:
+        """
+        Registra uma amostra.
+        
+        Args:
+            **extra: Campos adicionais (ex.: turn, history_len)
+        
+        Returns:
+            Dicionário com elapsed_s, rss_mb, open_fds, temp_files e,
+            com tracemalloc, traced_mb e traced_peak_mb
+        """
+        gc.collect()
+        record: Dict[str, Any] = {
+            "elapsed_s": round(time.perf_counter() - self._start, 2),
+            "rss_mb": rss_mb(),
+            "open_fds": open_fds(),
+            "temp_files": count_temp_files(self.temp_dirs),
+        }
+        if self.trace_allocations and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            record["traced_mb"] = round(current / 2 ** 20, 2)
+            record["traced_peak_mb"] = round(peak / 2 ** 20, 2)
+        record.update(extra)
+        self.samples.append(record)
+        return record
+    
+    def top_growth(self, limit: Optional[int] = None) -> List[str]:
+        """
+        Maiores crescimentos de memória desde o início, por linha de código.
+        
+        Args:
+            limit: Número de linhas (padrão: top_allocators)
+        
+        Returns:
+            Linhas formatadas "arquivo:linha: +X KiB (+N blocos)"
+        """
+        if self._baseline is None or not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        stats = snapshot.compare_to(self._baseline, "lineno")
+        return [str(stat) for stat in stats[:limit or self.top_allocators]]
+    
+    def growth_per_1000(self, field: str = "rss_mb", key: str = "turn") -> Optional[float]:
+        """
+        Tendência linear de um campo a cada 1000 unidades de `key`.
+        
+        Ignora o primeiro quarto das amostras (aquecimento de caches).
+        
+        Returns:
+            Inclinação (ex.: MB por 1000 turnos), ou None se não houver dados
+        """
+        points = [(s[key], s[field]) for s in self.samples if s.get(field) is not None and key in s]
+        points = points[len(points) // 4:]
+        if len(points) < 3:
+            return None
+        xs = [p[0] for p in points]
+        ys = [p[1] for p in points]
+        mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+        var = sum((x - mean_x) ** 2 for x in xs)
+        if var == 0:
+            return None
+        return 1000 * sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+    
+    def close(self):
+        """Desliga o tracemalloc (se foi ligado por este amostrador)."""
+        if self._started_tracing and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._started_tracing = False
+
+
+class TurnProfiler:
+    """Captura perfis cProfile de turnos selecionados."""
+    
+    def __init__(self, directory: str = "profiles", every: int = 1, max_files: int = 1000):
+        """
+        Inicializa o profiler.
+        
+        Args:
+            directory: Diretório dos arquivos .prof
+            every: Perfila 1 a cada N turnos
+            max_files: Para de gravar após esse número de arquivos
+        """
+        self.directory = os.path.abspath(directory)
+        self.every = max(1, every)
+        self.max_files = max_files
+        self.turns = 0
+        self.files = 0
+        os.makedirs(directory, exist_ok=True)
+    
+    @classmethod
+    def from_env(cls) -> Optional["TurnProfiler"]:
+        """
+        Cria o profiler a partir de PROFILE_TURNS_DIR/EVERY/MAX.
+        
+        Returns:
+            TurnProfiler, ou None se PROFILE_TURNS_DIR não estiver definida
+        """
+        directory = os.getenv("PROFILE_TURNS_DIR")
+        if not directory:
+            return None
+        profiler = cls(
+            directory,
+            every=int(os.getenv("PROFILE_TURNS_EVERY", "1")),
+            max_files=int(os.getenv("PROFILE_TURNS_MAX", "1000"))
+        )
+        print(f"🔬 Perfil por turno ativo: {directory} (1 a cada {profiler.every})")
+        return profiler
+    
+    @contextmanager
+    def profile(self, label: str = "turn") -> Iterator[Optional[cProfile.Profile]]:
+        """
+        Perfila o bloco se o turno atual for selecionado.
+        
+        Args:
+            label: Nome do turno no arquivo (ex.: 'listen', 'ask')
+        
+        Yields:
+            O cProfile.Profile ativo, ou None se o turno não for perfilado
+        """
+        self.turns += 1
+        if self.turns % self.every or self.files >= self.max_files:
+            yield None
+            return
+        
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+            path = os.path.join(self.directory, f"turn-{self.turns:06d}-{label}.prof")
+            profiler.dump_stats(path)
+            self.files += 1
@@ -0,0 +1,350 @@
+"""
+Armazenamento durável de sessões de conversa.
+
+Cada sessão é identificada por um ID e guarda o prompt de sistema e os
+turnos (user/assistant). As escritas são apenas inserções ao fim do
+histórico; ao retomar uma sessão, só a janela recente é lida. A
+compactação agrupa turnos antigos em blocos comprimidos, de modo que
+milhares de sessões ociosas ocupam pouco espaço em disco e nenhuma RAM.
+"""
+
+import json
+import time
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# Papéis gravados como inteiros (representação compacta)
+ROLES = {"system": 0, "user": 1, "assistant": 2}
+ROLE_NAMES = {code: name for name, code in ROLES.items()}
+
+
+class SessionStore(ABC):
+    """Interface comum dos armazenamentos de sessão."""
+    
+    def append(self, session_id: str, role: str, content: str):
+        """
+        Acrescenta um turno ao fim da sessão (cria a sessão se necessário).
+        
+        Args:
+            session_id: ID da sessão
+            role: 'user' ou 'assistant'
+            content: Texto da mensagem
+        """
+        self.append_many(session_id, [{"role": role, "content": content}])
+    
+    @abstractmethod
+    def append_many(self, session_id: str, messages: List[Dict[str, str]]):
+        """Acrescenta vários turnos em uma única escrita."""
+    
+    @abstractmethod
+    def load(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        """
+        Carrega os turnos mais recentes da sessão, em ordem cronológica.
+        
+        Args:
+            session_id: ID da sessão
+            limit: Número máximo de turnos (None = histórico completo)
+        
+        Returns:
+            Lista de mensagens {"role", "content"}
+        """
+    
+    @abstractmethod
+    def get_system_prompt(self, session_id: str) -> Optional[str]:
+        """Retorna o prompt de sistema da sessão, se houver."""
+    
+    @abstractmethod
+    def set_system_prompt(self, session_id: str, prompt: Optional[str]):
+        """Define (ou remove, com None) o prompt de sistema da sessão."""
+    
+    @abstractmethod
+    def delete(self, session_id: str):
+        """Apaga a sessão e todos os seus turnos."""
+    
+    def compact(self, **kwargs) -> Dict[str, int]:
+        """Compacta a representação armazenada (opcional)."""
+        return {"sessions": 0, "turns_archived": 0}
+    
+    def close(self):
+        """Libera os recursos do armazenamento."""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class MemorySessionStore(SessionStore):
+    """Armazenamento em memória (útil em testes e scripts curtos)."""
+    
+    def __init__(self):
+        self._turns: Dict[str, List[Dict[str, str]]] = {}
+        self._prompts: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+    
+    def append_many(self, session_id: str, messages: List[Dict[str, str]]):
+        with self._lock:
+            self._turns.setdefault(session_id, []).extend(
+                {"role": m["role"], "content": m["content"]} for m in messages
+            )
+    
+    def load(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        with self._lock:
+            turns = self._turns.get(session_id, [])
+            return [dict(m) for m in (turns[-limit:] if limit else turns)]
+    
+    def get_system_prompt(self, session_id: str) -> Optional[str]:
+        return self._prompts.get(session_id)
+    
+    def set_system_prompt(self, session_id: str, prompt: Optional[str]):
+        with self._lock:
+            self._prompts[session_id] = prompt
+            self._turns.setdefault(session_id, [])
+    
+    def delete(self, session_id: str):
+        with self._lock:
+            self._turns.pop(session_id, None)
+            self._prompts.pop(session_id, None)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Armazenamento em SQLite no modo WAL."""
+    
+    def __init__(
+        self,
+        path: str = "sessions.db",
+        compress_min_bytes: int = 512,
+        keep_recent: int = 20
+    ):
+        """
+        Abre (ou cria) o banco de sessões.
+        
+        Args:
+            path: Arquivo do banco SQLite
+            compress_min_bytes: Mensagens maiores que isso são gravadas comprimidas (zlib)
+            keep_recent: Turnos mantidos como linhas individuais na compactação
+        """
+        self.path = path
+        self.compress_min_bytes = compress_min_bytes
+        self.keep_recent = keep_recent
+        
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        
+        conn = self._connection()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                system_prompt TEXT,
+                turns INTEGER NOT NULL DEFAULT 0,
+                created REAL NOT NULL,
+                updated REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                role INTEGER NOT NULL,
+                content BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (session_id, seq)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS archives (
+                session_id TEXT NOT NULL,
+                first_seq INTEGER NOT NULL,
+                last_seq INTEGER NOT NULL,
+                data BLOB NOT NULL,
+                PRIMARY KEY (session_id, first_seq)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated);
+        """)
+    
+    def append_many(self, session_id: str, messages: List[Dict[str, str]]):
+        if not messages:
+            return
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, turns, created, updated) VALUES (?, 0, ?, ?) "
+                "ON CONFLICT (id) DO NOTHING",
+                (session_id, now, now)
+            )
+            (first_seq,) = conn.execute(
+                "SELECT turns FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            conn.executemany(
+                "INSERT INTO turns (session_id, seq, role, content, compressed) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (session_id, first_seq + i, ROLES[m["role"]], *self._encode(m["content"]))
+                    for i, m in enumerate(messages)
+                ]
+            )
+            conn.execute(
+                "UPDATE sessions SET turns = ?, updated = ? WHERE id = ?",
+                (first_seq + len(messages), now, session_id)
+            )
+    
+    def load(self, session_id: str, limit: Optional[int] = None) -> List[Dict[str, str]]:
+        conn = self._connection()
+        rows = conn.execute(
+            "SELECT role, content, compressed FROM turns WHERE session_id = ? "
+            "ORDER BY seq DESC LIMIT ?",
+            (session_id, -1 if limit is None else limit)
+        ).fetchall()
+        messages = [
+            {"role": ROLE_NAMES[role], "content": self._decode(content, compressed)}
+            for role, content, compressed in reversed(rows)
+        ]
+        
+        # Turnos antigos compactados só são lidos se a janela pedir
+        if limit is None or len(messages) < limit:
+            for (data,) in conn.execute(
+                "SELECT data FROM archives WHERE session_id = ? ORDER BY first_seq DESC",
+                (session_id,)
+            ):
+                messages = json.loads(zlib.decompress(data)) + messages
+                if limit is not None and len(messages) >= limit:
+                    break
+        
+        return messages if limit is None else messages[-limit:]
+    
+    def get_system_prompt(self, session_id: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT system_prompt FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def set_system_prompt(self, session_id: str, prompt: Optional[str]):
+        now = time.time()
+        with self._write() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, system_prompt, turns, created, updated) VALUES (?, ?, 0, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET system_prompt = excluded.system_prompt, updated = excluded.updated",
+                (session_id, prompt, now, now)
+            )
+    
+    def delete(self, session_id: str):
+        with self._write() as conn:
+            conn.execute("DELETE FROM turns WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM archives WHERE session_id = ?", (session_id,))
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+    
+    def count(self) -> int:
+        """Número de sessões armazenadas."""
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def compact(
+        self,
+        session_id: Optional[str] = None,
+        idle_seconds: Optional[float] = None,
+        keep_recent: Optional[int] = None,
+        vacuum: bool = False
+    ) -> Dict[str, int]:
+        """
+        Agrupa turnos antigos em blocos comprimidos.
+        
+        Os `keep_recent` turnos mais novos de cada sessão continuam como
+        linhas individuais (lidos ao retomar); os demais viram um único
+        bloco JSON comprimido por compactação.
+        
+        Args:
+            session_id: Compacta só esta sessão (None = todas)
+            idle_seconds: Só sessões sem atividade há pelo menos esse tempo
+            keep_recent: Turnos mantidos como linhas (padrão: o do construtor)
+            vacuum: Se True, executa VACUUM para devolver espaço ao sistema
+        
+        Returns:
+            Dicionário com sessões compactadas e turnos arquivados
+        """
+        keep = self.keep_recent if keep_recent is None else keep_recent
+        conn = self._connection()
+        
+        query = "SELECT id, turns FROM sessions WHERE 1 = 1"
+        params: List[Any] = []
+        if session_id is not None:
+            query += " AND id = ?"
+            params.append(session_id)
+        if idle_seconds is not None:
+            query += " AND updated <= ?"
+            params.append(time.time() - idle_seconds)
+        candidates = conn.execute(query, params).fetchall()
+        
+        stats = {"sessions": 0, "turns_archived": 0}
+        for sid, turns in candidates:
+            cutoff = turns - keep
+            with self._write() as conn:
+                rows = conn.execute(
+                    "SELECT seq, role, content, compressed FROM turns "
+                    "WHERE session_id = ? AND seq < ? ORDER BY seq",
+                    (sid, cutoff)
+                ).fetchall()
+                if not rows:
+                    continue
+                archive = [
+                    {"role": ROLE_NAMES[role], "content": self._decode(content, compressed)}
+                    for _, role, content, compressed in rows
+                ]
+                conn.execute(
+                    "INSERT INTO archives (session_id, first_seq, last_seq, data) VALUES (?, ?, ?, ?)",
+                    (sid, rows[0][0], rows[-1][0],
+                     zlib.compress(json.dumps(archive, ensure_ascii=False).encode("utf-8"), 9))
+                )
+                conn.execute("DELETE FROM turns WHERE session_id = ? AND seq < ?", (sid, cutoff))
+            stats["sessions"] += 1
+            stats["turns_archived"] += len(rows)
+        
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if vacuum:
+            conn.execute("VACUUM")
+        return stats
+    
+    def close(self):
+        """Fecha as conexões de todas as threads."""
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+    
+    def _connection(self) -> sqlite3.Connection:
+        """Conexão da thread atual (o WAL permite leitores concorrentes)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+    
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        """Transação de escrita (BEGIN IMMEDIATE evita conflitos entre processos)."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+    
+    def _encode(self, content: str):
+        """Codifica uma mensagem, comprimindo as longas."""
+        data = content.encode("utf-8")
+        if len(data) >= self.compress_min_bytes:
+            compressed = zlib.compress(data, 6)
+            if len(compressed) < len(data):
+                return compressed, 1
+        return content, 0
+    
+    @staticmethod
+    def _decode(content, compressed: int) -> str:
+        """Decodifica uma mensagem gravada por `_encode`."""
+        return zlib.decompress(content).decode("utf-8") if compressed else content
@@ -0,0 +1,280 @@
+"""
+Teste de resistência (soak test) do VoiceAssistant.
+
+Executa milhares de turnos sintéticos pelo assistente real, com
+substitutos locais para o microfone, o Whisper, a API do ChatGPT e a
+rede do gTTS, e amostra RSS, maiores alocadores (tracemalloc),
+descritores de arquivo abertos e arquivos temporários ao longo do tempo.
+Crescimentos lineares indicam vazamentos (histórico sem limite, caches,
+arquivos temporários esquecidos).
+
+Uso:
+    python -m src.soak --turns 5000 --sample-every 100 -o soak.jsonl
+    PROFILE_TURNS_DIR=profiles PROFILE_TURNS_EVERY=100 python -m src.soak
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import wave
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .voice_assistant import VoiceAssistant
+from .playback import NullSink
+from .profiling import ResourceSampler, TurnProfiler
+
+QUESTIONS = [
+    "Que horas são?",
+    "O que é Tesouro Direto?",
+    "Explique a diferença entre renda fixa e renda variável.",
+    "Vale a pena investir em ações no longo prazo?",
+    "Como montar uma reserva de emergência?",
+    "Quais são os riscos dos fundos imobiliários?",
+]
+
+
+class StandInRecorder:
+    """Substitui o microfone: grava ruído em um WAV."""
+    
+    def __init__(self, sample_rate: int = 16000):
+        self.sample_rate = sample_rate
+        self._rng = np.random.default_rng(0)
+    
+    def record(self, duration: int = 5, output_file: str = "recording.wav") -> str:
+        samples = (self._rng.normal(0, 0.05, int(duration * self.sample_rate)) * 32767).astype(np.int16)
+        with wave.open(output_file, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.sample_rate)
+            wf.writeframes(samples.tobytes())
+        return output_file
+    
+    def close(self):
+        pass
+
+
+class StandInTranscriber:
+    """Substitui o Whisper (interface do pool de transcrição): lê o WAV e devolve uma pergunta."""
+    
+    def __init__(self, questions: List[str], seed: int = 0):
+        self.questions = questions
+        self._rng = random.Random(seed)
+    
+    def transcribe(self, audio: str, language: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        with wave.open(audio, "rb") as wf:
+            frames = wf.getnframes()
+            wf.readframes(frames)
+        return {"text": self._rng.choice(self.questions), "language": language,
+                "audio_seconds": frames / 16000}
+
+
+def stand_in_completion(answer_words: int = 60, latency: float = 0.0, seed: int = 0):
+    """
+    Cria um substituto de `ChatGPTClient._complete` sem chamada de rede.
+    
+    Returns:
+        Função (messages, model) -> (resposta, latência)
+    """
+    rng = random.Random(seed)
+    vocabulary = "o a de que investimento risco prazo taxa renda juros valor mercado".split()
+    
+    def complete(messages, model):
+        if latency:
+            time.sleep(latency)
+        text = " ".join(rng.choice(vocabulary) for _ in range(answer_words)).capitalize() + "."
+        prompt_tokens = sum(len(m["content"]) for m in messages) // 4
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=text), finish_reason="stop")],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=answer_words,
+                                  total_tokens=prompt_tokens + answer_words)
+        )
+        return response, latency
+    
+    return complete
+
+
+def stand_in_mp3(seconds: float = 0.5) -> bytes:
+    """Gera um trecho MP3 curto para substituir a resposta do Google TTS."""
+    import soundfile as sf
+    t = np.arange(int(24000 * seconds)) / 24000
+    buffer = io.BytesIO()
+    sf.write(buffer, 0.2 * np.sin(2 * np.pi * 220 * t), 24000, format="MP3")
+    return buffer.getvalue()
+
+
+def build_assistant(whisper_model: Optional[str], answer_words: int, llm_latency: float,
+                    session_store=None, profiler: Optional[TurnProfiler] = None) -> VoiceAssistant:
+    """Cria um VoiceAssistant real com os substitutos locais."""
+    assistant = VoiceAssistant(
+        language="pt",
+        whisper_model=whisper_model or "small",
+        api_key="soak-test",
+        transcription_pool=None if whisper_model else StandInTranscriber(QUESTIONS),
+        playback_sink=NullSink(),
+        session_store=session_store,
+        session_id="soak" if session_store else None,
+        profiler=profiler
+    )
+    assistant.recorder = StandInRecorder()
+    assistant.chatgpt._complete = stand_in_completion(answer_words, llm_latency)
+    
+    mp3 = stand_in_mp3()
+    assistant.text_to_speech._request_chunk = lambda text, language: mp3
+    return assistant
+
+
+def run_soak(
+    turns: int = 5000,
+    sample_every: int = 100,
+    mode: str = "mixed",
+    whisper_model: Optional[str] = None,
+    answer_words: int = 60,
+    llm_latency: float = 0.0,
+    trace_allocations: bool = True,
+    session_db: Optional[str] = None,
+    output_file: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Executa o soak test.
+    
+    Args:
+        turns: Número de turnos
+        sample_every: Intervalo (em turnos) entre amostras de recursos
+        mode: 'listen' (gravação completa), 'ask' (texto) ou 'mixed' (alternados)
+        whisper_model: Usa o Whisper real com este modelo (None = substituto)
+        answer_words: Tamanho das respostas sintéticas
+        llm_latency: Latência simulada da API em segundos
+        trace_allocations: Liga o tracemalloc
+        session_db: Se informado, grava as conversas em SQLite
+        output_file: JSONL com as amostras e o resumo
+    
+    Returns:
+        Resumo com tendências por 1000 turnos e maiores alocadores
+    """
+    # Diretórios relativos (ex.: PROFILE_TURNS_DIR) são resolvidos antes de trocar de diretório
+    profiler = TurnProfiler.from_env()
+    if session_db:
+        session_db = os.path.abspath(session_db)
+    workdir = tempfile.mkdtemp(prefix="soak-")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    
+    sampler = ResourceSampler(temp_dirs=[workdir, tempfile.gettempdir()], trace_allocations=trace_allocations)
+    store = None
+    try:
+        if session_db:
+            from .session_store import SQLiteSessionStore
+            store = SQLiteSessionStore(session_db)
+        
+        with contextlib.redirect_stdout(io.StringIO()):
+            assistant = build_assistant(whisper_model, answer_words, llm_latency, store, profiler)
+        
+        print(f"🧪 Soak test: {turns} turnos (modo {mode}) em {workdir}")
+        sampler.sample(turn=0, history_len=len(assistant.chatgpt.conversation_history))
+        question_rng = random.Random(1)
+        
+        for turn in range(1, turns + 1):
+            listen = mode == "listen" or (mode == "mixed" and turn % 2)
+            with contextlib.redirect_stdout(io.StringIO()):
+                if listen:
+                    assistant.listen_and_respond(duration=1, save_audio=False)
+                else:
+                    assistant.ask(question_rng.choice(QUESTIONS), speak_response=True)
+            
+            if turn % sample_every == 0 or turn == turns:
+                record = sampler.sample(turn=turn, history_len=len(assistant.chatgpt.conversation_history))
+                print(
+                    f"📊 turno {turn}: RSS {record['rss_mb']:.1f} MB | fds {record['open_fds']} | "
+                    f"temp {record['temp_files']} | histórico {record['history_len']}"
+                    + (f" | tracemalloc {record['traced_mb']:.1f} MB" if "traced_mb" in record else "")
+                )
+        
+        summary = {
+            "turns": turns,
+            "rss_mb_per_1000_turns": sampler.growth_per_1000("rss_mb"),
+            "open_fds_per_1000_turns": sampler.growth_per_1000("open_fds"),
+            "temp_files_per_1000_turns": sampler.growth_per_1000("temp_files"),
+            "history_len_per_1000_turns": sampler.growth_per_1000("history_len"),
+            "traced_mb_per_1000_turns": sampler.growth_per_1000("traced_mb"),
+            "top_allocators": sampler.top_growth(),
+        }
+    finally:
+        os.chdir(previous_dir)
+        sampler.close()
+        if store:
+            store.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    if output_file:
+        with open(output_file, "w", encoding="utf-8") as f:
+            for record in sampler.samples:
+                f.write(json.dumps(record) + "\n")
+            f.write(json.dumps({"summary": summary}, ensure_ascii=False) + "\n")
+    
+    _print_summary(summary)
+    return summary
+
+
+def _print_summary(summary: Dict[str, Any]):
+    """Exibe as tendências de crescimento e os maiores alocadores."""
+    print("\n" + "=" * 60)
+    print(f"Tendência por 1000 turnos ({summary['turns']} turnos):")
+    for key, label in [
+        ("rss_mb_per_1000_turns", "RSS (MB)"),
+        ("traced_mb_per_1000_turns", "tracemalloc (MB)"),
+        ("open_fds_per_1000_turns", "Descritores abertos"),
+        ("temp_files_per_1000_turns", "Arquivos temporários"),
+        ("history_len_per_1000_turns", "Mensagens no histórico"),
+    ]:
+        value = summary.get(key)
+        print(f"  {label:<24}{'-' if value is None else f'{value:+.2f}'}")
+    if summary["top_allocators"]:
+        print("\nMaiores crescimentos de memória (tracemalloc):")
+        for line in summary["top_allocators"]:
+            print(f"  {line}")
+    print("=" * 60)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description="Soak test do assistente com substitutos locais.")
+    parser.add_argument("--turns", type=int, default=5000)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument("--mode", choices=["listen", "ask", "mixed"], default="mixed")
+    parser.add_argument("--whisper-model", default=None, help="Usa o Whisper real (padrão: substituto)")
+    parser.add_argument("--answer-words", type=int, default=60)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Latência simulada da API (s)")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Não rastreia alocações (mais rápido)")
+    parser.add_argument("--session-db", default=None, help="Grava as conversas neste SQLite")
+    parser.add_argument("-o", "--output", default=None, help="JSONL com as amostras")
+    args = parser.parse_args(argv)
+    
+    run_soak(
+        turns=args.turns,
+        sample_every=args.sample_every,
+        mode=args.mode,
+        whisper_model=args.whisper_model,
+        answer_words=args.answer_words,
+        llm_latency=args.llm_latency,
+        trace_allocations=not args.no_tracemalloc,
+        session_db=os.path.abspath(args.session_db) if args.session_db else None,
+        output_file=os.path.abspath(args.output) if args.output else None
+    )
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n⏹️ Soak test interrompido.")
+        sys.exit(130)
@@ -2,34 +2,177 @@
 Módulo para transcrição de áudio usando Whisper (OpenAI).
 """
 
+import os
+import torch
 import whisper
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterable, Callable, Union
+from .long_form import LongFormTranscriber
+from .log_mel import LogMelFeatures, transcribe_features
+from .model_lock import model_lock
+from .streaming_stt import StreamingTranscriber
+from .model_router import WhisperModelRouter
+
+# Última configuração aplicada por set_torch_threads (global do processo)
+_TORCH_THREADS: Optional[int] = None
+
+
+def set_torch_threads(num_threads: int):
+    """
+    Define as threads intra-op do PyTorch.
+    
+    `torch.set_num_threads` vale para o processo inteiro: duas instâncias
+    com valores diferentes não têm configurações independentes. Por isso é
+    aplicado uma única vez, na criação, e um valor diferente de um já
+    aplicado gera um aviso.
+    
+    Args:
+        num_threads: Número de threads
+    """
+    global _TORCH_THREADS
+    if _TORCH_THREADS is not None and _TORCH_THREADS != num_threads:
+        print(f"⚠️ PyTorch já usava {_TORCH_THREADS} threads; passa a usar {num_threads} no processo inteiro")
+    torch.set_num_threads(num_threads)
+    _TORCH_THREADS = num_threads
+
+
+def quantize_model(model: torch.nn.Module) -> torch.nn.Module:
+    """
+    Aplica quantização dinâmica int8 às camadas lineares do modelo.
+    
+    O Whisper usa uma subclasse própria de `nn.Linear`, que o PyTorch não
+    reconhece na quantização; por isso as camadas são trocadas por
+    `nn.Linear` comuns (mesmos pesos) antes de quantizar.
+    
+    Args:
+        model: Modelo Whisper em fp32 na CPU
+        
+    Returns:
+        Modelo com camadas lineares int8
+    """
+    def to_plain_linear(module: torch.nn.Module):
+        for name, child in module.named_children():
+            if isinstance(child, torch.nn.Linear) and type(child) is not torch.nn.Linear:
+                plain = torch.nn.Linear(child.in_features, child.out_features, bias=child.bias is not None)
+                plain.weight = child.weight
+                plain.bias = child.bias
+                setattr(module, name, plain)
+            else:
+                to_plain_linear(child)
+    
+    to_plain_linear(model)
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
 
 
 class SpeechToText:
     """Classe para conversão de áudio em texto usando Whisper."""
     
-    def __init__(self, model_name: str = "small", language: str = "pt"):
+    def __init__(
+        self,
+        model_name: str = "small",
+        language: str = "pt",
+        quantize: bool = False,
+        num_threads: Optional[int] = None,
+        cpu_affinity: Optional[Iterable[int]] = None,
+        router: Optional[WhisperModelRouter] = None
+    ):
         """
         Inicializa o modelo Whisper.
         
         Args:
             model_name: Nome do modelo ('tiny', 'base', 'small', 'medium', 'large')
             language: Código do idioma (pt, en, es, fr, etc.)
+            quantize: Se True, quantiza as camadas lineares para int8 (apenas CPU)
+            num_threads: Threads intra-op do PyTorch (configuração global do processo,
+                aplicada uma vez na criação; ver `set_torch_threads`)
+            cpu_affinity: Núcleos de CPU aos quais o processo fica restrito (Linux)
+            router: Roteador que escolhe o modelo por idioma/duração a cada chamada
+                (ignora model_name; a quantização é a do roteador)
         """
+        if router and quantize and not router.quantize:
+            raise ValueError(
+                "quantize=True não tem efeito com roteador; use WhisperModelRouter(quantize=True)."
+            )
+        
         self.language = language
         self.model_name = model_name
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.router = router
+        
+        if cpu_affinity is not None:
+            if hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, set(cpu_affinity))
+            else:
+                print("⚠️ Afinidade de CPU não suportada nesta plataforma")
+        
+        if num_threads:
+            set_torch_threads(num_threads)
+        if router:
+            # Nenhuma referência guardada: o LRU do roteador precisa poder liberar o modelo
+            self.model = None
+            router.get(router.select(language))  # pré-carrega o modelo mais provável
+            return
         
         print(f"📥 Carregando modelo Whisper '{model_name}'...")
-        self.model = whisper.load_model(model_name)
-        print(f"✅ Modelo carregado com sucesso!")
+        if quantize:
+            self.model = quantize_model(whisper.load_model(model_name, device="cpu"))
+        else:
+            self.model = whisper.load_model(model_name)
+        print(f"✅ Modelo carregado com sucesso!{' (int8)' if quantize else ''}")
+    
+    def get_model(self, language: Optional[str] = None, audio_seconds: Optional[float] = None):
+        """
+        Retorna o modelo usado para um idioma e duração.
+        
+        Sem roteador, é sempre o modelo carregado na inicialização; com
+        roteador, é resolvido a cada chamada (pode carregar um modelo).
+        
+        Args:
+            language: Idioma (usa o padrão se não especificado)
+            audio_seconds: Duração do áudio (None = regra mais abrangente)
+        
+        Returns:
+            Modelo Whisper
+        """
+        if not self.router:
+            return self.model
+        return self.router.get(self.router.select(language or self.language, audio_seconds))
+    
+    def _resolve(self, audio_file: Union[str, LogMelFeatures], language: Optional[str]):
+        """
+        Define modelo, entrada e idioma de uma transcrição.
+        
+        Com roteador, o áudio é carregado uma única vez para medir a duração
+        (e detectar o idioma, se necessário) e reaproveitado na transcrição.
+        Features já calculadas são usadas diretamente.
+        """
+        if not self.router:
+            return self.model, audio_file, language
+        
+        if isinstance(audio_file, LogMelFeatures):
+            if not language or language == "auto":
+                language = self.router.detect_language(audio_file)
+            return self.get_model(language, audio_file.seconds), audio_file, language
+        
+        audio = whisper.load_audio(audio_file)
+        model, language = self.router.route(audio, language)
+        return model, audio, language
+    
+    @staticmethod
+    def _run(model, audio, **options) -> Dict[str, Any]:
+        """Chama `model.transcribe`; features da captura passam por `transcribe_features`."""
+        if isinstance(audio, LogMelFeatures):
+            return transcribe_features(model, audio, **options)
+        with model_lock(model):
+            return model.transcribe(audio, **options)
     
-    def transcribe(self, audio_file: str, language: Optional[str] = None) -> str:
+    def transcribe(self, audio_file: Union[str, LogMelFeatures], language: Optional[str] = None) -> str:
         """
         Transcreve um arquivo de áudio.
         
         Args:
-            audio_file: Caminho do arquivo de áudio
+            audio_file: Caminho do arquivo de áudio ou log-mel calculado na captura
+                (`AudioRecorder.get_features()`), que dispensa decodificar o arquivo
             language: Idioma opcional (usa o padrão se não especificado)
             
         Returns:
@@ -39,8 +182,10 @@ class SpeechToText:
         
         print(f"🧠 Transcrevendo áudio (idioma: {lang})...")
         
-        result = self.model.transcribe(
-            audio_file,
+        model, audio, lang = self._resolve(audio_file, lang)
+        result = self._run(
+            model,
+            audio,
             language=lang,
             fp16=False  # Compatibilidade com CPU
         )
@@ -50,12 +195,12 @@ class SpeechToText:
         
         return transcription
     
-    def transcribe_detailed(self, audio_file: str, language: Optional[str] = None) -> Dict[str, Any]:
+    def transcribe_detailed(self, audio_file: Union[str, LogMelFeatures], language: Optional[str] = None) -> Dict[str, Any]:
         """
         Transcreve com informações detalhadas.
         
         Args:
-            audio_file: Caminho do arquivo de áudio
+            audio_file: Caminho do arquivo de áudio ou log-mel calculado na captura
             language: Idioma opcional
             
         Returns:
@@ -65,8 +210,10 @@ class SpeechToText:
         
         print(f"🧠 Transcrevendo áudio (modo detalhado)...")
         
-        result = self.model.transcribe(
-            audio_file,
+        model, audio, lang = self._resolve(audio_file, lang)
+        result = self._run(
+            model,
+            audio,
             language=lang,
             fp16=False,
             verbose=False
@@ -77,6 +224,66 @@ class SpeechToText:
             "language": result.get("language", lang),
             "segments": result.get("segments", []),
         }
+    
+    def stream(
+        self,
+        recorder,
+        language: Optional[str] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+        **options
+    ) -> StreamingTranscriber:
+        """
+        Inicia a transcrição incremental dos blocos de um gravador.
+        
+        Deve ser chamado antes de `recorder.record()`; ao fim da gravação,
+        `finish()` do transcritor retorna o texto final.
+        
+        Args:
+            recorder: AudioRecorder cuja captura será transcrita
+            language: Idioma opcional (usa o padrão se não especificado)
+            on_partial: Função chamada a cada hipótese parcial
+            **options: Parâmetros repassados ao StreamingTranscriber
+                (interval, max_window, max_cpu_ratio, ...)
+            
+        Returns:
+            StreamingTranscriber já conectado ao gravador
+        """
+        lang = language or self.language
+        # Com roteador, a duração ainda é desconhecida: usa a regra mais abrangente do idioma
+        model = self.get_model(lang)
+        transcriber = StreamingTranscriber(model, language=lang, on_partial=on_partial, **options)
+        return transcriber.attach(recorder)
+    
+    def transcribe_long(
+        self,
+        audio_file: str,
+        language: Optional[str] = None,
+        workers: Optional[int] = None,
+        chunk_seconds: float = 30.0
+    ) -> Dict[str, Any]:
+        """
+        Transcreve gravações longas em trechos paralelos com memória limitada.
+        
+        Args:
+            audio_file: Caminho do arquivo de áudio
+            language: Idioma opcional
+            workers: Número de processos (padrão: núcleos disponíveis)
+            chunk_seconds: Duração máxima de cada trecho
+            
+        Returns:
+            Dicionário com transcrição, segmentos com tempos globais e estatísticas
+        """
+        lang = language or self.language
+        model_name = self.router.select(lang) if self.router else self.model_name
+        transcriber = LongFormTranscriber(
+            self.get_model(lang),
+            model_name=model_name,
+            language=lang,
+            workers=workers,
+            chunk_seconds=chunk_seconds,
+            torch_threads=self.num_threads or 1
+        )
+        return transcriber.transcribe(audio_file)
 
 
 def transcribe_audio(audio_file: str, model: str = "small", language: str = "pt") -> str:
@@ -99,9 +306,14 @@ if __name__ == "__main__":
     # Teste do módulo
     import sys
     
-    if len(sys.argv) > 1:
+    if len(sys.argv) > 2 and sys.argv[1] == "--long":
+        stt = SpeechToText()
+        result = stt.transcribe_long(sys.argv[2])
+        for segment in result["segments"]:
+            print(f"[{segment['start']:8.2f} → {segment['end']:8.2f}] {segment['text']}")
+    elif len(sys.argv) > 1:
         audio_path = sys.argv[1]
         text = transcribe_audio(audio_path)
         print(f"\n✅ Resultado: {text}")
     else:
-        print("Uso: python speech_to_text.py <caminho_do_audio>")
+        print("Uso: python speech_to_text.py [--long] <caminho_do_audio>")
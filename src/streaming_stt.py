@@ -0,0 +1,331 @@
+"""
+Transcrição incremental durante a gravação.
+
+Enquanto o AudioRecorder captura, os blocos são reamostrados para 16 kHz
+e, a cada poucas centenas de milissegundos, o Whisper decodifica apenas a
+cauda ainda não confirmada do áudio. Palavras que se repetem em duas
+hipóteses consecutivas são consideradas estáveis (concordância local);
+segmentos estáveis que terminam longe da borda do áudio são confirmados,
+e o início da janela avança até o fim deles. Ao parar a gravação, resta
+decodificar só a cauda curta.
+
+O custo é limitado por um orçamento de CPU por segundo de áudio: após cada
+passada, a próxima espera o suficiente para manter a razão tempo de
+CPU / tempo de áudio abaixo de `max_cpu_ratio` — mas nunca a ponto de a
+cauda não confirmada encher o buffer de captura. Se a decodificação ainda
+assim ficar para trás, o trecho sobrescrito é contabilizado e as posições
+são rebaseadas no áudio que restou.
+
+Com `language="auto"` (ou None), o idioma é detectado na primeira passada
+com pelo menos DETECT_SECONDS de áudio (ou a janela inteira, se menor) e
+mantido nas seguintes.
+"""
+
+import time
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import whisper
+
+from .audio_recorder import RingBuffer
+from .audio_preprocessing import StreamResampler
+from .model_lock import model_lock
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+# Áudio mínimo para fixar o idioma detectado automaticamente
+DETECT_SECONDS = 2.0
+
+
+def common_prefix(a: List[str], b: List[str]) -> int:
+    """
+    Tamanho do prefixo comum entre duas listas de palavras.
+    
+    A comparação ignora caixa e pontuação nas bordas das palavras.
+    
+    Returns:
+        Número de palavras iguais no início das duas listas
+    """
+    n = 0
+    for word_a, word_b in zip(a, b):
+        if word_a.strip(".,!?;:\"'").lower() != word_b.strip(".,!?;:\"'").lower():
+            break
+        n += 1
+    return n
+
+
+class StreamingTranscriber:
+    """Transcreve o áudio em captura com hipóteses parciais estabilizadas."""
+    
+    def __init__(
+        self,
+        model,
+        language: Optional[str] = "pt",
+        interval: float = 0.5,
+        max_window: float = 20.0,
+        commit_margin: float = 1.0,
+        max_cpu_ratio: float = 0.5,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+        prompt_chars: int = 200
+    ):
+        """
+        Inicializa o transcritor incremental.
+        
+        Args:
+            model: Modelo Whisper carregado
+            language: Idioma da fala ('auto' ou None = detecta na primeira passada)
+            interval: Intervalo mínimo entre decodificações (segundos)
+            max_window: Cauda máxima não confirmada; acima disso, confirma à força
+            commit_margin: Segmentos que terminam a menos disso da borda não são confirmados
+            max_cpu_ratio: Segundos de CPU permitidos por segundo de áudio capturado
+            on_partial: Função chamada (na thread de decodificação) a cada hipótese nova
+            prompt_chars: Caracteres do texto confirmado usados como contexto
+        """
+        self.model = model
+        self.language = None if language == "auto" else language
+        self.interval = interval
+        self.max_window = max_window
+        self.commit_margin = commit_margin
+        self.max_cpu_ratio = max_cpu_ratio
+        self.on_partial = on_partial
+        self.prompt_chars = prompt_chars
+        
+        self._audio = RingBuffer(int(2 * max_window * SAMPLE_RATE))
+        self._resampler: Optional[StreamResampler] = None
+        self._recorder = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._partials: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        
+        self._committed: List[str] = []
+        self._committed_sample = 0
+        self._hypothesis: List[str] = []
+        self._last_text = ""
+        self.stats = {
+            "passes": 0,
+            "cpu_seconds": 0.0,
+            "decode_seconds": 0.0,
+            "decoded_audio_seconds": 0.0,
+            "forced_commits": 0,
+            "dropped_seconds": 0.0,
+        }
+    
+    def attach(self, recorder) -> "StreamingTranscriber":
+        """
+        Passa a receber os blocos de um AudioRecorder e inicia a decodificação.
+        
+        Args:
+            recorder: Gravador (os blocos chegam na taxa `recorder.sample_rate`)
+        
+        Returns:
+            O próprio transcritor
+        """
+        self._recorder = recorder
+        self.start(recorder.sample_rate)  # cria o reamostrador antes do primeiro bloco
+        recorder.add_block_listener(self.feed)
+        return self
+    
+    def start(self, sample_rate: int = SAMPLE_RATE) -> "StreamingTranscriber":
+        """
+        Inicia a thread de decodificação para áudio entregue por `feed`.
+        
+        Args:
+            sample_rate: Taxa de amostragem dos blocos recebidos
+        
+        Returns:
+            O próprio transcritor
+        """
+        self._resampler = StreamResampler(sample_rate, SAMPLE_RATE)
+        self._thread = threading.Thread(target=self._run, name="streaming-stt", daemon=True)
+        self._thread.start()
+        return self
+    
+    def feed(self, block: np.ndarray):
+        """Recebe um bloco capturado (rápido: só reamostra e copia)."""
+        self._audio.write(self._resampler.process(block))
+    
+    @property
+    def audio_seconds(self) -> float:
+        """Áudio recebido até agora, em segundos."""
+        return self._audio.total_written / SAMPLE_RATE
+    
+    def partials(self) -> Iterator[Dict[str, Any]]:
+        """
+        Gera as hipóteses parciais até o fim da transcrição.
+        
+        Yields:
+            Dicionários com committed, tentative e text
+        """
+        while True:
+            partial = self._partials.get()
+            if partial is None:
+                return
+            yield partial
+    
+    def finish(self) -> Dict[str, Any]:
+        """
+        Encerra a captura, decodifica a cauda restante e confirma tudo.
+        
+        Returns:
+            Dicionário com text, language e as estatísticas (inclui
+            cpu_per_audio_second e final_seconds, o tempo entre o fim da
+            gravação e o texto final)
+        """
+        start = time.perf_counter()
+        self._detach()
+        if self._resampler is not None:
+            self._audio.write(self._resampler.flush())  # amostras finais retidas pelo filtro
+        with self._lock:
+            samples = self._pending()
+            if samples.shape[0] >= SAMPLE_RATE // 10:
+                segments = self._decode(samples)
+                self._committed.extend(s["text"].strip() for s in segments if s["text"].strip())
+                self._committed_sample += samples.shape[0]
+            self._hypothesis = []
+            self._emit()
+        self._partials.put(None)
+        
+        text = " ".join(self._committed)
+        return {"text": text, "language": self.language, **self.metrics(),
+                "final_seconds": time.perf_counter() - start}
+    
+    def cancel(self):
+        """Interrompe sem decodificar a cauda (ex.: erro na gravação)."""
+        self._detach()
+        self._partials.put(None)
+    
+    def metrics(self) -> Dict[str, Any]:
+        """
+        Custo da transcrição incremental até agora.
+        
+        Returns:
+            Estatísticas das passadas e cpu_per_audio_second
+        """
+        audio_seconds = self.audio_seconds
+        return {
+            **self.stats,
+            "audio_seconds": audio_seconds,
+            "cpu_per_audio_second": self.stats["cpu_seconds"] / audio_seconds if audio_seconds else 0.0,
+        }
+    
+    def _detach(self):
+        """Para a thread de decodificação e deixa de receber blocos."""
+        if self._recorder is not None:
+            self._recorder.remove_block_listener(self.feed)
+            self._recorder = None
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+    
+    def _run(self):
+        """Laço de decodificação: uma passada por intervalo, dentro do orçamento de CPU."""
+        wait = self.interval
+        while not self._stop.wait(wait):
+            with self._lock:
+                if self._stop.is_set():
+                    return
+                samples = self._pending()
+                if samples.shape[0] < self.interval * SAMPLE_RATE:
+                    wait = self.interval
+                    continue
+                
+                cpu_start, wall_start = time.process_time(), time.perf_counter()
+                segments = self._decode(samples)
+                self._update(segments, samples.shape[0] / SAMPLE_RATE)
+                cpu = time.process_time() - cpu_start
+                wall = time.perf_counter() - wall_start
+                self._emit()
+                tail = self._audio.total_written - self._committed_sample
+            
+            # Mantém cpu / (wall + espera) <= max_cpu_ratio, mas a próxima passada
+            # (estimada tão longa quanto esta) termina antes de o buffer encher
+            wait = max(self.interval, cpu / self.max_cpu_ratio - wall)
+            headroom = (self._audio.capacity - tail) / SAMPLE_RATE - wall
+            wait = min(wait, max(0.0, headroom))
+    
+    def _pending(self) -> np.ndarray:
+        """
+        Cauda ainda não confirmada.
+        
+        Se a decodificação ficou tanto para trás que o buffer circular
+        sobrescreveu parte dela, o trecho perdido é contabilizado em
+        dropped_seconds e o início confirmado avança para o áudio que restou,
+        mantendo as posições alinhadas com o buffer.
+        """
+        samples, end = self._audio.since(self._committed_sample)
+        lost = end - self._committed_sample - samples.shape[0]
+        if lost > 0:
+            self._committed_sample += lost
+            self.stats["dropped_seconds"] += lost / SAMPLE_RATE
+            print(f"⚠️ Transcrição incremental atrasada: {lost / SAMPLE_RATE:.1f}s de áudio descartados")
+        return samples
+    
+    def _decode(self, samples: np.ndarray) -> List[Dict[str, Any]]:
+        """Decodifica a cauda não confirmada e contabiliza o custo."""
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        prompt = " ".join(self._committed)[-self.prompt_chars:] or None
+        with model_lock(self.model):
+            result = self.model.transcribe(
+                samples,
+                language=self.language,  # None: o Whisper detecta
+                fp16=False,
+                temperature=0.0,  # sem novas tentativas: custo previsível por passada
+                condition_on_previous_text=False,
+                initial_prompt=prompt,
+                verbose=None
+            )
+        self.stats["passes"] += 1
+        self.stats["cpu_seconds"] += time.process_time() - cpu_start
+        self.stats["decode_seconds"] += time.perf_counter() - wall_start
+        self.stats["decoded_audio_seconds"] += samples.shape[0] / SAMPLE_RATE
+        if self.language is None and samples.shape[0] >= min(DETECT_SECONDS, self.max_window) * SAMPLE_RATE:
+            # Fixa o idioma para as próximas passadas não alternarem entre idiomas
+            self.language = result.get("language")
+        return result.get("segments", [])
+    
+    def _update(self, segments: List[Dict[str, Any]], tail_seconds: float):
+        """Confirma os segmentos estáveis e guarda a hipótese do restante."""
+        words = [w for s in segments for w in s["text"].split()]
+        stable = common_prefix(self._hypothesis, words)
+        force = tail_seconds >= self.max_window
+        
+        committed_words = 0
+        commit_until = 0.0
+        for i, segment in enumerate(segments):
+            segment_words = len(segment["text"].split())
+            is_last = i == len(segments) - 1
+            if force:
+                # Janela cheia: confirma tudo menos o último segmento (ou ele, se for o único)
+                if is_last and i > 0:
+                    break
+            elif committed_words + segment_words > stable or segment["end"] > tail_seconds - self.commit_margin:
+                break
+            committed_words += segment_words
+            commit_until = min(segment["end"], tail_seconds)
+            if segment["text"].strip():
+                self._committed.append(segment["text"].strip())
+        
+        if force:
+            self.stats["forced_commits"] += 1
+            if not committed_words:
+                commit_until = tail_seconds
+        self._committed_sample += int(commit_until * SAMPLE_RATE)
+        self._hypothesis = words[committed_words:]
+    
+    def _emit(self):
+        """Publica a hipótese atual se ela mudou."""
+        committed = " ".join(self._committed)
+        tentative = " ".join(self._hypothesis)
+        text = f"{committed} {tentative}".strip()
+        if text == self._last_text:
+            return
+        self._last_text = text
+        partial = {"committed": committed, "tentative": tentative, "text": text,
+                   "audio_seconds": self.audio_seconds}
+        self._partials.put(partial)
+        if self.on_partial:
+            self.on_partial(partial)
@@ -1,10 +1,27 @@
 """
 Módulo para síntese de voz usando gTTS (Google Text-to-Speech).
+
+Textos longos são divididos em trechos nos limites de frase (e no limite
+de caracteres por requisição do Google TTS), sintetizados em paralelo por
+um pool limitado de threads com sessões HTTP reaproveitadas e concatenados
+em ordem. O primeiro trecho fica disponível assim que pronto.
 """
 
 import os
+import re
+import time
+import base64
+import warnings
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Union
+
+import requests
+from urllib3.exceptions import InsecureRequestWarning
 from gtts import gTTS
-from typing import Optional
+from gtts.tts import gTTSError
+
+from .playback import PlaybackSink, StreamingPlayer
 try:
     from IPython.display import Audio, display
     IPYTHON_AVAILABLE = True
@@ -12,19 +29,180 @@ except ImportError:
     IPYTHON_AVAILABLE = False
 
 
+# Limite de caracteres por requisição da API do Google TTS
+MAX_CHUNK_CHARS = gTTS.GOOGLE_TTS_MAX_CHARS
+
+# Identificador da resposta com o áudio (o mesmo que o gTTS procura)
+GOOGLE_TTS_RPC = getattr(gTTS, "GOOGLE_TTS_RPC", "jQ1olc")
+
+
+def split_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> List[str]:
+    """
+    Divide um texto em trechos de até `max_chars` caracteres.
+    
+    Frases curtas consecutivas são agrupadas; frases longas são quebradas
+    em vírgulas/ponto e vírgula e, se ainda assim excederem o limite, entre
+    palavras. Palavras maiores que o limite (ex.: URLs) são divididas em
+    pedaços, sem perder caracteres.
+    
+    Args:
+        text: Texto completo
+        max_chars: Tamanho máximo de cada trecho
+        
+    Returns:
+        Lista de trechos na ordem original
+    """
+    pieces = []
+    for sentence in re.split(r"(?<=[.!?…:])\s+|\n+", text.strip()):
+        sentence = sentence.strip()
+        if len(sentence) <= max_chars:
+            pieces.append(sentence)
+            continue
+        for clause in re.split(r"(?<=[,;])\s+", sentence):
+            if len(clause) <= max_chars:
+                pieces.append(clause)
+                continue
+            words, current = clause.split(), ""
+            for word in words:
+                while len(word) > max_chars:
+                    if current:
+                        pieces.append(current)
+                        current = ""
+                    pieces.append(word[:max_chars])
+                    word = word[max_chars:]
+                if not word:
+                    continue
+                if current and len(current) + 1 + len(word) > max_chars:
+                    pieces.append(current)
+                    current = ""
+                current = f"{current} {word}" if current else word
+            pieces.append(current)
+    
+    # Agrupa trechos pequenos até o limite
+    chunks: List[str] = []
+    for piece in filter(None, pieces):
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] = f"{chunks[-1]} {piece}"
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+def _is_transient(error: Exception) -> bool:
+    """Falhas que valem nova tentativa: conexão, timeout, HTTP 429 e 5xx."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+    status = getattr(getattr(error, "rsp", None), "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+class _InsecureRequestWarnings:
+    """
+    Silencia o InsecureRequestWarning enquanto houver requisições sem
+    verificação TLS em andamento (de qualquer thread desta instância ou de
+    outras); fora delas, o filtro de avisos do processo fica como estava.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = 0
+        self._context = None
+    
+    def __enter__(self):
+        with self._lock:
+            if self._users == 0:
+                self._context = warnings.catch_warnings()
+                self._context.__enter__()
+                warnings.simplefilter("ignore", InsecureRequestWarning)
+            self._users += 1
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        with self._lock:
+            self._users -= 1
+            if self._users == 0:
+                self._context.__exit__(None, None, None)
+                self._context = None
+
+
+_INSECURE_REQUEST_WARNINGS = _InsecureRequestWarnings()
+
+
 class TextToSpeech:
     """Classe para conversão de texto em voz."""
     
-    def __init__(self, language: str = "pt", slow: bool = False):
+    def __init__(
+        self,
+        language: str = "pt",
+        slow: bool = False,
+        max_workers: int = 4,
+        max_retries: int = 2,
+        timeout: Optional[float] = 10.0,
+        sink: Optional[PlaybackSink] = None,
+        verify: Union[bool, str] = False
+    ):
         """
         Inicializa o sintetizador de voz.
         
         Args:
             language: Código do idioma (pt, en, es, etc.)
             slow: Se True, fala mais devagar
+            max_workers: Trechos sintetizados em paralelo (1 = sequencial)
+            max_retries: Novas tentativas por trecho em falhas transitórias
+                (conexão, timeout, HTTP 429 e 5xx)
+            timeout: Tempo limite de cada requisição em segundos
+            sink: Saída de reprodução fora de notebooks (ver `playback.create_sink`)
+            verify: Verificação TLS das requisições; False, como no gTTS (proxies
+                que interceptam TLS), True ou o caminho de um bundle de CAs.
+                Com False, o InsecureRequestWarning é silenciado só durante
+                essas requisições
         """
         self.language = language
         self.slow = slow
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.sink = sink
+        self.verify = verify
+        self.last_playback: Optional[dict] = None
+        
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def stream(self, text: str, language: Optional[str] = None) -> Iterator[bytes]:
+        """
+        Sintetiza o texto em paralelo e entrega o MP3 de cada trecho em ordem.
+        
+        O primeiro trecho é entregue assim que fica pronto, sem esperar os
+        demais, que continuam sendo sintetizados em segundo plano.
+        
+        Args:
+            text: Texto para sintetizar
+            language: Idioma (usa o padrão se não especificado)
+            
+        Yields:
+            Bytes MP3 de cada trecho, na ordem do texto
+        """
+        lang = language or self.language
+        chunks = split_text(text)
+        if not chunks:
+            raise ValueError("Nenhum texto para sintetizar.")
+        
+        if len(chunks) == 1 or self.max_workers <= 1:
+            for chunk in chunks:
+                yield self._synthesize_chunk(chunk, lang)
+            return
+        
+        executor = self._get_executor()
+        futures = [executor.submit(self._synthesize_chunk, chunk, lang) for chunk in chunks]
+        try:
+            for future in futures:
+                yield future.result()
+        finally:
+            # Consumidor parou antes do fim (ou houve erro): descarta o restante
+            for future in futures:
+                future.cancel()
     
     def synthesize(
         self, 
@@ -40,7 +218,8 @@ class TextToSpeech:
             text: Texto para sintetizar
             output_file: Arquivo de saída
             language: Idioma (usa o padrão se não especificado)
-            auto_play: Se True, toca o áudio automaticamente (apenas em notebooks)
+            auto_play: Se True, toca o áudio automaticamente (pelo sink configurado,
+                já a partir do primeiro trecho, ou no notebook ao final)
             
         Returns:
             Caminho do arquivo de áudio
@@ -50,15 +229,28 @@ class TextToSpeech:
         print(f"🔊 Sintetizando voz (idioma: {lang})...")
         
         try:
-            # Cria objeto gTTS
-            tts = gTTS(text=text, lang=lang, slow=self.slow)
+            start = time.perf_counter()
+            first_chunk = None
+            self.last_playback = None
+            player = StreamingPlayer(self.sink, start) if auto_play and self.sink else None
+            
+            # Grava cada trecho assim que chega, na ordem, e o envia ao sink
+            with open(output_file, "wb") as f:
+                for audio in self.stream(text, lang):
+                    f.write(audio)
+                    f.flush()
+                    if first_chunk is None:
+                        first_chunk = time.perf_counter() - start
+                    if player:
+                        player = self._feed(player, audio)
             
-            # Salva o arquivo
-            tts.save(output_file)
-            print(f"✅ Áudio salvo em: {output_file}")
+            print(f"✅ Áudio salvo em: {output_file} "
+                  f"(primeiro trecho em {first_chunk:.2f}s, total {time.perf_counter() - start:.2f}s)")
             
-            # Reproduz automaticamente se solicitado (apenas em notebooks)
-            if auto_play and IPYTHON_AVAILABLE:
+            if player:
+                self._finish(player)
+            elif auto_play and IPYTHON_AVAILABLE:
+                # Reproduz automaticamente no notebook
                 display(Audio(output_file, autoplay=True))
             
             return output_file
@@ -67,9 +259,130 @@ class TextToSpeech:
             print(f"❌ Erro ao sintetizar voz: {e}")
             raise
     
+    def close(self):
+        """Encerra o pool de threads da síntese paralela."""
+        with self._lock:
+            if self._executor:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        """Cria o pool de threads sob demanda (reaproveitado entre chamadas)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="tts"
+                )
+            return self._executor
+    
+    def _session(self) -> requests.Session:
+        """Sessão HTTP da thread atual (mantém a conexão aberta entre trechos)."""
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+    
+    def _synthesize_chunk(self, text: str, language: str) -> bytes:
+        """
+        Sintetiza um trecho, com novas tentativas em falhas transitórias.
+        
+        Returns:
+            Bytes MP3 do trecho
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._request_chunk(text, language)
+            except (gTTSError, requests.exceptions.RequestException) as e:
+                if attempt == self.max_retries or not _is_transient(e):
+                    raise
+                delay = 0.5 * 2 ** attempt
+                print(f"⚠️ Falha ao sintetizar trecho ({e}); nova tentativa em {delay:.1f}s...")
+                time.sleep(delay)
+    
+    def _request_chunk(self, text: str, language: str) -> bytes:
+        """
+        Envia as requisições de um trecho pela sessão da thread e decodifica o MP3.
+        
+        O `gTTS.stream()` público abre uma sessão nova a cada trecho e
+        desativa o aviso de TLS do processo inteiro; aqui só as requisições
+        são montadas pelo gTTS (`_prepare_requests`, presente nas versões
+        fixadas em requirements.txt) e enviadas pela sessão da thread.
+        `Session.send` não aplica as configurações do ambiente; como no
+        `Session.request`, proxies (HTTP(S)_PROXY/NO_PROXY) e bundle de CAs
+        do ambiente são mesclados à chamada.
+        """
+        tts = gTTS(text=text, lang=language, slow=self.slow, timeout=self.timeout)
+        prepare_requests = getattr(tts, "_prepare_requests", None)
+        if prepare_requests is None:
+            raise RuntimeError(
+                "Esta versão do gTTS não tem gTTS._prepare_requests; "
+                "instale a versão indicada em requirements.txt (gTTS>=2.5,<2.6)"
+            )
+        session = self._session()
+        audio = b""
+        
+        for request in prepare_requests():
+            settings = session.merge_environment_settings(request.url, {}, None, self.verify, None)
+            if settings["verify"] is False:
+                with _INSECURE_REQUEST_WARNINGS:
+                    response = session.send(request, timeout=self.timeout, **settings)
+            else:
+                response = session.send(request, timeout=self.timeout, **settings)
+            if response.status_code != 200:
+                raise gTTSError(tts=tts, response=response)
+            
+            for line in response.iter_lines(chunk_size=1024):
+                decoded = line.decode("utf-8")
+                if GOOGLE_TTS_RPC in decoded:
+                    match = re.search(re.escape(GOOGLE_TTS_RPC) + r'","\[\\"(.*)\\"]', decoded)
+                    if not match:
+                        raise gTTSError(tts=tts, response=response)
+                    audio += base64.b64decode(match.group(1).encode("ascii"))
+        
+        if not audio:
+            raise gTTSError(tts=tts)
+        return audio
+    
+    def play(self, audio_file: str):
+        """
+        Reproduz um arquivo MP3 já sintetizado (pelo sink ou no notebook).
+        
+        Args:
+            audio_file: Caminho do arquivo
+        """
+        print(f"🔊 Reproduzindo áudio pronto: {audio_file}")
+        self.last_playback = None
+        if self.sink:
+            with open(audio_file, "rb") as f:
+                player = self._feed(StreamingPlayer(self.sink), f.read())
+            if player:
+                self._finish(player)
+        elif IPYTHON_AVAILABLE:
+            display(Audio(audio_file, autoplay=True))
+    
+    def _feed(self, player: StreamingPlayer, audio: bytes) -> Optional[StreamingPlayer]:
+        """Envia um trecho ao sink; em caso de falha, desiste da reprodução (o arquivo continua)."""
+        try:
+            player.feed(audio)
+            return player
+        except Exception as e:
+            print(f"⚠️ Falha na reprodução ({e}); o áudio continuará sendo salvo.")
+            try:
+                player.sink.close()
+            except Exception:
+                pass
+            return None
+    
+    def _finish(self, player: StreamingPlayer):
+        """Espera o fim da reprodução e registra as métricas."""
+        self.last_playback = player.finish()
+        if self.last_playback["time_to_first_audio"] is not None:
+            print(f"🔈 Primeiro áudio em {self.last_playback['time_to_first_audio']:.2f}s "
+                  f"({self.last_playback['audio_seconds']:.1f}s de fala)")
+    
     def speak(self, text: str, language: Optional[str] = None):
         """
-        Sintetiza e reproduz o áudio (em notebooks).
+        Sintetiza e reproduz o áudio (pelo sink ou em notebooks).
         
         Args:
             text: Texto para falar
@@ -99,17 +412,20 @@ def text_to_speech(
     return tts.synthesize(text, output_file)
 
 
-def play_audio(audio_file: str):
+def play_audio(audio_file: str, sink: Optional[PlaybackSink] = None):
     """
-    Reproduz um arquivo de áudio (apenas em notebooks).
+    Reproduz um arquivo de áudio MP3.
     
     Args:
         audio_file: Caminho do arquivo
+        sink: Saída de reprodução fora de notebooks (ver `playback.create_sink`)
     """
-    if IPYTHON_AVAILABLE:
+    if sink:
+        TextToSpeech(sink=sink).play(audio_file)
+    elif IPYTHON_AVAILABLE:
         display(Audio(audio_file, autoplay=True))
     else:
-        print(f"⚠️ Reprodução automática disponível apenas em notebooks Jupyter")
+        print(f"⚠️ Sem saída de áudio configurada (use um sink de `playback`)")
         print(f"📁 Arquivo salvo em: {audio_file}")
 
 
@@ -4,11 +4,40 @@ Integra Speech-to-Text, ChatGPT e Text-to-Speech
 """
 
 import os
+import time
+import functools
 from typing import Optional
 from .audio_recorder import AudioRecorder
+from .audio_preprocessing import AudioPreprocessor, measure_decode_savings
 from .speech_to_text import SpeechToText
+from .model_router import WhisperModelRouter
+from .worker_pool import TranscriptionWorkerPool
 from .chatgpt_client import ChatGPTClient
+from .llm_scheduler import LLMScheduler
+from .model_cascade import ModelCascade
+from .faq_index import FAQIndex
+from .session_store import SessionStore
 from .text_to_speech import TextToSpeech
+from .playback import PlaybackSink
+from .profiling import TurnProfiler
+
+
+def _profiled(label: str):
+    """Perfila o turno com o TurnProfiler do assistente, se configurado."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler is None:
+                return method(self, *args, **kwargs)
+            with self.profiler.profile(label):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _print_partial(partial: dict):
+    """Exibe a hipótese parcial na mesma linha do terminal."""
+    print(f"\r📝 {partial['text']}", end="", flush=True)
 
 
 class VoiceAssistant:
@@ -26,7 +55,22 @@ class VoiceAssistant:
         whisper_model: str = "small",
         chatgpt_model: str = "gpt-4",
         api_key: Optional[str] = None,
-        system_prompt: Optional[str] = None
+        system_prompt: Optional[str] = None,
+        audio_preprocessor: Optional[AudioPreprocessor] = None,
+        quantize_whisper: bool = False,
+        whisper_threads: Optional[int] = None,
+        model_router: Optional[WhisperModelRouter] = None,
+        transcription_pool: Optional[TranscriptionWorkerPool] = None,
+        llm_scheduler: Optional[LLMScheduler] = None,
+        model_cascade: Optional[ModelCascade] = None,
+        faq_index: Optional[FAQIndex] = None,
+        session_store: Optional[SessionStore] = None,
+        session_id: Optional[str] = None,
+        playback_sink: Optional[PlaybackSink] = None,
+        profiler: Optional[TurnProfiler] = None,
+        streaming_transcription: bool = False,
+        incremental_features: bool = False,
+        measure_preprocessing: bool = False
     ):
         """
         Inicializa o assistente de voz.
@@ -34,9 +78,27 @@ class VoiceAssistant:
         Args:
             language: Idioma (pt, en, es, etc.)
             whisper_model: Modelo Whisper (tiny, base, small, medium, large)
-            chatgpt_model: Modelo ChatGPT (gpt-3.5-turbo, gpt-4)
+            chatgpt_model: Modelo ChatGPT (gpt-3.5-turbo, gpt-4, 'auto' = cascata rápido/forte)
             api_key: API Key OpenAI
             system_prompt: Prompt do sistema para o ChatGPT
+            audio_preprocessor: Pré-processador aplicado à gravação antes da transcrição
+            quantize_whisper: Se True, usa o Whisper quantizado em int8 (CPU)
+            whisper_threads: Threads do PyTorch para a transcrição
+            model_router: Roteador de modelos Whisper por idioma (substitui whisper_model)
+            transcription_pool: Pool prefork ou MicroBatchTranscriber compartilhado; se fornecido, transcreve por ele (sem carregar outro modelo)
+            llm_scheduler: Agendador compartilhado de chamadas ao ChatGPT (prioridade interativa)
+            model_cascade: Roteador entre modelo rápido e forte (substitui chatgpt_model)
+            faq_index: Índice de respostas curadas consultado antes do ChatGPT
+            session_store: Armazenamento durável das conversas
+            session_id: Sessão a retomar (ou criar) no armazenamento
+            playback_sink: Saída de áudio fora de notebooks (a fala começa no primeiro trecho)
+            profiler: Captura cProfile por turno (padrão: configurado por PROFILE_TURNS_DIR)
+            streaming_transcription: Transcreve durante a gravação, exibindo parciais
+                (requer o modelo local; ignorado com transcription_pool ou audio_preprocessor)
+            incremental_features: Calcula o log-mel durante a gravação e transcreve a partir
+                dele, sem decodificar o WAV (mesmas condições de streaming_transcription)
+            measure_preprocessing: Transcreve também a gravação original para medir o
+                tempo economizado pelo audio_preprocessor (uma transcrição extra por turno)
         """
         self.language = language
         
@@ -44,10 +106,41 @@ class VoiceAssistant:
         print(f"🌍 Idioma: {language}")
         
         # Inicializa componentes
-        self.recorder = AudioRecorder()
-        self.speech_to_text = SpeechToText(model_name=whisper_model, language=language)
-        self.chatgpt = ChatGPTClient(api_key=api_key, model=chatgpt_model)
-        self.text_to_speech = TextToSpeech(language=language)
+        self.speech_to_text = None
+        if transcription_pool is None:
+            self.speech_to_text = SpeechToText(
+                model_name=whisper_model,
+                language=language,
+                quantize=quantize_whisper,
+                num_threads=whisper_threads,
+                router=model_router
+            )
+        self.incremental_features = (
+            incremental_features and self.speech_to_text is not None and audio_preprocessor is None
+        )
+        self.recorder = AudioRecorder(
+            compute_features=self.incremental_features,
+            n_mels=self.speech_to_text.get_model().dims.n_mels if self.incremental_features else 80
+        )
+        self.chatgpt = ChatGPTClient(
+            api_key=api_key,
+            model=chatgpt_model,
+            scheduler=llm_scheduler,
+            priority="interactive",
+            cascade=model_cascade,
+            session_store=session_store,
+            session_id=session_id
+        )
+        self.chatgpt.language = language
+        self.text_to_speech = TextToSpeech(language=language, sink=playback_sink)
+        self.audio_preprocessor = audio_preprocessor
+        self.measure_preprocessing = measure_preprocessing and audio_preprocessor is not None
+        self.transcription_pool = transcription_pool
+        self.faq_index = faq_index
+        self.profiler = profiler or TurnProfiler.from_env()
+        self.streaming_transcription = (
+            streaming_transcription and self.speech_to_text is not None and audio_preprocessor is None
+        )
         
         # Define prompt do sistema se fornecido
         if system_prompt:
@@ -55,6 +148,7 @@ class VoiceAssistant:
         
         print("✅ Assistente pronto para uso!\n")
     
+    @_profiled("listen")
     def listen_and_respond(
         self, 
         duration: int = 5,
@@ -71,6 +165,7 @@ class VoiceAssistant:
             
         Returns:
             Dicionário com transcrição, resposta e caminhos dos áudios
+            (assistant_response None se o pré-processamento não detectou fala)
         """
         # Cria diretório se necessário
         if save_audio and not os.path.exists(audio_dir):
@@ -79,20 +174,78 @@ class VoiceAssistant:
         # 1. Grava áudio do usuário
         print("\n" + "="*60)
         input_audio = os.path.join(audio_dir, "user_input.wav") if save_audio else "temp_input.wav"
-        self.recorder.record(duration=duration, output_file=input_audio)
+        stream = None
+        if self.streaming_transcription:
+            stream = self.speech_to_text.stream(self.recorder, language=self.language, on_partial=_print_partial)
+        try:
+            self.recorder.record(duration=duration, output_file=input_audio)
+        except BaseException:
+            if stream:
+                stream.cancel()
+            raise
+        streaming = None
+        if stream:
+            streaming = stream.finish()
+            print()  # encerra a linha das parciais
+        
+        # 1.1 Pré-processa (corte de silêncio, filtros, normalização)
+        preprocessing = None
+        original_audio = input_audio
+        if self.audio_preprocessor:
+            if self.measure_preprocessing:
+                # A gravação original é mantida para a medição
+                input_audio = os.path.splitext(original_audio)[0] + "_processed.wav"
+            preprocessing = self.audio_preprocessor.process_file(original_audio, input_audio)
+            if not preprocessing["speech_detected"]:
+                print("="*60 + "\n")
+                return {
+                    "user_input": "",
+                    "assistant_response": None,
+                    "input_audio_path": input_audio if save_audio else None,
+                    "output_audio_path": None,
+                    "preprocessing": preprocessing,
+                    "streaming": streaming,
+                    "source": None,
+                    "playback": None
+                }
         
-        # 2. Transcreve áudio
+        # 2. Transcreve áudio (no modo incremental, já concluída junto com a gravação)
         print("-"*60)
-        transcription = self.speech_to_text.transcribe(input_audio)
+        start = time.perf_counter()
+        if streaming:
+            transcription = streaming["text"]
+            print(f"📝 Transcrição: {transcription}")
+            print(f"⏱️ Incremental: {streaming['passes']} passadas, "
+                  f"{streaming['cpu_per_audio_second']:.2f}s de CPU por segundo de áudio, "
+                  f"texto final em {streaming['final_seconds'] * 1000:.0f} ms")
+        elif self.incremental_features:
+            transcription = self.speech_to_text.transcribe(self.recorder.get_features())
+        else:
+            transcription = self._transcribe_file(input_audio)
         
-        # 3. Processa com ChatGPT
+        if preprocessing:
+            preprocessing["decode_seconds"] = time.perf_counter() - start
+            if self.measure_preprocessing:
+                print("⏱️ Medindo a transcrição da gravação original...")
+                preprocessing.update(measure_decode_savings(
+                    self._transcribe_file, original_audio, preprocessing["decode_seconds"]
+                ))
+                print(f"⏱️ Transcrição: {preprocessing['original_decode_seconds']:.2f}s (original) → "
+                      f"{preprocessing['decode_seconds']:.2f}s (pré-processado), economia de "
+                      f"{preprocessing['decode_savings_seconds']:.2f}s")
+        
+        # 3. Processa com a FAQ local ou com o ChatGPT
         print("-"*60)
-        response_text = self.chatgpt.send_message(transcription)
+        response_text, faq_match = self._respond(transcription)
         
-        # 4. Sintetiza resposta em voz
+        # 4. Sintetiza resposta em voz (ou usa o áudio pré-sintetizado da FAQ)
         print("-"*60)
-        output_audio = os.path.join(audio_dir, "assistant_response.wav") if save_audio else "temp_output.wav"
-        self.text_to_speech.synthesize(response_text, output_file=output_audio, auto_play=True)
+        if faq_match and faq_match["audio"] and os.path.exists(faq_match["audio"]):
+            output_audio = faq_match["audio"]
+            self.text_to_speech.play(output_audio)
+        else:
+            output_audio = os.path.join(audio_dir, "assistant_response.wav") if save_audio else "temp_output.wav"
+            self.text_to_speech.synthesize(response_text, output_file=output_audio, auto_play=True)
         
         print("="*60 + "\n")
         
@@ -100,9 +253,14 @@ class VoiceAssistant:
             "user_input": transcription,
             "assistant_response": response_text,
             "input_audio_path": input_audio if save_audio else None,
-            "output_audio_path": output_audio if save_audio else None
+            "output_audio_path": output_audio if save_audio else None,
+            "preprocessing": preprocessing,
+            "streaming": streaming,
+            "source": "faq" if faq_match else "chatgpt",
+            "playback": self.text_to_speech.last_playback
         }
     
+    @_profiled("ask")
     def ask(self, question: str, speak_response: bool = True) -> str:
         """
         Faz uma pergunta diretamente (sem gravação).
@@ -115,13 +273,56 @@ class VoiceAssistant:
             Resposta do assistente
         """
         print(f"\n💬 Você: {question}")
-        response = self.chatgpt.send_message(question)
+        response, faq_match = self._respond(question)
         
         if speak_response:
-            self.text_to_speech.synthesize(response, auto_play=True)
+            if faq_match and faq_match["audio"] and os.path.exists(faq_match["audio"]):
+                self.text_to_speech.play(faq_match["audio"])
+            else:
+                self.text_to_speech.synthesize(response, auto_play=True)
         
         return response
     
+    def _transcribe_file(self, audio_file: str) -> str:
+        """Transcreve um arquivo pelo pool compartilhado ou pelo modelo local."""
+        if self.transcription_pool:
+            transcription = self.transcription_pool.transcribe(audio_file, language=self.language)["text"]
+            print(f"📝 Transcrição: {transcription}")
+            return transcription
+        return self.speech_to_text.transcribe(audio_file)
+    
+    def _respond(self, message: str):
+        """
+        Responde pela FAQ local se houver pergunta parecida; senão, pelo ChatGPT.
+        
+        Args:
+            message: Mensagem do usuário
+            
+        Returns:
+            Tupla (resposta, resultado da FAQ ou None)
+        """
+        if self.faq_index:
+            start = time.perf_counter()
+            faq_match = self.faq_index.match(message, language=self.language)
+            if faq_match:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                print(f"📚 Resposta da FAQ (similaridade {faq_match['score']:.2f}, {elapsed_ms:.2f} ms)")
+                print(f"🤖 Resposta: {faq_match['answer']}")
+                # Mantém o histórico coerente para os próximos turnos
+                self.chatgpt.record_exchange(message, faq_match["answer"])
+                return faq_match["answer"], faq_match
+        
+        return self.chatgpt.send_message(message), None
+    
+    def resume_session(self, session_id: str):
+        """
+        Troca para outra sessão de conversa salva (ou cria uma nova).
+        
+        Args:
+            session_id: ID da sessão
+        """
+        self.chatgpt.bind_session(session_id)
+    
     def clear_conversation(self):
         """Limpa o histórico de conversação."""
         self.chatgpt.clear_history()
@@ -134,8 +335,10 @@ class VoiceAssistant:
             language: Novo código de idioma (pt, en, es, etc.)
         """
         self.language = language
-        self.speech_to_text.language = language
+        if self.speech_to_text:
+            self.speech_to_text.language = language
         self.text_to_speech.language = language
+        self.chatgpt.language = language
         print(f"🌍 Idioma alterado para: {language}")
 
 
@@ -0,0 +1,536 @@
+"""
+Pool de workers pré-bifurcados (prefork) para transcrição com Whisper.
+
+O processo pai carrega o modelo uma única vez e cria, por `fork`, um
+processo "zigoto" antes de iniciar as threads auxiliares do pool. Todos os
+workers (inclusive os que substituem workers mortos ou travados) são
+bifurcados a partir do zigoto, que é single-threaded: os pesos são herdados
+copy-on-write sem multiplicar a RAM por N. O único fork feito pelo pai é o
+do zigoto; por isso o pool deve ser criado antes de o processo iniciar
+outras threads (ex.: o LLMScheduler), e avisa se já houver alguma.
+
+Cada worker conversa com o pai por um par de sockets próprio (trabalhos e
+resultados), e o áudio chega por blocos de memória compartilhada (sem
+serializar arrays). Um monitor reinicia workers que morrem, que não
+respondem ao ping ou que passam do prazo de uma transcrição (proporcional
+à duração do áudio),
+reenviando os trabalhos que estavam com eles. Cada substituto recebe uma
+nova geração; mensagens de gerações antigas são ignoradas, para que um
+resultado atrasado não libere um bloco que o substituto ainda está lendo.
+"""
+
+import os
+import time
+import queue
+import signal
+import socket
+import itertools
+import threading
+import multiprocessing as mp
+from concurrent.futures import Future
+from multiprocessing import reduction, shared_memory
+from multiprocessing.connection import Connection, wait
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+import whisper
+
+SAMPLE_RATE = whisper.audio.SAMPLE_RATE
+
+
+def _worker_main(conn: Connection, model, slots: List[shared_memory.SharedMemory],
+                 max_samples: int, torch_threads: int):
+    """Laço de um worker: recebe trabalhos, transcreve e devolve o resultado."""
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+    
+    buffers = [np.ndarray((max_samples,), dtype=np.float32, buffer=slot.buf) for slot in slots]
+    
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            break  # o pai encerrou
+        if message is None:
+            break
+        
+        kind, job_id, payload, language = message
+        if kind == "ping":
+            conn.send(("pong", job_id, None))
+            continue
+        
+        conn.send(("start", job_id, None))
+        try:
+            if kind == "shm":
+                slot, n_samples = payload
+                audio = buffers[slot][:n_samples]
+            else:
+                audio = whisper.load_audio(payload)
+                conn.send(("loaded", job_id, audio.shape[0] / SAMPLE_RATE))  # o prazo passa a contar a duração
+            
+            result = model.transcribe(audio, language=language, fp16=False, verbose=None)
+            conn.send(("done", job_id, {
+                "text": result["text"].strip(),
+                "language": result.get("language", language),
+                "segments": result.get("segments", []),
+                "audio_seconds": audio.shape[0] / SAMPLE_RATE,
+            }))
+        except Exception as e:
+            conn.send(("error", job_id, f"{type(e).__name__}: {e}"))
+
+
+def _zygote_main(conn: Connection, model, slots: List[shared_memory.SharedMemory],
+                 max_samples: int, torch_threads: int):
+    """
+    Processo zigoto: bifurca workers sob demanda do pai.
+    
+    Para cada pedido cria um par de sockets, bifurca o worker com uma ponta
+    e envia a outra ao pai (SCM_RIGHTS), seguida do pid do worker.
+    """
+    # Workers encerrados são recolhidos automaticamente (sem zumbis)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+    parent_pid = os.getppid()
+    
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            break
+        if request is None:
+            break
+        
+        parent_end, worker_end = socket.socketpair()
+        pid = os.fork()
+        if pid == 0:
+            conn.close()
+            parent_end.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            code = 0
+            try:
+                _worker_main(Connection(worker_end.detach()), model, slots, max_samples, torch_threads)
+            except BaseException:
+                code = 1
+            finally:
+                os._exit(code)
+        
+        worker_end.close()
+        reduction.send_handle(conn, parent_end.fileno(), parent_pid)
+        parent_end.close()
+        conn.send(pid)
+
+
+class _Job:
+    """Trabalho pendente no pool."""
+    
+    def __init__(self, job_id: int, kind: str, payload: Any, language: Optional[str], slot: Optional[int],
+                 audio_seconds: Optional[float] = None):
+        self.job_id = job_id
+        self.kind = kind
+        self.payload = payload
+        self.language = language
+        self.slot = slot
+        self.future: Future = Future()
+        self.worker: Optional[int] = None
+        self.generation: Optional[int] = None
+        self.started: Optional[float] = None
+        self.audio_seconds = audio_seconds  # de arquivos, só conhecida depois da decodificação
+        self.deadline: Optional[float] = None
+        self.attempts = 0
+
+
+class _Worker:
+    """Estado de um worker no processo pai."""
+    
+    def __init__(self, pid: int, conn: Connection, generation: int):
+        self.pid = pid
+        self.conn = conn
+        self.generation = generation
+        self.jobs: Dict[int, _Job] = {}
+        self.restarts = 0
+        self.dead = False
+        self.ping_sent: Optional[float] = None
+        self.last_pong: Optional[float] = None
+        self.last_activity = time.monotonic()
+    
+    def is_alive(self) -> bool:
+        """Verifica se o processo ainda existe (o zigoto recolhe os encerrados)."""
+        if self.dead:
+            return False
+        try:
+            os.kill(self.pid, 0)
+        except ProcessLookupError:
+            return False
+        return True
+    
+    def kill(self):
+        """Encerra o processo imediatamente."""
+        try:
+            os.kill(self.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+
+
+class TranscriptionWorkerPool:
+    """Pool de processos que compartilham um modelo Whisper já carregado."""
+    
+    def __init__(
+        self,
+        model,
+        workers: Optional[int] = None,
+        language: Optional[str] = None,
+        max_audio_seconds: float = 120.0,
+        slots: Optional[int] = None,
+        torch_threads: int = 1,
+        health_interval: float = 5.0,
+        ping_timeout: float = 30.0,
+        job_timeout: float = 300.0,
+        job_timeout_per_second: float = 10.0,
+        max_retries: int = 1
+    ):
+        """
+        Inicializa o pool e cria os workers.
+        
+        Args:
+            model: Modelo Whisper carregado no processo pai
+            workers: Número de workers (padrão: núcleos disponíveis)
+            language: Idioma padrão dos trabalhos (None = detecção automática)
+            max_audio_seconds: Duração máxima de áudio enviado por memória compartilhada
+            slots: Blocos de memória compartilhada (padrão: 2 × workers)
+            torch_threads: Threads do PyTorch por worker
+            health_interval: Intervalo em segundos entre verificações de saúde
+            ping_timeout: Tempo sem resposta após o qual um worker ocioso é reiniciado
+            job_timeout: Prazo fixo de uma transcrição (inclui decodificar o arquivo);
+                acima do prazo o worker é considerado travado e reiniciado
+            job_timeout_per_second: Acréscimo ao prazo por segundo de áudio, para que
+                arquivos longos não sejam interrompidos
+            max_retries: Reenvios de um trabalho cujo worker morreu ou travou
+        """
+        if "fork" not in mp.get_all_start_methods():
+            raise RuntimeError("O pool prefork requer o método 'fork' (Linux/macOS).")
+        
+        self.model = model
+        self.language = language
+        self.max_samples = int(max_audio_seconds * SAMPLE_RATE)
+        self.torch_threads = torch_threads
+        self.health_interval = health_interval
+        self.ping_timeout = ping_timeout
+        self.job_timeout = job_timeout
+        self.job_timeout_per_second = job_timeout_per_second
+        self.max_retries = max_retries
+        
+        n_workers = workers or os.cpu_count() or 1
+        n_slots = slots or 2 * n_workers
+        
+        self._context = mp.get_context("fork")
+        self._slots = [
+            shared_memory.SharedMemory(create=True, size=self.max_samples * 4)
+            for _ in range(n_slots)
+        ]
+        self._buffers = [
+            np.ndarray((self.max_samples,), dtype=np.float32, buffer=slot.buf)
+            for slot in self._slots
+        ]
+        self._free_slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(n_slots):
+            self._free_slots.put(slot)
+        
+        self._jobs: Dict[int, _Job] = {}
+        self._ids = itertools.count()
+        self._generations = itertools.count()
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._retired: List[Connection] = []
+        self._wakeup_r, self._wakeup_w = self._context.Pipe(duplex=False)
+        
+        # O zigoto é bifurcado antes das threads do pool; daí em diante, só ele faz fork
+        if threading.active_count() > 1:
+            print(f"⚠️ Pool prefork criado com {threading.active_count() - 1} thread(s) já em execução; "
+                  f"crie o pool antes de iniciar outras threads")
+        self._zygote_conn, zygote_end = self._context.Pipe()
+        self._zygote = self._context.Process(
+            target=_zygote_main,
+            args=(zygote_end, self.model, self._slots, self.max_samples, self.torch_threads),
+            daemon=True
+        )
+        self._zygote.start()
+        zygote_end.close()
+        
+        self._workers: List[_Worker] = [self._spawn() for _ in range(n_workers)]
+        
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._monitor = threading.Thread(target=self._watch, daemon=True)
+        self._collector.start()
+        self._monitor.start()
+        
+        print(f"✅ Pool prefork iniciado com {n_workers} worker(s)")
+    
+    def submit(self, audio: Union[str, np.ndarray], language: Optional[str] = None) -> Future:
+        """
+        Envia um áudio para transcrição.
+        
+        Arrays são copiados para um bloco de memória compartilhada (bloqueia
+        se todos estiverem ocupados); caminhos são decodificados no worker.
+        
+        Args:
+            audio: Caminho do arquivo ou array float32 a 16 kHz
+            language: Idioma (usa o padrão do pool se não especificado)
+        
+        Returns:
+            Future com o dicionário de resultado (text, language, segments, audio_seconds)
+        """
+        if self._closed.is_set():
+            raise RuntimeError("O pool já foi encerrado.")
+        
+        lang = language or self.language
+        job_id = next(self._ids)
+        
+        if isinstance(audio, str):
+            job = _Job(job_id, "path", audio, lang, None)
+        else:
+            audio = np.asarray(audio, dtype=np.float32).reshape(-1)
+            if audio.shape[0] > self.max_samples:
+                raise ValueError(
+                    f"Áudio de {audio.shape[0] / SAMPLE_RATE:.0f}s excede o limite de "
+                    f"{self.max_samples / SAMPLE_RATE:.0f}s; use a transcrição longa."
+                )
+            slot = self._free_slots.get()
+            self._buffers[slot][:audio.shape[0]] = audio
+            job = _Job(job_id, "shm", (slot, audio.shape[0]), lang, slot, audio.shape[0] / SAMPLE_RATE)
+        
+        with self._lock:
+            self._jobs[job_id] = job
+            self._dispatch(job)
+        return job.future
+    
+    def transcribe(self, audio: Union[str, np.ndarray], language: Optional[str] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Transcreve um áudio e aguarda o resultado.
+        
+        Args:
+            audio: Caminho do arquivo ou array float32 a 16 kHz
+            language: Idioma opcional
+            timeout: Tempo máximo de espera em segundos
+        
+        Returns:
+            Dicionário com text, language, segments e audio_seconds
+        """
+        return self.submit(audio, language).result(timeout)
+    
+    def health(self) -> List[Dict[str, Any]]:
+        """
+        Retorna o estado de cada worker.
+        
+        Returns:
+            Lista com pid, geração, vivo, trabalhos em andamento, reinícios e
+            idade do último pong
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "worker": index,
+                    "pid": worker.pid,
+                    "generation": worker.generation,
+                    "alive": worker.is_alive(),
+                    "inflight": len(worker.jobs),
+                    "restarts": worker.restarts,
+                    "last_pong_age": None if worker.last_pong is None else now - worker.last_pong,
+                }
+                for index, worker in enumerate(self._workers)
+            ]
+    
+    def close(self):
+        """Encerra os workers e libera a memória compartilhada."""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        
+        with self._lock:
+            for worker in self._workers:
+                self._send(worker, None)
+            self._zygote_conn.send(None)
+        
+        deadline = time.monotonic() + 5
+        for worker in self._workers:
+            while worker.is_alive() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            worker.kill()
+        self._zygote.join(timeout=5)
+        if self._zygote.is_alive():
+            self._zygote.terminate()
+        
+        self._wakeup_w.send(None)
+        self._collector.join(timeout=5)
+        
+        with self._lock:
+            for job in self._jobs.values():
+                job.future.set_exception(RuntimeError("Pool encerrado."))
+            self._jobs.clear()
+            for worker in self._workers:
+                worker.conn.close()
+            for conn in self._retired:
+                conn.close()
+            self._retired.clear()
+        self._zygote_conn.close()
+        
+        self._buffers = []
+        for slot in self._slots:
+            slot.close()
+            slot.unlink()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _spawn(self) -> _Worker:
+        """Pede ao zigoto um novo worker (chamar com o lock adquirido ou antes das threads)."""
+        self._zygote_conn.send("spawn")
+        conn = Connection(reduction.recv_handle(self._zygote_conn))
+        pid = self._zygote_conn.recv()
+        return _Worker(pid, conn, next(self._generations))
+    
+    def _send(self, worker: _Worker, message) -> bool:
+        """Envia uma mensagem ao worker; um worker inalcançável é marcado como morto."""
+        try:
+            worker.conn.send(message)
+            return True
+        except OSError:
+            worker.dead = True
+            return False
+    
+    def _dispatch(self, job: _Job):
+        """Entrega o trabalho ao worker vivo com menos trabalhos pendentes."""
+        alive = [w for w in self._workers if not w.dead] or self._workers
+        index = self._workers.index(min(alive, key=lambda w: len(w.jobs)))
+        worker = self._workers[index]
+        
+        job.worker = index
+        job.generation = worker.generation
+        job.started = None
+        job.deadline = None
+        job.attempts += 1
+        worker.jobs[job.job_id] = job
+        # Se o worker já morreu, o trabalho é reenviado quando ele for substituído
+        self._send(worker, (job.kind, job.job_id, job.payload, job.language))
+    
+    def _finish(self, job: _Job):
+        """Remove o trabalho dos registros e devolve seu bloco de memória."""
+        self._jobs.pop(job.job_id, None)
+        if job.worker is not None:
+            self._workers[job.worker].jobs.pop(job.job_id, None)
+        if job.slot is not None:
+            self._free_slots.put(job.slot)
+    
+    def _collect(self):
+        """Thread que recebe as mensagens dos workers da geração atual."""
+        while not self._closed.is_set():
+            with self._lock:
+                for conn in self._retired:
+                    conn.close()
+                self._retired.clear()
+                owners = {w.conn: w for w in self._workers if not w.dead}
+            
+            for conn in wait(list(owners) + [self._wakeup_r]):
+                if conn is self._wakeup_r:
+                    self._wakeup_r.recv()
+                    continue
+                worker = owners[conn]
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    with self._lock:
+                        worker.dead = True
+                        if not self._closed.is_set() and worker in self._workers:
+                            self._restart(self._workers.index(worker), "morreu")
+                    continue
+                self._handle(worker, message)
+                
+    def _handle(self, worker: _Worker, message):
+        """Processa uma mensagem de um worker."""
+        kind, job_id, payload = message
+        now = time.monotonic()
+        with self._lock:
+            if worker not in self._workers:
+                return  # worker já substituído
+            worker.last_activity = now
+            if kind == "pong":
+                worker.last_pong = now
+                worker.ping_sent = None
+                return
+            
+            job = self._jobs.get(job_id)
+            if job is None or job.generation != worker.generation:
+                return  # trabalho já reenviado a outra geração
+            if kind == "start":
+                job.started = now
+                job.deadline = self._deadline(job, now)
+                return
+            if kind == "loaded":
+                job.audio_seconds = payload
+                job.deadline = self._deadline(job, now)
+                return
+            self._finish(job)
+        
+        if kind == "done":
+            job.future.set_result(payload)
+        else:
+            job.future.set_exception(RuntimeError(payload))
+    
+    def _watch(self):
+        """Thread de verificação de saúde: pings, prazos e reinício de workers."""
+        while not self._closed.wait(self.health_interval):
+            now = time.monotonic()
+            with self._lock:
+                if self._closed.is_set():
+                    return
+                for index, worker in enumerate(self._workers):
+                    overdue = any(
+                        job.deadline is not None and now > job.deadline
+                        for job in worker.jobs.values()
+                    )
+                    idle_hung = (
+                        not worker.jobs
+                        and worker.ping_sent is not None
+                        and now - max(worker.ping_sent, worker.last_activity) > self.ping_timeout
+                    )
+                    if not worker.is_alive():
+                        self._restart(index, "morreu")
+                    elif overdue:
+                        self._restart(index, "travado (transcrição além do prazo)")
+                    elif idle_hung:
+                        self._restart(index, "travado")
+                    elif worker.ping_sent is None and not worker.jobs:
+                        worker.ping_sent = now
+                        self._send(worker, ("ping", -1, None, None))
+    
+    def _deadline(self, job: _Job, now: float) -> float:
+        """Prazo do trabalho: fixo mais um acréscimo pela duração do áudio (se já conhecida)."""
+        return now + self.job_timeout + self.job_timeout_per_second * (job.audio_seconds or 0.0)
+    
+    def _restart(self, index: int, reason: str):
+        """Substitui um worker (nova geração) e reenvia os trabalhos que estavam com ele."""
+        old = self._workers[index]
+        print(f"⚠️ Worker {index} (pid {old.pid}) {reason}; reiniciando...")
+        old.kill()
+        old.dead = True
+        self._retired.append(old.conn)
+        
+        worker = self._spawn()
+        worker.restarts = old.restarts + 1
+        self._workers[index] = worker
+        self._wakeup_w.send(None)
+        
+        for job in list(old.jobs.values()):
+            if job.attempts <= self.max_retries:
+                self._dispatch(job)
+            else:
+                self._finish(job)
+                job.future.set_exception(RuntimeError(
+                    f"Worker {index} {reason}; trabalho abandonado após {job.attempts} tentativa(s)."
+                ))
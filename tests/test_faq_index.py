@@ -0,0 +1,29 @@
+"""Testes do índice de FAQ."""
+
+import pytest
+
+from src.faq_index import FAQIndex
+
+
+# None: todos os atributos são comuns e as listas seriam truncadas; 1000: só o corte de candidatos
+@pytest.mark.parametrize("max_postings", [None, 1000])
+def test_language_filter_before_candidate_cut(max_postings):
+    """Uma entrada no idioma pedido é encontrada mesmo entre centenas de outro idioma."""
+    question = "What is the Treasury Direct program?"
+    entries = [{"question": question, "answer": f"Answer {i}", "language": "en"} for i in range(200)]
+    entries.append({"question": question, "answer": "Resposta", "language": "pt"})
+    index = FAQIndex(entries, max_postings=max_postings)
+    
+    results = index.search(question, language="pt")
+    assert [r["answer"] for r in results] == ["Resposta"]
+    assert index.match(question, language="pt")["answer"] == "Resposta"
+    assert len(index.search(question, k=5, language="en")) == 5
+
+
+def test_entries_without_language_match_any_language():
+    """Entradas sem idioma valem para qualquer conversa."""
+    index = FAQIndex([
+        {"question": "Qual o horário de atendimento?", "answer": "Das 9h às 18h"},
+        {"question": "Qual o horário de atendimento?", "answer": "9am to 6pm", "language": "en"},
+    ])
+    assert index.match("qual o horario de atendimento", language="pt")["answer"] == "Das 9h às 18h"
@@ -0,0 +1,103 @@
+"""Testes do agendador de chamadas ao ChatGPT."""
+
+import time
+import threading
+
+import pytest
+
+from src.llm_scheduler import DeadlineExceededError, LLMScheduler
+
+
+def _job(order, name, seconds=0.0):
+    def fn():
+        order.append(name)
+        time.sleep(seconds)
+        return name
+    return fn
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 7, max_concurrency=1)
+    yield scheduler
+    scheduler.close()
+
+
+def test_interactive_runs_before_queued_batch(scheduler):
+    """Com o executor ocupado, o pedido interativo passa à frente do lote em espera."""
+    order = []
+    batch = [scheduler.submit(_job(order, f"batch-{i}", 0.2), 10, "batch") for i in range(4)]
+    time.sleep(0.05)  # batch-0 em execução, os demais no heap
+    interactive = scheduler.submit(_job(order, "interactive"), 10, "interactive")
+    
+    assert interactive.result(5) == "interactive"
+    for future in batch:
+        future.result(5)
+    assert order[:2] == ["batch-0", "interactive"]
+
+
+def test_deadline_applies_while_executor_is_busy(scheduler):
+    """Um prazo que vence enquanto todas as vagas estão ocupadas descarta o pedido."""
+    order = []
+    batch = [scheduler.submit(_job(order, f"batch-{i}", 0.3), 10, "batch") for i in range(4)]
+    time.sleep(0.05)
+    started = time.monotonic()
+    interactive = scheduler.submit(_job(order, "interactive"), 10, "interactive", timeout=0.2)
+    
+    with pytest.raises(DeadlineExceededError):
+        interactive.result(5)
+    assert time.monotonic() - started < 0.5
+    for future in batch:
+        future.result(5)
+    assert "interactive" not in order
+    assert scheduler.metrics()["dropped"] == 1
+
+
+def test_wait_is_measured_until_dispatch(scheduler):
+    """O tempo de espera inclui o período aguardando uma vaga de execução."""
+    futures = [scheduler.submit(_job([], i, 0.1), 10) for i in range(3)]
+    for future in futures:
+        future.result(5)
+    metrics = scheduler.metrics()
+    assert metrics["wait_p95"] >= 0.15
+    assert metrics["in_flight"] == 0
+
+
+def test_concurrency_limit_is_respected():
+    """Nunca há mais chamadas simultâneas que max_concurrency."""
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 7, max_concurrency=2)
+    lock = threading.Lock()
+    running = [0, 0]  # atual, máximo
+    
+    def fn():
+        with lock:
+            running[0] += 1
+            running[1] = max(running[1], running[0])
+        time.sleep(0.05)
+        with lock:
+            running[0] -= 1
+    
+    try:
+        for future in [scheduler.submit(fn, 10) for _ in range(8)]:
+            future.result(5)
+    finally:
+        scheduler.close()
+    assert running[1] == 2
+
+
+def test_close_resets_queue_depth():
+    """Pedidos cancelados no encerramento não ficam contados na fila."""
+    scheduler = LLMScheduler(requests_per_minute=6000, tokens_per_minute=10 ** 7, max_concurrency=1)
+    blocker = threading.Event()
+    scheduler.submit(blocker.wait, 10, "batch")
+    pending = [scheduler.submit(lambda: None, 10, "batch") for _ in range(3)]
+    time.sleep(0.05)
+    assert scheduler.metrics()["queue_depth"]["batch"] == 3
+    
+    closer = threading.Thread(target=scheduler.close)
+    closer.start()
+    time.sleep(0.05)
+    blocker.set()
+    closer.join(5)
+    assert all(future.cancelled() for future in pending)
+    assert scheduler.metrics()["queue_depth"] == {"interactive": 0, "default": 0, "batch": 0}
@@ -0,0 +1,126 @@
+"""Testes do log-mel incremental e do reamostrador da captura."""
+
+import shutil
+import importlib
+
+import numpy as np
+import pytest
+import whisper
+from whisper.audio import N_SAMPLES
+
+from src.audio_preprocessing import StreamResampler, load_audio, save_audio
+from src.log_mel import LogMelExtractor, LogMelFeatures, _TranscribeHook, transcribe_features
+
+# Limite do erro no log-mel normalizado; a referência do ffmpeg chega quantizada em 16 bits
+FFMPEG_TOLERANCE = 0.03
+
+
+def _synthetic_audio(n_samples, sample_rate, seed=0):
+    """Tons com vibrato, um tom agudo, ruído e um trecho de silêncio digital."""
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / sample_rate
+    audio = 0.3 * np.sin(2 * np.pi * (220 + 30 * np.sin(2 * np.pi * 3 * t)) * t)
+    audio += 0.1 * np.sin(2 * np.pi * 1800 * t) + rng.normal(0, 0.02, n_samples)
+    if sample_rate > 14000:
+        audio += 0.05 * np.sin(2 * np.pi * 7000 * t)  # exercita as bandas mel mais altas
+    audio[n_samples // 3:n_samples // 2] = 0.0
+    return audio.astype(np.float32)
+
+
+def _incremental(audio, sample_rate, n_mels, block_size=1024):
+    """Alimenta o extrator bloco a bloco, como o callback de captura."""
+    extractor = LogMelExtractor(sample_rate, n_mels, max_seconds=len(audio) / sample_rate)
+    for start in range(0, len(audio), block_size):
+        extractor.process(audio[start:start + block_size])
+    return extractor.finish().mel.numpy()
+
+
+@pytest.mark.parametrize("seconds", [0.01, 0.5, 3.0, 31.0])
+@pytest.mark.parametrize("n_mels", [80, 128])
+@pytest.mark.parametrize("block_size", [160, 1024, 4096])
+def test_matches_whisper_at_16khz(seconds, n_mels, block_size):
+    """A 16 kHz as features são as do log_mel_spectrogram do Whisper."""
+    audio = _synthetic_audio(int(seconds * 16000), 16000)
+    reference = whisper.log_mel_spectrogram(audio, n_mels, padding=N_SAMPLES).numpy()
+    features = _incremental(audio, 16000, n_mels, block_size)
+    
+    assert features.shape == reference.shape
+    assert np.abs(features - reference).max() <= 1e-4
+
+
+@pytest.mark.skipif(
+    shutil.which("ffmpeg") is None,
+    reason="ffmpeg não instalado: equivalência com whisper.load_audio não verificada"
+)
+@pytest.mark.parametrize("sample_rate", [44100, 48000, 22050, 8000])
+@pytest.mark.parametrize("seconds", [1.0, 7.3, 31.0])
+@pytest.mark.parametrize("n_mels", [80, 128])
+def test_matches_whisper_load_audio(tmp_path, sample_rate, seconds, n_mels):
+    """
+    Na captura fora de 16 kHz, as features equivalem às do WAV gravado e
+    decodificado pelo ffmpeg (o caminho do `transcribe` com arquivo).
+    
+    As durações dão um número inteiro de amostras a 16 kHz: o ffmpeg
+    arredonda o comprimento da saída de forma própria em cada taxa.
+    """
+    audio = _synthetic_audio(int(round(seconds * sample_rate)), sample_rate)
+    path = str(tmp_path / "capture.wav")
+    save_audio(path, audio, sample_rate)
+    reference = whisper.log_mel_spectrogram(whisper.load_audio(path), n_mels, padding=N_SAMPLES).numpy()
+    
+    captured, _ = load_audio(path)  # as mesmas amostras do WAV (PCM 16 bits)
+    features = _incremental(captured, sample_rate, n_mels)
+    
+    assert features.shape == reference.shape
+    error = np.abs(features - reference)
+    assert error.max() <= FFMPEG_TOLERANCE
+    assert error[-n_mels // 8:].mean() <= 1e-3  # sem atenuação nas bandas altas
+
+
+@pytest.mark.parametrize("sample_rate", [8000, 22050, 44100, 48000])
+def test_resampler_blocks_match_whole_signal(sample_rate):
+    """Reamostrar em blocos de qualquer tamanho dá o mesmo sinal que de uma vez."""
+    audio = _synthetic_audio(sample_rate + 37, sample_rate)
+    resampler = StreamResampler(sample_rate)
+    whole = np.concatenate((resampler.process(audio), resampler.flush()))
+    assert whole.shape[0] == -(-audio.shape[0] * 16000 // sample_rate)
+    
+    for block_size in (1, 7, 1024):
+        parts = [resampler.process(audio[i:i + block_size]) for i in range(0, len(audio), block_size)]
+        parts.append(resampler.flush())
+        np.testing.assert_array_equal(np.concatenate(parts), whole)
+
+
+def test_resampler_preserves_tone():
+    """Um tom de 1 kHz a 44,1 kHz sai a 16 kHz sem atenuação nem atraso."""
+    t = np.arange(44100) / 44100
+    resampler = StreamResampler(44100)
+    tone = np.sin(2 * np.pi * 1000 * t).astype(np.float32)
+    output = np.concatenate((resampler.process(tone), resampler.flush()))
+    expected = np.sin(2 * np.pi * 1000 * np.arange(output.shape[0]) / 16000)
+    assert np.abs(output - expected)[100:-100].max() <= 1e-4
+
+
+def test_transcribe_hook_only_during_call():
+    """O log-mel do whisper.transcribe só é trocado durante transcribe_features."""
+    module = importlib.import_module("whisper.transcribe")
+    original = module.log_mel_spectrogram
+    features = LogMelFeatures(whisper.log_mel_spectrogram(np.zeros(16000, np.float32), 80, padding=N_SAMPLES), 16000)
+    
+    class FakeModel:
+        def transcribe(self, audio, **options):
+            return {"mel": module.log_mel_spectrogram(audio, 80, padding=N_SAMPLES)}
+    
+    assert transcribe_features(FakeModel(), features)["mel"] is features.mel
+    assert module.log_mel_spectrogram is original
+
+
+def test_transcribe_hook_original_survives_restore():
+    """Quem leu a função trocada antes da restauração ainda chega à original."""
+    module = importlib.import_module("whisper.transcribe")
+    audio = np.zeros(16000, np.float32)
+    hook = _TranscribeHook()
+    with hook:
+        patched = module.log_mel_spectrogram  # outra thread obtém a função trocada...
+    # ...e só a chama depois que a última transcribe_features terminou
+    np.testing.assert_array_equal(patched(audio, 80), whisper.log_mel_spectrogram(audio, 80))
@@ -0,0 +1,70 @@
+"""Testes do serviço de micro-lotes (modelo falso, sem pesos do Whisper)."""
+
+import time
+import types
+import threading
+
+import numpy as np
+import torch
+import whisper
+
+from src.micro_batching import MicroBatchTranscriber
+from src.model_lock import model_lock
+
+
+class FakeModel(torch.nn.Module):
+    dims = types.SimpleNamespace(n_mels=80)
+    device = torch.device("cpu")
+    
+    def embed_audio(self, mel):
+        return mel
+
+
+def _fake_decode(state):
+    """whisper.decode falso que registra quantas decodificações rodam ao mesmo tempo."""
+    def decode(model, features, options):
+        state["active"] += 1
+        state["overlap"] = max(state["overlap"], state["active"])
+        time.sleep(0.02)
+        state["active"] -= 1
+        return [types.SimpleNamespace(no_speech_prob=0.0, avg_logprob=0.0, text=" oi", language="pt")
+                for _ in range(len(features))]
+    return decode
+
+
+def test_submit_loads_outside_caller_thread(monkeypatch):
+    """O log-mel é calculado nas threads de carregamento, não na do chamador."""
+    threads = []
+    original = whisper.log_mel_spectrogram
+    
+    def log_mel(*args, **kwargs):
+        threads.append(threading.current_thread().name)
+        return original(*args, **kwargs)
+    
+    monkeypatch.setattr(whisper, "log_mel_spectrogram", log_mel)
+    monkeypatch.setattr(whisper, "decode", _fake_decode({"active": 0, "overlap": 0}))
+    with MicroBatchTranscriber(FakeModel(), language="pt") as service:
+        futures = [service.submit(np.zeros(16000, np.float32)) for _ in range(4)]
+        assert [f.result(10)["text"] for f in futures] == ["oi"] * 4
+    assert threads and all(name.startswith("micro-batching-loader") for name in threads)
+
+
+def test_batches_respect_model_lock(monkeypatch):
+    """Os lotes e outro usuário do mesmo modelo nunca decodificam ao mesmo tempo."""
+    state = {"active": 0, "overlap": 0}
+    monkeypatch.setattr(whisper, "decode", _fake_decode(state))
+    model = FakeModel()
+    
+    def other_user():
+        for _ in range(5):
+            with model_lock(model):
+                whisper.decode(model, [None], None)
+    
+    with MicroBatchTranscriber(model, language="pt", max_batch_size=2) as service:
+        futures = [service.submit(np.zeros(8000, np.float32)) for _ in range(6)]
+        thread = threading.Thread(target=other_user)
+        thread.start()
+        for future in futures:
+            future.result(10)
+        thread.join()
+    assert state["overlap"] == 1
@@ -0,0 +1,38 @@
+"""Testes da separação de fluxos MP3 concatenados."""
+
+from src.playback import split_mp3_streams
+
+# MPEG-2 camada III, 32 kbps, 24 kHz, mono (como o gTTS): quadros de 96 bytes
+HEADER = bytes([0xFF, 0xF3, 0x44, 0xC0])
+FRAME_SIZE = 96
+TAG_OFFSET = 4 + 9  # cabeçalho + side info mono do MPEG-2
+
+
+def _frame(payload=b""):
+    return HEADER + payload.ljust(FRAME_SIZE - 4, b"\0")
+
+
+def _stream(n_frames, payload=b""):
+    info = _frame(bytes(TAG_OFFSET - 4) + b"Info")
+    return info + b"".join(_frame(payload) for _ in range(n_frames))
+
+
+def test_splits_at_info_frames():
+    """Cada fluxo com quadro Info próprio vira uma parte."""
+    streams = [_stream(3), _stream(5), _stream(1)]
+    assert split_mp3_streams(b"".join(streams)) == streams
+
+
+def test_ignores_tags_inside_audio_data():
+    """Marcas Xing/Info nos dados de áudio (mesmo após bytes de sincronia) não dividem o fluxo."""
+    fake = HEADER + bytes(TAG_OFFSET - 4) + b"Xing" + b"\xff\xfb\x90\x00" + bytes(32) + b"Info"
+    streams = [_stream(4, fake), _stream(2, fake)]
+    assert split_mp3_streams(b"".join(streams)) == streams
+    assert split_mp3_streams(_frame(fake) * 3) == [_frame(fake) * 3]
+
+
+def test_id3_tag_stays_with_its_stream():
+    """Uma tag ID3v2 antes de um fluxo fica no início da parte dele."""
+    id3 = b"ID3\x04\x00\x00\x00\x00\x00\x05" + b"TAG!!"
+    streams = [id3 + _stream(2), id3 + _stream(3)]
+    assert split_mp3_streams(b"".join(streams)) == streams